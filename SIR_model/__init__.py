@@ -1 +1,26 @@
-from .model import Model
+# Modules are imported on first access, so that importing the package for a
+# headless run only loads what the run needs.
+import importlib
+
+_modules = {
+    'Model': '.model',
+    'VectorizedModel': '.vectorized_model',
+    'MeanFieldModel': '.mean_field_model',
+    'CohortModel': '.cohort_model',
+    'BatchModel': '.batch_model',
+    'Metapopulation': '.metapopulation',
+    'Ensemble': '.ensemble',
+    'Sweep': '.sweep',
+    'CapacityOptimizer': '.capacity_optimizer',
+    'PairedComparison': '.paired_comparison',
+    'Snapshot': '.checkpoint',
+    'Forks': '.checkpoint',
+}
+
+__all__ = list(_modules)
+
+
+def __getattr__(name):
+    if name in _modules:
+        return getattr(importlib.import_module(_modules[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,124 @@
+# Online aggregation of the result columns of many runs
+
+import numpy as np
+
+from .sketch import QuantileSketches
+
+
+class Aggregator:
+    """Mean, standard deviation and quantiles per day of the result columns of many runs,
+    updated one run at a time, so memory does not grow with the number of runs.
+
+    Means and variances are kept by Welford's method, and aggregators filled apart, e.g.
+    in different worker processes, are combined exactly by merge. Quantiles come from a
+    QuantileSketch per day and column, each with its own bins, see QuantileSketches. Values
+    more than maxBins bins below the largest value of their day and column share one bin.
+    A run shorter than the first one, e.g. stopped early, only counts for the days it has.
+    quantiles: Quantile levels of Quantiles. Any level can be read with quantile.
+    """
+
+    def __init__(self, quantiles=(0.05, 0.5, 0.95), relativeAccuracy=0.01, maxBins=512):
+        self.QuantileLevels = tuple(quantiles)
+        self.RelativeAccuracy = relativeAccuracy
+        self.MaxBins = maxBins
+
+        self.Columns = None  # Column names, of the first run
+        self.NTimeSteps = 0
+        self.NRuns = 0
+        self.Count = None  # Runs per day and column
+        self.Means = None
+        self.M2 = None  # Sum of the squared deviations from the mean, per day and column
+        self.Sketches = None
+
+    def add(self, columns):
+        """Adds the result columns of one run, a dict of column name and array per day,
+        e.g. Model.ResultColumns.
+        """
+        if self.Columns is None:
+            self.__allocate(list(columns), len(columns['Time']))
+        elif list(columns) != self.Columns:
+            raise Exception("A run with other result columns can not be aggregated.")
+        nDays = len(columns['Time'])
+        if nDays > self.NTimeSteps:
+            raise Exception(f"A run of {nDays} days does not fit an aggregate of {self.NTimeSteps} days.")
+
+        values = np.full((self.NTimeSteps, len(self.Columns)), np.nan)
+        values[:nDays] = np.column_stack([columns[c] for c in self.Columns])
+        isValid = ~np.isnan(values)
+
+        self.Count += isValid
+        delta = np.where(isValid, values - self.Means, 0)
+        self.Means += delta/np.maximum(self.Count, 1)
+        self.M2 += np.where(isValid, delta*(values - self.Means), 0)
+        self.Sketches.add(values)
+        self.NRuns += 1
+
+    def merge(self, other):
+        """Adds the runs of another aggregator, e.g. one filled in a worker process.
+        """
+        if other.NRuns == 0:
+            return self
+        if self.NRuns == 0:
+            self.__allocate(other.Columns, other.NTimeSteps)
+        elif other.Columns != self.Columns or other.NTimeSteps != self.NTimeSteps:
+            raise Exception("Only aggregates of the same columns and days can be merged.")
+
+        count = self.Count + other.Count
+        delta = other.Means - self.Means
+        share = np.divide(other.Count, count, out=np.zeros(count.shape), where=count > 0)
+        self.Means += delta*share
+        self.M2 += other.M2 + delta**2*self.Count*share
+        self.Count = count
+        self.Sketches.merge(other.Sketches)
+        self.NRuns += other.NRuns
+        return self
+
+    def quantile(self, q):
+        """The estimated quantile q of every column per day, as a pandas DataFrame.
+        """
+        return self.__frame(self.Sketches.quantile(q), exactTime=True)
+
+    @property
+    def Mean(self):
+        """The mean per day and column, NaN for days of no run.
+        """
+        return self.__frame(np.where(self.Count > 0, self.Means, np.nan))
+
+    @property
+    def Variance(self):
+        """The sample variance per day and column, 0 for days of a single run and NaN for days of none.
+        """
+        return self.__frame(self.__variance(), exactTime=True)
+
+    @property
+    def Std(self):
+        return self.__frame(np.sqrt(self.__variance()), exactTime=True)
+
+    @property
+    def Quantiles(self):
+        """Quantile level to DataFrame, for every level of QuantileLevels.
+        """
+        return {q: self.quantile(q) for q in self.QuantileLevels}
+
+    def __allocate(self, columns, nTimeSteps):
+        self.Columns = list(columns)
+        self.NTimeSteps = nTimeSteps
+        shape = (nTimeSteps, len(self.Columns))
+        self.Count = np.zeros(shape, dtype=np.int64)
+        self.Means = np.zeros(shape)
+        self.M2 = np.zeros(shape)
+        self.Sketches = QuantileSketches(shape, self.RelativeAccuracy, self.MaxBins)
+
+    def __variance(self):
+        variance = np.divide(self.M2, self.Count - 1, out=np.zeros(self.M2.shape), where=self.Count > 1)
+        variance[self.Count == 0] = np.nan
+        return variance
+
+    def __frame(self, values, exactTime=False):
+        """A DataFrame of per day and column values, with the mean Time column if exactTime.
+        """
+        import pandas as pd
+        frame = pd.DataFrame(values, columns=self.Columns)
+        if exactTime and 'Time' in frame:
+            frame['Time'] = self.Means[:, self.Columns.index('Time')]
+        return frame
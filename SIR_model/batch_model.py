@@ -0,0 +1,219 @@
+# SIR Model with M|M|s testing-queue, many runs at once in one process
+
+import inspect
+
+import numpy as np
+
+from .model import Model
+from .batch_population import BatchPopulation, SUSCEPTIBLE, INFECTED, REMOVED
+from .server_pool import ServerPool
+from .result import Result
+from .sweep import summarize
+
+# Model arguments that may differ between the runs of a batch.
+RunParameters = ['susceptible', 'infected', 'removed', 'rateSI',
+                 'pSymptomatic', 'tSymptomatic', 'tRecovery', 'pFalseSymptoms', 'tFalseRecovery',
+                 'servers', 'serverMu', 'tTestResult', 'queuePrioritization', 'tReneging']
+
+Prioritisations = ['FIFO', 'LIFO', 'SymptomaticFirst']
+
+
+class BatchModel:
+    """Runs many scenarios and replications of the SIR-model with M|M|s testing queue at once.
+
+    Every run is one row of the 2-D arrays of a BatchPopulation, so each step of a
+    day, e.g. infecting, queueing or testing, is one array operation over all runs
+    instead of one per run, and the servers of all runs are simulated in one pool.
+    The transitions are those of VectorizedModel, but the runs draw from one shared
+    stream, so a run is not reproduced by a single model with the same seed.
+
+    scenarios: List of dicts of model arguments, see RunParameters, that differ from
+        the keyword arguments, e.g. [{'servers': 1}, {'servers': 2}]. None for one scenario.
+    replications: Runs per scenario.
+    All other keyword arguments are model arguments shared by every run.
+    """
+
+    def __init__(self, scenarios=None, replications=1, duration=100, seed=None, **parameters):
+        scenarios = [{}] if scenarios == None else [dict(s) for s in scenarios]
+        defaults = {name: p.default for (name, p) in inspect.signature(Model.__init__).parameters.items()
+                    if name in RunParameters}
+        for name in list(parameters) + [name for s in scenarios for name in s]:
+            if name in ['eventDriven', 'debug', 'profile', 'recordWaits', 'randomNumbers']:
+                raise Exception(f"BatchModel does not support [{name}].")
+            if name not in RunParameters:
+                raise Exception(f"Parameter [{name}] can not be set per run of a batch.")
+
+        self.Scenarios = scenarios
+        self.Replications = int(replications)
+        self.Duration = int(duration)
+        self.NTimeSteps = int(duration+1)
+        self.Seed = seed
+        self.Rng = np.random.default_rng(seed)
+
+        # Model arguments of every run, replications of the same scenario next to each other.
+        self.Runs = [{**defaults, **parameters, **s} for s in scenarios for r in range(self.Replications)]
+        self.Scenario = np.repeat(np.arange(len(scenarios)), self.Replications)
+        self.Replication = np.tile(np.arange(self.Replications), len(scenarios))
+        self.NRuns = len(self.Runs)
+
+        def values(name, dtype=float):
+            return np.array([run[name] for run in self.Runs], dtype=dtype)
+
+        self.RateSI = values('rateSI')
+        self.PFalseSymptoms = values('pFalseSymptoms')
+        self.NServers = values('servers')
+        self.ServerMu = values('serverMu')
+        self.TTestResult = values('tTestResult')
+        self.TReneging = np.array([np.nan if run['tReneging'] == None else run['tReneging']
+                                   for run in self.Runs], dtype=float)
+        self.QueuePrioritization = values('queuePrioritization', object)
+        for prioritisation in set(self.QueuePrioritization):
+            if prioritisation not in Prioritisations:
+                raise Exception(f"Prioritization [{prioritisation}] is not valid in a batch.")
+
+        self.Population = BatchPopulation(values('susceptible', np.int64), values('infected', np.int64),
+                                          values('removed', np.int64), values('pSymptomatic'),
+                                          values('tSymptomatic'), values('tRecovery'),
+                                          values('tFalseRecovery'), self.TTestResult, self.TReneging, self.Rng)
+        self.TotalIndividuals = self.Population.Sizes
+
+        pools = [ServerPool(run['servers'], run['serverMu']) for run in self.Runs]
+        self.Servers = ServerPool.concatenate(pools, self.Rng)
+        self.ServerRun = np.repeat(np.arange(self.NRuns), [len(p) for p in pools])  # Run of every server
+        self.NServerSlots = np.array([len(p) for p in pools])
+
+        self.ResultColumns = None  # Column name: 2-D NumPy array, one row per run, after the run
+        self.__results = None
+        self.HasModelRun = False
+
+    def run(self):
+        """Executes all runs.
+        """
+        columns = {name: np.zeros((self.NRuns, self.NTimeSteps), dtype=dtype)
+                   for (name, dtype) in Result.Columns.items()}
+        columns['Time'][:] = np.linspace(0, self.Duration, self.NTimeSteps)
+        columns['ExpectedWaitTestResult'][:] = self.TTestResult[:, None]
+        columns['ExpectedWaitService'][:] = self.ServerMu[:, None]
+
+        self.Population.advance(0)
+        self.recordDay(columns, 0)
+        for day in range(1, self.NTimeSteps):
+            self.simulateDay(columns['Time'][0, day])
+            self.recordDay(columns, day)
+
+        self.ResultColumns = columns
+        self.__results = None
+        self.HasModelRun = True
+
+    def simulateDay(self, t):
+        """Advances, infects, queues, tests and renegades the people of every run for the day t.
+        """
+        population = self.Population
+
+        # Advance people
+        population.advance(t)
+
+        # Infect
+        susceptible = population.Stage == SUSCEPTIBLE
+        infectiveUnisolated = population.count((population.Stage == INFECTED) & population.IsInfective
+                                               & (~population.IsIsolated))
+        S_to_I_counts = self.newInfections(population.count(susceptible), infectiveUnisolated)
+        if S_to_I_counts.any():
+            population.infect(population.sample(susceptible, S_to_I_counts), t)
+
+        # False symptoms
+        susceptibleNotQueued = (population.Stage == SUSCEPTIBLE) & (~population.IsQueued)
+        S_to_FalseSymptoms_counts = np.round(population.count(susceptibleNotQueued)
+                                             * self.PFalseSymptoms).astype(np.int64)
+        if S_to_FalseSymptoms_counts.any():
+            population.falseSymptomsInfect(population.sample(susceptibleNotQueued, S_to_FalseSymptoms_counts), t)
+
+        # Queue
+        population.queue(population.ShouldQueue.copy(), t)
+
+        # Test
+        population.test(population.selectFromQueue(self.testCapacity(), self.QueuePrioritization), t)
+
+        # Renegade
+        population.renegade(population.ShouldRenegade.copy())
+
+    def newInfections(self, nSusceptible, nInfectiveUnisolated):
+        """The number of susceptible people of every run infected today.
+        """
+        return np.round((self.RateSI * nSusceptible * nInfectiveUnisolated) /
+                        self.TotalIndividuals).astype(np.int64)
+
+    def testCapacity(self):
+        """The number of people every run can test today.
+        """
+        served = self.Servers.simulateDay()
+        return np.bincount(self.ServerRun, weights=served, minlength=self.NRuns).astype(np.int64)
+
+    def expectedQueueTime(self, queueLengths):
+        """The expected waiting time for the last person in the queue of every run, see TestQueue.
+        """
+        queued = np.maximum(queueLengths - self.NServerSlots, 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            expectedQueueTime = np.round(queued*self.ServerMu/self.NServers)
+        return np.where(self.NServers == 0, np.nan, expectedQueueTime)
+
+    def recordDay(self, columns, day):
+        """Counts the current state of the people of every run into the given day of the result columns.
+        """
+        population = self.Population
+        count = population.count
+        susceptible = population.Stage == SUSCEPTIBLE
+        infected = population.Stage == INFECTED
+        removed = population.Stage == REMOVED
+        unisolated = infected & (~population.IsIsolated)
+        queued = population.IsQueued
+        nQueued = count(queued)
+        expectedWaitQueue = self.expectedQueueTime(nQueued)
+
+        for (name, values) in {
+            'Susceptible': count(susceptible),
+            'Infected': count(infected),
+            'Removed': count(removed),
+            'InfectedAsymptomaticUnisolated': count(unisolated & (~population.IsSymptomatic)),
+            'InfectedSymptomaticUnisolated': count(unisolated & population.IsSymptomatic),
+            'InfectedIsolated': count(infected & population.IsIsolated),
+            'InfectedInfectiveUnisolated': count(unisolated & population.IsInfective),
+            'Queued': nQueued,
+            'SusceptibleQueued': count(susceptible & queued),
+            'InfectedQueued': count(infected & queued),
+            'RemovedQueued': count(removed & queued),
+            'ExpectedWaitQueue': expectedWaitQueue,
+            'ExpecteWaitTotal': self.TTestResult + self.ServerMu + expectedWaitQueue,
+        }.items():
+            columns[name][:, day] = values
+
+    def columns(self, run):
+        """The result columns of one run, as Model.ResultColumns.
+        """
+        return {name: values[run] for (name, values) in self.ResultColumns.items()}
+
+    def result(self, run):
+        """The results of one run as a pandas DataFrame, as Model.Results.
+        """
+        import pandas as pd
+        return pd.DataFrame(self.columns(run))
+
+    def summary(self, metrics=summarize):
+        """A DataFrame with the Scenario, Replication and summary metrics of every run,
+        metrics being a function of the result columns of a run, see sweep.summarize.
+        """
+        import pandas as pd
+        return pd.DataFrame([{'Scenario': self.Scenario[k], 'Replication': self.Replication[k],
+                              **metrics(self.columns(k))} for k in range(self.NRuns)])
+
+    @property
+    def Results(self):
+        """All runs as one long pandas DataFrame, with the Scenario and Replication of every row.
+        """
+        if self.__results is None:
+            import pandas as pd
+            self.__results = pd.DataFrame({
+                'Scenario': np.repeat(self.Scenario, self.NTimeSteps),
+                'Replication': np.repeat(self.Replication, self.NTimeSteps),
+                **{name: values.ravel() for (name, values) in self.ResultColumns.items()}})
+        return self.__results
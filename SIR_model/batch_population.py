@@ -0,0 +1,243 @@
+import numpy as np
+
+from .population import SUSCEPTIBLE, INFECTED, REMOVED
+
+ABSENT = -1  # Stage of the places that pad a run to the size of the largest run
+
+
+def nonzero(mask):
+    """Rows and columns of the True entries of a 2-D mask, row by row, as np.nonzero but faster.
+    """
+    return np.divmod(np.flatnonzero(mask), mask.shape[1])
+
+
+def smallestPerRow(keys, counts):
+    """Mask of the counts[r] entries with the smallest keys in every row r of a 2-D array.
+    Only the max(counts) smallest keys of every row are sorted.
+    """
+    selected = np.zeros(keys.shape, dtype=bool)
+    kMax = int(counts.max()) if len(counts) > 0 else 0
+    if kMax == 0:
+        return selected
+    rows = np.flatnonzero(counts > 0)
+    if len(rows) < len(counts):
+        selected[rows] = smallestPerRow(keys[rows], counts[rows])
+        return selected
+    first = np.argpartition(keys, kMax-1, axis=1)[:, :kMax] if kMax < keys.shape[1] \
+        else np.broadcast_to(np.arange(keys.shape[1]), keys.shape)
+    first = np.take_along_axis(first, np.argsort(np.take_along_axis(keys, first, axis=1),
+                                                 axis=1, kind='stable'), axis=1)
+    isTaken = np.arange(kMax) < counts[:, None]
+    rows = np.broadcast_to(np.arange(keys.shape[0])[:, None], first.shape)
+    selected[rows[isTaken], first[isTaken]] = True
+    return selected
+
+
+class BatchPopulation:
+    """The people of many runs as 2-D arrays, one row per run and one column per person.
+
+    Row-wise counterpart of Population: every transition is one masked array
+    operation over all runs, and the parameters are arrays with a value per run.
+    Runs with fewer people are padded with ABSENT places, which are in no stage.
+    """
+
+    def __init__(self, susceptible, infected, removed, pSymptomatic, tSymptomatic, tRecovery, tFalseRecovery, tTestResult, tRenegade,
+                 rng=None):
+        """All arguments but rng are arrays with a value per run. tRenegade is NaN for no reneging.
+        """
+        self.Rng = rng if rng != None else np.random.default_rng()
+        self.PSymptomatic = np.asarray(pSymptomatic, dtype=float)
+        self.TSymptomatic = np.asarray(tSymptomatic, dtype=float)
+        self.TRecovery = np.asarray(tRecovery, dtype=float)
+        self.TFalseRecovery = np.asarray(tFalseRecovery, dtype=float)
+        self.TTestResult = np.asarray(tTestResult, dtype=float)
+        self.TRenegade = np.asarray(tRenegade, dtype=float)
+
+        susceptible, infected, removed = (np.asarray(n, dtype=np.int64) for n in (susceptible, infected, removed))
+        self.Sizes = susceptible + infected + removed
+        self.NRuns = len(self.Sizes)
+        n = int(self.Sizes.max())
+        shape = (self.NRuns, n)
+        column = np.arange(n)
+
+        self.Stage = np.full(shape, ABSENT, dtype=np.int8)
+        self.Stage[column < self.Sizes[:, None]] = REMOVED
+        self.Stage[column < (susceptible + infected)[:, None]] = INFECTED
+        self.Stage[column < susceptible[:, None]] = SUSCEPTIBLE
+
+        self.IsInfective = np.zeros(shape, dtype=bool)
+        self.WillBeSymptomatic = np.zeros(shape, dtype=bool)
+        self.IsSymptomatic = np.zeros(shape, dtype=bool)
+        self.ShouldQueue = np.zeros(shape, dtype=bool)
+        self.IsQueued = np.zeros(shape, dtype=bool)
+        self.ShouldRenegade = np.zeros(shape, dtype=bool)
+        self.WillIsolate = np.zeros(shape, dtype=bool)
+        self.IsIsolated = np.zeros(shape, dtype=bool)
+        self.HasTestedPositive = np.zeros(shape, dtype=bool)
+        self.IsFalseSymptomatic = np.zeros(shape, dtype=bool)
+
+        self.InfectiveAt = np.full(shape, np.nan)
+        self.SymptomaticAt = np.full(shape, np.nan)
+        self.RecoverAt = np.full(shape, np.nan)
+        self.FalseRecoverAt = np.full(shape, np.nan)
+        self.IsolateAt = np.full(shape, np.nan)
+        self.RenegadesAt = np.full(shape, np.nan)
+
+        # Order in which queued people were put in the queue of their run.
+        self.QueueOrder = np.zeros(shape, dtype=np.int64)
+        self.QueuedSymptomatic = np.zeros(shape, dtype=bool)
+        self.NextQueueOrder = np.zeros(self.NRuns, dtype=np.int64)
+
+        self.infect(self.Stage == INFECTED, 0)
+
+    def count(self, mask):
+        """The number of people of every run in the mask.
+        """
+        return np.count_nonzero(mask, axis=1)
+
+    def sample(self, mask, counts):
+        """Mask of counts[r] people drawn without replacement from the mask of every run r.
+
+        Only the draws needed are made: every run draws uniformly among its people in the mask
+        and redraws the people drawn twice. A run drawing most of its people draws those left out.
+        """
+        sizes = self.count(mask)
+        counts = np.minimum(counts, sizes)
+        isComplement = 2*counts > sizes
+        counts = np.where(isComplement, sizes - counts, counts)
+
+        positions = np.flatnonzero(mask)
+        rows = positions // mask.shape[1]
+        starts = np.cumsum(sizes) - sizes
+        isDrawn = np.zeros(len(positions), dtype=bool)
+        missing = counts
+        while missing.any():
+            drawRows = np.repeat(np.arange(len(sizes)), missing)
+            drawn = np.unique(starts[drawRows] + (self.Rng.random(len(drawRows))*sizes[drawRows]).astype(np.int64))
+            drawn = drawn[~isDrawn[drawn]]
+            isDrawn[drawn] = True
+            missing = missing - np.bincount(rows[drawn], minlength=len(sizes))
+
+        isDrawn ^= isComplement[rows]
+        selected = np.zeros(mask.shape, dtype=bool)
+        selected.ravel()[positions[isDrawn]] = True
+        return selected
+
+    def advance(self, t):
+        """Advances all people to the current timestep, see Population.advance.
+        """
+        falseRecovering = self.IsFalseSymptomatic & (t >= self.FalseRecoverAt)
+        self.IsFalseSymptomatic[falseRecovering] = False
+
+        infected = self.Stage == INFECTED
+
+        becomesInfective = infected & (~self.IsInfective) & (t >= self.InfectiveAt)
+        self.IsInfective[becomesInfective] = True
+        self.InfectiveAt[becomesInfective] = np.nan
+
+        becomesSymptomatic = infected & self.WillBeSymptomatic & (~self.IsSymptomatic) \
+            & (t >= self.SymptomaticAt)
+        self.IsSymptomatic[becomesSymptomatic] = True
+        self.WillBeSymptomatic[becomesSymptomatic] = False
+        self.ShouldQueue[becomesSymptomatic] = True
+        self.RenegadesAt[becomesSymptomatic] = np.nan
+        self.ShouldRenegade[becomesSymptomatic] = False
+
+        self.isolate(infected & self.WillIsolate & (t >= self.IsolateAt))
+        self.recover(infected & (t >= self.RecoverAt))
+
+        canRenegade = self.IsQueued & (~self.ShouldRenegade) & ~np.isnan(self.TRenegade)[:, None]
+        hasNoTimer = np.isnan(self.RenegadesAt)
+
+        startsTimer = canRenegade & hasNoTimer & (~self.IsSymptomatic) \
+            & (~self.IsFalseSymptomatic)
+        rows, columns = nonzero(startsTimer)
+        if len(rows) > 0:
+            self.RenegadesAt[rows, columns] = t + \
+                self.Rng.exponential(self.TRenegade[rows])
+
+        renegades = canRenegade & (~hasNoTimer) & (t >= self.RenegadesAt)
+        self.ShouldRenegade[renegades] = True
+        self.RenegadesAt[renegades] = np.nan
+
+    def infect(self, mask, t):
+        """Infects the people in the mask with covid-19, see Population.infect.
+        """
+        rows, columns = nonzero(mask)
+        self.Stage[rows, columns] = INFECTED
+        self.InfectiveAt[rows, columns] = t
+        self.RecoverAt[rows, columns] = t + self.Rng.poisson(self.TRecovery[rows])
+
+        willBeSymptomatic = self.Rng.random(len(rows)) <= self.PSymptomatic[rows]
+        self.WillBeSymptomatic[rows, columns] = willBeSymptomatic
+        rows, columns = rows[willBeSymptomatic], columns[willBeSymptomatic]
+        self.SymptomaticAt[rows, columns] = t + self.Rng.poisson(self.TSymptomatic[rows])
+
+    def falseSymptomsInfect(self, mask, t):
+        """Gives the people in the mask false symptoms, see Population.falseSymptomsInfect.
+        """
+        rows, columns = nonzero(mask)
+        self.ShouldQueue[rows, columns] = True
+        self.IsFalseSymptomatic[rows, columns] = True
+        self.FalseRecoverAt[rows, columns] = t + self.Rng.poisson(self.TFalseRecovery[rows])
+
+    def queue(self, mask, t):
+        """Queues the people in the mask, last in the queue of their run in order of id.
+        """
+        rows, columns = nonzero(mask)
+        counts = self.count(mask)
+        self.ShouldQueue[rows, columns] = False
+        self.IsQueued[rows, columns] = True
+        self.QueuedSymptomatic[rows, columns] = self.IsSymptomatic[rows, columns]
+        # Rank of every person among the queued of the same run, as np.nonzero goes row by row.
+        ranks = np.arange(len(rows)) - np.repeat(np.cumsum(counts) - counts, counts)
+        self.QueueOrder[rows, columns] = self.NextQueueOrder[rows] + ranks
+        self.NextQueueOrder += counts
+
+    def selectFromQueue(self, counts, prioritisations):
+        """Mask of the counts[r] first people in the queue of every run r according to its
+        prioritization policy, see Population.selectFromQueue.
+        prioritisations: Array of 'FIFO', 'LIFO' or 'SymptomaticFirst' per run.
+        """
+        prioritisations = np.asarray(prioritisations)
+        order = self.QueueOrder.astype(float)
+        isLifo = prioritisations == 'LIFO'
+        order[isLifo] = -order[isLifo]
+        isSymptomaticFirst = prioritisations == 'SymptomaticFirst'
+        order[isSymptomaticFirst] += (~self.QueuedSymptomatic[isSymptomaticFirst]) \
+            * self.NextQueueOrder[isSymptomaticFirst, None]
+        order[~self.IsQueued] = np.inf
+        return smallestPerRow(order, np.minimum(counts, self.count(self.IsQueued)))
+
+    def renegade(self, mask):
+        """Removes the people in the mask from the queue, see Population.renegade.
+        """
+        self.IsQueued[mask] = False
+        self.ShouldRenegade[mask] = False
+
+    def test(self, mask, t):
+        """Tests the people in the mask for covid-19, see Population.test.
+        """
+        self.IsQueued[mask] = False
+
+        rows, columns = nonzero(mask & (self.Stage == INFECTED))
+        self.HasTestedPositive[rows, columns] = True
+        isImmediate = self.TTestResult[rows] == 0
+        self.IsIsolated[rows[isImmediate], columns[isImmediate]] = True
+        rows, columns = rows[~isImmediate], columns[~isImmediate]
+        self.WillIsolate[rows, columns] = True
+        self.IsolateAt[rows, columns] = t + self.TTestResult[rows]
+
+    def isolate(self, mask):
+        self.IsIsolated[mask] = True
+        self.WillIsolate[mask] = False
+        self.IsolateAt[mask] = np.nan
+
+    def recover(self, mask):
+        """Recovers the people in the mask from covid-19, see Population.recover.
+        """
+        self.Stage[mask] = REMOVED
+        self.IsInfective[mask] = False
+        self.IsSymptomatic[mask] = False
+        self.WillIsolate[mask] = False
+        self.IsIsolated[mask] = False
@@ -0,0 +1,178 @@
+# Search for the least testing capacity that meets a target
+
+import os
+import math
+import multiprocessing
+from statistics import NormalDist
+
+import numpy as np
+
+from .model import Model
+from .sweep import summarize, runSummary
+
+
+class CapacityOptimizer:
+    """Finds the smallest number of servers, or the largest serverMu, for which a metric of
+    the runs stays at or below a threshold, by bisection with adaptive replications.
+
+    metric: Name of a metric of sweep.summarize, e.g. 'PeakWaitTotal' or 'PeakInfected',
+        or a picklable function from the result columns of a run to a number. NaN, e.g. the
+        waiting time without servers, counts as above every threshold.
+    threshold: Largest acceptable value of the metric.
+    probability: Share of runs that must meet the threshold, None to require the mean
+        of the metric to meet it instead.
+    confidence: Confidence with which every candidate is accepted or rejected.
+    parameter: Model argument to search, e.g. 'servers' (fractional values allowed) or 'serverMu'.
+    bounds: (low, high) of the search.
+    resolution: Width of the final bracket, e.g. 1 for whole servers.
+    feasibleAbove: Whether the target is met above the boundary, as for servers, or below it,
+        as for serverMu. None to infer from the parameter.
+    replications: (first, most) runs per candidate. Runs are added in doubling batches until
+        the candidate is decided with the given confidence or the most are done.
+    Replication r uses the same seed for every candidate, so candidates are compared on the
+    same epidemics. All other keyword arguments are passed on to the model.
+    """
+
+    def __init__(self, metric, threshold, probability=0.95, confidence=0.95, parameter='servers',
+                 bounds=(0, 20), resolution=0.25, feasibleAbove=None, replications=(10, 320),
+                 modelClass=Model, seed=None, processes=None, stopWhen=None, cache=None, **parameters):
+        self.Metric = metric
+        self.Threshold = threshold
+        self.Probability = probability
+        self.Confidence = confidence
+        self.Z = NormalDist().inv_cdf(confidence)
+        self.Parameter = parameter
+        self.Bounds = tuple(bounds)
+        self.Resolution = resolution
+        self.FeasibleAbove = feasibleAbove if feasibleAbove != None else parameter != 'serverMu'
+        self.MinReplications, self.MaxReplications = replications
+        self.ModelClass = modelClass
+        self.Processes = processes if processes != None else os.cpu_count()
+        self.StopWhen = stopWhen
+        self.Cache = cache
+        self.Parameters = parameters
+
+        seeds = np.random.SeedSequence(seed).generate_state(self.MaxReplications)
+        self.Seeds = [int(s) for s in seeds]
+
+        self.Values = {}  # Candidate: metric values of its runs so far
+        self.Evaluations = None
+        self.Best = None
+        self.TotalRuns = 0
+
+    def run(self):
+        """Executes the search. Best is the found value, None if even the most favourable bound
+        misses the target. Evaluations holds every candidate with its decision.
+        """
+        import pandas as pd
+        self.Values = {}
+        self.TotalRuns = 0
+        self.__evaluations = []
+
+        with multiprocessing.Pool(self.Processes) if self.Processes > 1 else _InProcess() as pool:
+            self.__pool = pool
+            low, high = self.Bounds
+            # Bracket such that bad misses the target and good meets it.
+            bad, good = (low, high) if self.FeasibleAbove else (high, low)
+
+            if not self.__isFeasible(good):
+                self.Best = None
+            elif self.__isFeasible(bad):
+                self.Best = bad
+            else:
+                while abs(good - bad) > self.Resolution:
+                    middle = self.__round((bad + good)/2)
+                    if middle in (bad, good):
+                        break
+                    if self.__isFeasible(middle):
+                        good = middle
+                    else:
+                        bad = middle
+                self.Best = good
+            self.__pool = None
+
+        self.Evaluations = pd.DataFrame(self.__evaluations)
+
+    def gridRuns(self):
+        """Runs a full grid at the resolution with the most replications per point would take.
+        """
+        low, high = self.Bounds
+        return (int(round((high - low)/self.Resolution)) + 1)*self.MaxReplications
+
+    def __round(self, value):
+        """Rounds to the resolution grid, counted from the lower bound.
+        """
+        low = self.Bounds[0]
+        return round(low + round((value - low)/self.Resolution)*self.Resolution, 12)
+
+    def __isFeasible(self, candidate):
+        """Adds runs to the candidate until it is decided or the most replications are done.
+        """
+        n = self.MinReplications
+        while True:
+            self.__runReplications(candidate, n)
+            estimate, lower, upper, feasible, decided = self.__decide(self.Values[candidate])
+            if decided or n >= self.MaxReplications:
+                break
+            n = min(2*n, self.MaxReplications)
+
+        self.__evaluations.append({self.Parameter: candidate, 'Replications': len(self.Values[candidate]),
+                                   'Estimate': estimate, 'Lower': lower, 'Upper': upper,
+                                   'Feasible': feasible, 'Decided': decided})
+        return feasible
+
+    def __runReplications(self, candidate, n):
+        values = self.Values.setdefault(candidate, [])
+        seeds = self.Seeds[len(values):n]
+        if not seeds:
+            return
+        parameters = {**self.Parameters, self.Parameter: candidate}
+        metrics = summarize if isinstance(self.Metric, str) else self.Metric
+        arguments = [(self.ModelClass, parameters, seed, metrics, self.StopWhen, self.Cache)
+                     for seed in seeds]
+        for result in self.__pool.starmap(runSummary, arguments):
+            value = result[self.Metric] if isinstance(self.Metric, str) else result
+            values.append(math.inf if value is None or np.isnan(value) else float(value))
+        self.TotalRuns += len(seeds)
+
+    def __decide(self, values):
+        """Estimate, confidence bounds, whether the target is met and whether that is decided
+        with the confidence: for the share of runs meeting the threshold if probability is given,
+        else for the mean of the metric.
+        """
+        values = np.asarray(values)
+        n = len(values)
+        z = self.Z
+
+        if self.Probability != None:
+            # Wilson score interval of the share of runs meeting the threshold.
+            share = np.mean(values <= self.Threshold)
+            center = (share + z*z/(2*n))/(1 + z*z/n)
+            halfWidth = z*math.sqrt(share*(1 - share)/n + z*z/(4*n*n))/(1 + z*z/n)
+            lower, upper = max(center - halfWidth, 0.), min(center + halfWidth, 1.)
+            feasible = share >= self.Probability
+            decided = lower >= self.Probability or upper < self.Probability
+            return share, lower, upper, feasible, decided
+
+        if np.isinf(values).any():
+            return math.inf, math.inf, math.inf, False, True
+        mean = values.mean()
+        halfWidth = z*values.std(ddof=1)/math.sqrt(n) if n > 1 else math.inf
+        lower, upper = mean - halfWidth, mean + halfWidth
+        feasible = mean <= self.Threshold
+        decided = upper <= self.Threshold or lower > self.Threshold
+        return mean, lower, upper, feasible, decided
+
+
+class _InProcess:
+    """Stands in for a process pool when running in this process.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        pass
+
+    def starmap(self, function, arguments):
+        return [function(*a) for a in arguments]
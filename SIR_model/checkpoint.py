@@ -0,0 +1,114 @@
+# Checkpoints of running models, restored and forked into variants
+
+import os
+import zlib
+import pickle
+import multiprocessing
+
+import numpy as np
+
+COMPRESSION_LEVEL = 6
+
+
+class Snapshot:
+    """Full state of a model at the end of a day, see Model.checkpoint: the people, the queue,
+    the overtime of the servers, the random streams and the results so far.
+
+    The state is pickled and compressed when the snapshot is taken, so the model can run on
+    and the snapshot is cheap to save, load and send to worker processes.
+    """
+
+    def __init__(self, modelClass, state, results):
+        self.ModelClass = modelClass
+        self.Day = results.Length - 1
+        self.Parameters = dict(state['Parameters'])
+        self.Data = zlib.compress(pickle.dumps((state, results), pickle.HIGHEST_PROTOCOL),
+                                  COMPRESSION_LEVEL)
+
+    def restore(self, seed=None, **changes):
+        """A model continuing from the snapshot, by run or steps, with the given arguments
+        changed, see Model.changeParameters.
+        seed: None to continue the random streams of the snapshot, so restored models share
+              their random numbers, else a seed to draw the rest of the run from.
+        """
+        state, results = pickle.loads(zlib.decompress(self.Data))
+        model = self.ModelClass.fromCheckpoint(state, results)
+        if seed != None:
+            model.reseed(seed)
+        if changes:
+            model.changeParameters(**changes)
+        return model
+
+    def save(self, fileName):
+        """Writes the snapshot to a file, via a temporary file renamed into place.
+        """
+        temporary = f'{fileName}.{os.getpid()}.tmp'
+        with open(temporary, 'wb') as f:
+            pickle.dump(self, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, fileName)
+
+    @staticmethod
+    def load(fileName):
+        """Reads a snapshot written by save.
+        """
+        with open(fileName, 'rb') as f:
+            snapshot = pickle.load(f)
+        if not isinstance(snapshot, Snapshot):
+            raise Exception(f"File [{fileName}] does not hold a snapshot.")
+        return snapshot
+
+    @property
+    def NBytes(self):
+        """Size of the compressed state.
+        """
+        return len(self.Data)
+
+
+def runFork(snapshot, changes, seed, stopWhen=None):
+    """Restores the snapshot with the changes, runs it to the end and returns its result columns.
+    """
+    model = snapshot.restore(seed, **changes)
+    model.run(stopWhen)
+    return model.ResultColumns
+
+
+class Forks:
+    """Runs variants of a snapshot across a process pool, each continuing from the day of the snapshot.
+
+    variants: Name to the model arguments to change, e.g. {'as is': {}, '3 servers': {'servers': 3}}.
+    replications: Runs per variant. A single run continues the random streams of the snapshot.
+        Otherwise replication r of every variant draws from the same new seed, the r-th child of seed.
+    processes: Number of worker processes, None for all cores.
+    stopWhen: Picklable stop predicate(s) passed to Model.run, see stop_conditions.
+    """
+
+    def __init__(self, snapshot, variants, replications=1, seed=None, processes=None, stopWhen=None):
+        self.Snapshot = snapshot
+        self.Variants = dict(variants)
+        self.Replications = int(replications)
+        self.Processes = processes if processes != None else os.cpu_count()
+        self.StopWhen = stopWhen
+        self.Seeds = [None] if self.Replications == 1 and seed == None \
+            else np.random.SeedSequence(seed).spawn(self.Replications)
+
+        self.Results = None
+        self.HasRun = False
+
+    def run(self):
+        """Executes all forks. Results maps every variant to a list of DataFrames, one per replication,
+        each holding the days before the snapshot followed by the days of the fork.
+        """
+        import pandas as pd
+        keys = [(name, r) for name in self.Variants for r in range(len(self.Seeds))]
+        arguments = [(self.Snapshot, self.Variants[name], self.Seeds[r], self.StopWhen) for (name, r) in keys]
+
+        if self.Processes == 1 or len(arguments) == 1:
+            runs = [runFork(*a) for a in arguments]
+        else:
+            with multiprocessing.Pool(min(self.Processes, len(arguments))) as pool:
+                runs = pool.starmap(runFork, arguments)
+
+        self.Results = {name: [] for name in self.Variants}
+        for ((name, r), columns) in zip(keys, runs):
+            self.Results[name].append(pd.DataFrame(columns))
+        self.HasRun = True
@@ -0,0 +1,105 @@
+# SIR Model with M|M|s testing-queue, cohort engine
+
+import numpy as np
+
+from .model import Model
+from .cohorts import Cohorts
+from .population import SUSCEPTIBLE, INFECTED, REMOVED
+from .test_queue import TestQueue
+
+
+class CohortModel(Model):
+    """Stochastic SIR-model with M|M|s testing queue where people are grouped into cohorts.
+
+    Takes the same arguments and produces the same Results as Model, but
+    people with the same stage and pending event days are one cohort, see
+    Cohorts, so a run takes about the same time for 10 million people as for
+    10 thousand. Symptom and recovery delays, false symptoms, the FIFO, LIFO and
+    SymptomaticFirst policies and reneging follow VectorizedModel, except that
+    people queued on the same day are served in random order. Callable
+    prioritization keys are not supported. Symptom onset is not kept once
+    people show symptoms, so SymptomsToIsolation waits are not recorded.
+    """
+
+    WaitKinds = ('QueueToTest', 'TestToIsolation')
+    SupportsEventDriven = False  # Every cohort is advanced every day
+
+    def initializePopulation(self):
+        self.Cohorts = Cohorts(self.InitialSusceptible, self.InitialInfected, self.InitialRemoved,
+                               self.PSymptomatic, self.TSymptomatic, self.TRecovery,
+                               self.TFalseRecovery, self.TTestResult, self.TReneging,
+                               self.NTimeSteps, self.Rng)
+        self.Cohorts.Waits = self.Waits
+
+    def beginRun(self):
+        self.Cohorts.advance(0)
+        self.Queue = TestQueue(self.NServers, self.ServerMu,
+                               self.QueuePrioritization, self.Rng, self.ServerRngs)
+
+    def applyParameters(self):
+        self.Cohorts.setParameters(self.PSymptomatic, self.TSymptomatic, self.TRecovery, self.TFalseRecovery,
+                                   self.TTestResult, self.TReneging, self.NTimeSteps)
+
+    def simulateDay(self, t):
+        cohorts = self.Cohorts
+        profiler = self.Profiler
+
+        # Advance people
+        cohorts.advance(t)
+        profiler.mark('advance', len(cohorts.Count))
+
+        # Infect
+        susceptible = cohorts.count(cohorts.Stage == SUSCEPTIBLE)
+        infectiveUnisolated = cohorts.count((cohorts.Stage == INFECTED) & cohorts.IsInfective
+                                            & (~cohorts.IsIsolated))
+        S_to_I_count = self.newInfections(susceptible, infectiveUnisolated)
+        if S_to_I_count > 0:
+            cohorts.infect(S_to_I_count, t)
+        profiler.mark('infect', max(S_to_I_count, 0))
+
+        # False symptoms
+        susceptibleNotQueued = cohorts.count((cohorts.Stage == SUSCEPTIBLE) & (~cohorts.IsQueued))
+        S_to_FalseSymptoms_count = int(np.round(susceptibleNotQueued*self.PFalseSymptoms))
+        if S_to_FalseSymptoms_count > 0:
+            cohorts.falseSymptomsInfect(S_to_FalseSymptoms_count, t)
+        profiler.mark('falseSymptoms', max(S_to_FalseSymptoms_count, 0))
+
+        # Queue
+        profiler.mark('queue', cohorts.queue(t))
+
+        # Test
+        profiler.mark('test', cohorts.test(self.testCapacity(), self.QueuePrioritization, t))
+
+        # Renegade
+        profiler.mark('renegade', cohorts.renegade())
+
+        cohorts.compact()
+        profiler.mark('compact', len(cohorts.Count))
+
+    def recordDay(self, results):
+        """Counts the people in the cohorts and writes the next row of the result columns.
+        """
+        cohorts = self.Cohorts
+        susceptible = cohorts.Stage == SUSCEPTIBLE
+        infected = cohorts.Stage == INFECTED
+        removed = cohorts.Stage == REMOVED
+        unisolated = infected & (~cohorts.IsIsolated)
+        queued = cohorts.IsQueued
+        nQueued = cohorts.count(queued)
+        expectedWaitQueue = self.Queue.expectedQueueTime(nQueued)
+
+        results.addRow({
+            'Susceptible': cohorts.count(susceptible),
+            'Infected': cohorts.count(infected),
+            'Removed': cohorts.count(removed),
+            'InfectedAsymptomaticUnisolated': cohorts.count(unisolated & (~cohorts.IsSymptomatic)),
+            'InfectedSymptomaticUnisolated': cohorts.count(unisolated & cohorts.IsSymptomatic),
+            'InfectedIsolated': cohorts.count(infected & cohorts.IsIsolated),
+            'InfectedInfectiveUnisolated': cohorts.count(unisolated & cohorts.IsInfective),
+            'Queued': nQueued,
+            'SusceptibleQueued': cohorts.count(susceptible & queued),
+            'InfectedQueued': cohorts.count(infected & queued),
+            'RemovedQueued': cohorts.count(removed & queued),
+            'ExpectedWaitQueue': expectedWaitQueue,
+            'ExpecteWaitTotal': self.TTestResult + self.ServerMu + expectedWaitQueue,
+        })
@@ -0,0 +1,295 @@
+import math
+
+import numpy as np
+
+from .population import SUSCEPTIBLE, INFECTED, REMOVED
+
+
+NEVER = 2**62  # Day of a timer that is not set
+
+
+def poissonPmf(mean, n):
+    """P(X = k) for k < n-1 of X ~ Poisson(mean), with P(X >= n-1) as the last entry.
+    """
+    if mean <= 0:
+        pmf = np.zeros(n)
+        pmf[0] = 1
+        return pmf
+    k = np.arange(n-1)
+    logPmf = -mean + k*math.log(mean) - np.array([math.lgamma(i+1) for i in k])
+    pmf = np.exp(logPmf)
+    return np.append(pmf, max(0., 1 - pmf.sum()))
+
+
+class Cohorts:
+    """Counterpart of Population that groups people into cohorts.
+
+    A cohort is a row holding a Count of people that have the same stage,
+    flags and timers. Timers are absolute days, so people infected on
+    different days share a cohort once their pending events fall on the same
+    days, and memory and time scale with the number of cohorts instead of the
+    number of people. Random choices of individuals become binomial,
+    multinomial and multivariate hypergeometric draws over cohorts. Timers
+    that are None on a Person are NEVER here.
+    """
+
+    Fields = ('Stage', 'IsInfective', 'WillBeSymptomatic', 'IsSymptomatic', 'ShouldQueue', 'IsQueued',
+              'QueuedSymptomatic', 'ShouldRenegade', 'WillIsolate', 'IsIsolated', 'IsFalseSymptomatic',
+              'InfectiveAt', 'SymptomaticAt', 'RecoverAt', 'FalseRecoverAt', 'IsolateAt', 'QueuedAt',
+              'RenegeFrom')
+
+    def __init__(self, susceptible, infected, removed, pSymptomatic, tSymptomatic, tRecovery, tFalseRecovery, tTestResult, tRenegade,
+                 nTimeSteps, rng=None):
+        """nTimeSteps: Days of the run, delays that end after the run are not told apart.
+        """
+        self.Rng = rng if rng != None else np.random.default_rng()
+        self.Waits = None  # WaitRecorder of the realized waits, if recorded
+        self.setParameters(pSymptomatic, tSymptomatic, tRecovery, tFalseRecovery, tTestResult, tRenegade,
+                           nTimeSteps)
+
+        self.Count = np.array([susceptible, infected, removed], dtype=np.int64)
+        for field in self.Fields:
+            setattr(self, field, np.zeros(3, dtype=bool))
+        self.Stage = np.array([SUSCEPTIBLE, SUSCEPTIBLE, REMOVED], dtype=np.int8)
+        for field in self.Fields[11:]:
+            setattr(self, field, np.full(3, NEVER, dtype=np.int64))
+
+        self.__infect(np.array([1]), np.array([infected]), 0)
+        self.compact()
+
+    def setParameters(self, pSymptomatic, tSymptomatic, tRecovery, tFalseRecovery, tTestResult, tRenegade,
+                      nTimeSteps):
+        """Sets the probabilities and delays of the people, e.g. when they change during a run.
+        """
+        self.PSymptomatic = pSymptomatic
+        self.TTestResult = tTestResult
+        self.TRenegade = tRenegade
+        self.NTimeSteps = nTimeSteps
+
+        self.SymptomaticPmf = poissonPmf(tSymptomatic, nTimeSteps+1)
+        self.RecoveryPmf = poissonPmf(tRecovery, nTimeSteps+1)
+        self.FalseRecoveryPmf = poissonPmf(tFalseRecovery, nTimeSteps+1)
+        # Reneging timers are exponential, so a started timer fires on each following day
+        # with the same probability.
+        self.PRenegade = 1 - math.exp(-1/tRenegade) if tRenegade != None and tRenegade > 0 else 1
+
+    def count(self, mask):
+        """Number of people in the cohorts selected by mask.
+        """
+        return int(self.Count[mask].sum())
+
+    def advance(self, t):
+        """Advances all cohorts to the current timestep, see Population.advance.
+        """
+        t = int(t)
+        falseRecovering = self.IsFalseSymptomatic & (t >= self.FalseRecoverAt)
+        self.IsFalseSymptomatic[falseRecovering] = False
+        self.FalseRecoverAt[falseRecovering] = NEVER
+
+        infected = self.Stage == INFECTED
+
+        becomesInfective = infected & (~self.IsInfective) & (t >= self.InfectiveAt)
+        self.IsInfective[becomesInfective] = True
+        self.InfectiveAt[becomesInfective] = NEVER
+
+        becomesSymptomatic = infected & self.WillBeSymptomatic & (~self.IsSymptomatic) \
+            & (t >= self.SymptomaticAt)
+        self.IsSymptomatic[becomesSymptomatic] = True
+        self.WillBeSymptomatic[becomesSymptomatic] = False
+        self.SymptomaticAt[becomesSymptomatic] = NEVER
+        self.ShouldQueue[becomesSymptomatic] = True
+        self.RenegeFrom[becomesSymptomatic] = NEVER
+        self.ShouldRenegade[becomesSymptomatic] = False
+
+        isolating = infected & self.WillIsolate & (t >= self.IsolateAt)
+        if self.Waits != None:
+            # Cohorts isolate a whole number of days after the test.
+            self.Waits.add('TestToIsolation', t, INFECTED,
+                           np.full(np.count_nonzero(isolating), math.ceil(self.TTestResult)), self.Count[isolating])
+        self.IsIsolated[isolating] = True
+        self.WillIsolate[isolating] = False
+        self.IsolateAt[isolating] = NEVER
+
+        recovering = infected & (t >= self.RecoverAt)
+        self.__recover(recovering)
+
+        if self.TRenegade != None:
+            canRenegade = self.IsQueued & (~self.ShouldRenegade)
+            hasNoTimer = self.RenegeFrom == NEVER
+
+            startsTimer = canRenegade & hasNoTimer & (~self.IsSymptomatic) \
+                & (~self.IsFalseSymptomatic)
+            self.RenegeFrom[startsTimer] = t
+
+            rows = np.flatnonzero(canRenegade & (~hasNoTimer))
+            renegades = self.__split(rows, self.Rng.binomial(self.Count[rows], self.PRenegade))
+            self.ShouldRenegade[renegades] = True
+            self.RenegeFrom[renegades] = NEVER
+
+    def infect(self, n, t):
+        """Infects n people drawn at random among all susceptible people, see Person.infect.
+        """
+        rows = np.flatnonzero((self.Stage == SUSCEPTIBLE) & (self.Count > 0))
+        self.__infect(rows, self.Rng.multivariate_hypergeometric(self.Count[rows], n), int(t))
+
+    def falseSymptomsInfect(self, n, t):
+        """Gives n people drawn at random among the susceptible people that are not queued
+        false symptoms, see Person.falseSymptomsInfect.
+        """
+        t = int(t)
+        rows = np.flatnonzero((self.Stage == SUSCEPTIBLE) & (~self.IsQueued) & (self.Count > 0))
+        rows = self.__split(rows, self.Rng.multivariate_hypergeometric(self.Count[rows], n))
+        self.ShouldQueue[rows] = True
+        self.IsFalseSymptomatic[rows] = True
+        rows, delay = self.__explode(rows, self.Rng.multinomial(self.Count[rows], self.FalseRecoveryPmf))
+        self.FalseRecoverAt[rows] = t + delay
+
+    def queue(self, t):
+        """Queues everyone that should queue, last in the queue, and returns how many they are.
+        """
+        rows = np.flatnonzero(self.ShouldQueue)
+        self.ShouldQueue[rows] = False
+        self.IsQueued[rows] = True
+        self.QueuedAt[rows] = int(t)
+        self.QueuedSymptomatic[rows] = self.IsSymptomatic[rows]
+        return self.count(rows)
+
+    def test(self, n, prioritisation, t):
+        """Tests the n first people in the queue according to the prioritization policy,
+        see Population.selectFromQueue. People queued on the same day are served in random order.
+        Returns the number of people tested.
+        """
+        t = int(t)
+        queued = np.flatnonzero(self.IsQueued & (self.Count > 0))
+        if n <= 0 or len(queued) == 0:
+            return 0
+
+        if prioritisation == 'FIFO':
+            order = self.QueuedAt[queued]
+        elif prioritisation == 'LIFO':
+            order = -self.QueuedAt[queued]
+        elif prioritisation == 'SymptomaticFirst':
+            order = self.QueuedAt[queued] \
+                + (~self.QueuedSymptomatic[queued])*self.NTimeSteps
+        else:
+            raise Exception(
+                f"Prioritization [{prioritisation}] is not valid.")
+
+        # Serve whole groups of equal order first to last, the last one partially.
+        groups, inverse = np.unique(order, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        counts = self.Count[queued]
+        groupCounts = np.zeros(len(groups), dtype=np.int64)
+        np.add.at(groupCounts, inverse, counts)
+        groupEnds = np.cumsum(groupCounts)
+
+        served = np.where(groupEnds[inverse] <= n, counts, 0)
+        partial = np.flatnonzero((groupEnds - groupCounts < n) & (groupEnds > n))
+        for group in partial:
+            inGroup = np.flatnonzero(inverse == group)
+            served[inGroup] = self.Rng.multivariate_hypergeometric(
+                counts[inGroup], n - (groupEnds[group] - groupCounts[group]))
+
+        rows = self.__split(queued, served)
+        if self.Waits != None:
+            self.Waits.add('QueueToTest', t, self.Stage[rows], t - self.QueuedAt[rows], self.Count[rows])
+        self.__dequeue(rows)
+
+        infected = rows[self.Stage[rows] == INFECTED]
+        if self.TTestResult == 0:
+            if self.Waits != None:
+                self.Waits.add('TestToIsolation', t, INFECTED, np.zeros(len(infected)), self.Count[infected])
+            self.IsIsolated[infected] = True
+        else:
+            self.WillIsolate[infected] = True
+            self.IsolateAt[infected] = t + math.ceil(self.TTestResult)
+        return self.count(rows)
+
+    def renegade(self):
+        """Removes everyone that should renegade from the queue, see Person.renegade,
+        and returns how many they are.
+        """
+        rows = np.flatnonzero(self.ShouldRenegade)
+        self.__dequeue(rows)
+        self.ShouldRenegade[rows] = False
+        return self.count(rows)
+
+    def compact(self):
+        """Drops empty cohorts and merges cohorts that have become equal.
+        """
+        keep = self.Count > 0
+        keys = np.column_stack([getattr(self, field)[keep] for field in self.Fields])
+        counts = self.Count[keep]
+
+        # Sorting and comparing neighbours is much faster than np.unique(axis=0) on many columns.
+        order = np.lexsort(keys.T)
+        keys = keys[order]
+        isFirst = np.ones(len(keys), dtype=bool)
+        isFirst[1:] = np.any(keys[1:] != keys[:-1], axis=1)
+        first = np.flatnonzero(isFirst)
+        counts = np.add.reduceat(counts[order], first) if len(first) > 0 else counts
+
+        for (i, field) in enumerate(self.Fields):
+            setattr(self, field, keys[first, i].astype(getattr(self, field).dtype))
+        self.Count = counts
+
+    def __infect(self, rows, counts, t):
+        rows = self.__split(rows, counts)
+        self.Stage[rows] = INFECTED
+        self.InfectiveAt[rows] = t
+        rows, delay = self.__explode(rows, self.Rng.multinomial(self.Count[rows], self.RecoveryPmf))
+        self.RecoverAt[rows] = t + delay
+
+        symptomatic = self.Rng.binomial(self.Count[rows], self.PSymptomatic)
+        rows, willBeSymptomatic = self.__explode(rows, np.column_stack([self.Count[rows] - symptomatic,
+                                                                        symptomatic]))
+        rows = rows[willBeSymptomatic == 1]
+        self.WillBeSymptomatic[rows] = True
+        rows, delay = self.__explode(rows, self.Rng.multinomial(self.Count[rows], self.SymptomaticPmf))
+        self.SymptomaticAt[rows] = t + delay
+
+    def __recover(self, rows):
+        self.Stage[rows] = REMOVED
+        self.IsInfective[rows] = False
+        self.IsSymptomatic[rows] = False
+        self.WillBeSymptomatic[rows] = False
+        self.WillIsolate[rows] = False
+        self.IsIsolated[rows] = False
+        self.InfectiveAt[rows] = NEVER
+        self.SymptomaticAt[rows] = NEVER
+        self.RecoverAt[rows] = NEVER
+        self.IsolateAt[rows] = NEVER
+
+    def __dequeue(self, rows):
+        self.IsQueued[rows] = False
+        self.QueuedAt[rows] = NEVER
+        self.QueuedSymptomatic[rows] = False
+        self.RenegeFrom[rows] = NEVER
+
+    def __split(self, rows, counts):
+        """Moves counts people from each of the rows to new cohorts and returns their rows.
+        """
+        counts = np.asarray(counts, dtype=np.int64).reshape(-1)
+        moving = counts > 0
+        rows, counts = rows[moving], counts[moving]
+        self.Count[rows] -= counts
+        return self.__append(rows, counts)
+
+    def __explode(self, rows, counts):
+        """Replaces every row by one cohort per nonzero column of its row in counts.
+        Returns the new rows and their column indexes.
+        """
+        if len(rows) == 0:
+            return rows, rows
+        i, column = np.nonzero(counts)
+        newRows = self.__append(rows[i], counts[i, column])
+        self.Count[rows] = 0
+        return newRows, column
+
+    def __append(self, sources, counts):
+        n = len(self.Count)
+        for field in self.Fields:
+            values = getattr(self, field)
+            setattr(self, field, np.concatenate([values, values[sources]]))
+        self.Count = np.concatenate([self.Count, counts])
+        return np.arange(n, n+len(sources))
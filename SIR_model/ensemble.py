@@ -0,0 +1,127 @@
+# Monte Carlo ensemble of SIR-model replications
+
+import os
+import multiprocessing
+
+import numpy as np
+
+from .model import Model
+from .aggregator import Aggregator
+
+
+def runReplication(modelClass, parameters, seed, stopWhen=None, cache=None):
+    """Runs one replication and returns its results as an array of shape (days, columns), the
+    number of days it ran, and its WaitRecorder if it records waits. The days after a run
+    stopped early are NaN but for their Time.
+    """
+    model = modelClass(seed=seed, **parameters)
+    model.run(stopWhen, cache)
+    columns = model.ResultColumns
+    values = np.column_stack([columns[c] for c in columns]).astype(float)
+
+    length = len(values)
+    if length < model.NTimeSteps:
+        values = np.vstack([values, np.full((model.NTimeSteps - length, values.shape[1]), np.nan)])
+        values[:, 0] = np.linspace(0, model.Duration, model.NTimeSteps)
+    return list(columns), values, length, model.Parameters, model.Waits
+
+
+def runReplications(modelClass, parameters, seeds, stopWhen=None, cache=None, quantiles=(0.05, 0.5, 0.95),
+                    keepRuns=False):
+    """Runs the replications of some seeds, e.g. in one worker, and returns their Aggregator,
+    their merged WaitRecorder or None, and with keepRuns the parameters and values of every run,
+    only the days it ran.
+    """
+    aggregator = Aggregator(quantiles)
+    waits = None
+    runs = []
+    for seed in seeds:
+        columns, values, length, runParameters, runWaits = runReplication(modelClass, parameters, seed,
+                                                                          stopWhen, cache)
+        aggregator.add(dict(zip(columns, values.T)))
+        if runWaits != None:
+            waits = runWaits if waits == None else waits.merge(runWaits)
+        if keepRuns:
+            runs.append((columns, values[:length], runParameters))
+    return aggregator, waits, runs
+
+
+def runReplicationsTask(arguments):
+    return runReplications(*arguments)
+
+
+class Ensemble:
+    """Runs independent replications of one model configuration across a process pool.
+
+    All keyword arguments except the ones below are passed on to the model.
+    replications: Number of runs.
+    modelClass: Model or an engine with the same arguments, e.g. VectorizedModel.
+    seed: Parent of the independent seed sequences of the replications, None for a random ensemble.
+    processes: Number of worker processes, None for all cores.
+    quantiles: Quantiles to compute per day for every result column.
+    stopWhen: Picklable stop predicate(s) passed to Model.run, see stop_conditions. A run
+              stopped early counts only for the days it ran, and only those are stored.
+    store: ResultStore to which every replication is written, None to keep only the aggregates.
+    cache: ResultCache shared by the workers, see Model.run.
+    With recordWaits=True the realized waits of all replications are merged into Waits.
+    Every worker aggregates its replications in an Aggregator, so memory does not grow with the
+    number of replications. Mean and Std are exact, Quantiles are estimated by the quantile
+    sketches of the Aggregator, see Aggregate for other levels.
+    """
+
+    def __init__(self, replications=100, modelClass=Model, seed=None, processes=None,
+                 quantiles=(0.05, 0.5, 0.95), stopWhen=None, store=None, cache=None, **parameters):
+        self.Replications = int(replications)
+        self.ModelClass = modelClass
+        self.Parameters = parameters
+        self.Processes = processes if processes != None else os.cpu_count()
+        self.QuantileLevels = tuple(quantiles)
+        self.StopWhen = stopWhen
+        self.Store = store
+        self.Cache = cache
+
+        self.Seeds = np.random.SeedSequence(seed).spawn(self.Replications)
+
+        self.Aggregate = None  # Aggregator of all replications
+        self.Mean = None
+        self.Std = None
+        self.Quantiles = None
+        self.Waits = None
+        self.HasRun = False
+
+    def run(self):
+        """Executes all replications and aggregates their results per day.
+        """
+        keepRuns = self.Store != None
+        chunksize = self.Replications if self.Processes == 1 \
+            else max(1, self.Replications // (4*self.Processes))
+        arguments = [(self.ModelClass, self.Parameters, self.Seeds[i:i+chunksize], self.StopWhen, self.Cache,
+                      self.QuantileLevels, keepRuns)
+                     for i in range(0, self.Replications, chunksize)]
+
+        aggregate = Aggregator(self.QuantileLevels)
+        self.Waits = None
+        if self.Processes == 1 or len(arguments) == 1:
+            self.__collect((runReplications(*a) for a in arguments), aggregate)
+        else:
+            with multiprocessing.Pool(self.Processes) as pool:
+                self.__collect(pool.imap(runReplicationsTask, arguments), aggregate)
+        if keepRuns:
+            self.Store.flush()
+
+        self.Aggregate = aggregate
+        self.Mean = aggregate.Mean
+        self.Std = aggregate.Std
+        self.Quantiles = aggregate.Quantiles
+        self.HasRun = True
+
+    def __collect(self, chunks, aggregate):
+        """Merges the aggregates and waits of the chunks of replications as they arrive, in seed order.
+        """
+        seeds = iter(self.Seeds)
+        for (aggregator, waits, runs) in chunks:
+            aggregate.merge(aggregator)
+            if waits != None:
+                self.Waits = waits if self.Waits == None else self.Waits.merge(waits)
+            for (columns, values, parameters) in runs:
+                self.Store.add(dict(zip(columns, values.T)), parameters, next(seeds))
@@ -3,12 +3,27 @@ import numpy as np
 
 class ExpRandomizer:
     """Randomizes random exponentially distributed numbers.
+
+    Standard exponential numbers are drawn from the generator in bulk and scaled by the mean.
     """
 
-    def __init__(self):
-        pass
+    def __init__(self, rng=None, bufferSize=1024):
+        self.Rng = rng if rng != None else np.random.default_rng()
+        self.BufferSize = bufferSize
+        self.Buffer = None
+        self.Position = bufferSize
 
     def fromMean(self, mean):
         """Randomizes with the given mean as expected value.
         """
-        return np.random.exponential(mean)
+        if self.Position == self.BufferSize:
+            self.Buffer = self.Rng.standard_exponential(self.BufferSize)
+            self.Position = 0
+        self.Position += 1
+        return mean*float(self.Buffer[self.Position-1])
+
+    def reset(self):
+        """Drops the buffered numbers, so the next number is drawn from the generator.
+        """
+        self.Buffer = None
+        self.Position = self.BufferSize
@@ -0,0 +1,53 @@
+import numpy as np
+
+from .random_streams import InversionGenerator
+
+
+class IndexedSet:
+    """Set of ids with constant time add, discard and count, and random access for sampling.
+    """
+
+    def __init__(self, ids=()):
+        self.Items = []
+        self.Positions = {}
+        for id in ids:
+            self.add(id)
+
+    def add(self, id):
+        """Adds an id unless it is already a member.
+        """
+        if not id in self.Positions:
+            self.Positions[id] = len(self.Items)
+            self.Items.append(id)
+
+    def discard(self, id):
+        """Removes an id if it is a member, by moving the last member into its place.
+        """
+        position = self.Positions.pop(id, None)
+        if position == None:
+            return
+        last = self.Items.pop()
+        if position < len(self.Items):
+            self.Items[position] = last
+            self.Positions[last] = position
+
+    def sample(self, k, rng):
+        """k distinct random members, drawn with the given numpy Generator.
+        An InversionGenerator chooses among the ids themselves, which costs a copy of the members.
+        """
+        if isinstance(rng, InversionGenerator):
+            return list(rng.choice(np.asarray(self.Items), k, replace=False))
+        return [self.Items[position] for position in
+                rng.choice(len(self.Items), k, replace=False)]
+
+    def __contains__(self, id):
+        return id in self.Positions
+
+    def __len__(self):
+        return len(self.Items)
+
+    def __iter__(self):
+        return iter(self.Items)
+
+    def __getitem__(self, position):
+        return self.Items[position]
@@ -0,0 +1,256 @@
+# SIR Model with M|M|s testing-queue, deterministic mean-field engine
+
+from collections import deque
+import math
+
+import numpy as np
+
+from .model import Model
+from .test_queue import TestQueue
+
+
+def delayHazard(mean, nAges):
+    """Daily hazard h[a] of an event max(Poisson(mean), 1) days after infection,
+    the delay with which Person acts on a Poisson distributed timer.
+    """
+    pmf = np.zeros(nAges)
+    p = math.exp(-mean)
+    for k in range(nAges):
+        if k > 0:
+            p *= mean/k
+        pmf[k] = p
+    pmf[1] += pmf[0]
+    pmf[0] = 0
+
+    survival = 1 - np.concatenate([[0], np.cumsum(pmf)[:-1]])  # P(delay >= a)
+    hazard = np.ones(nAges)
+    hasSurvivors = survival > 1e-12
+    hazard[hasSurvivors] = pmf[hasSurvivors]/survival[hasSurvivors]
+    hazard[0] = 0
+    return np.clip(hazard, 0, 1)
+
+
+class MeanFieldModel(Model):
+    """Deterministic fluid approximation of the SIR-model with M|M|s testing queue.
+
+    Takes the same arguments and produces the same Results as Model, with
+    expected numbers of people instead of sampled ones. Infected people are
+    tracked by age since infection, so that symptom onset and recovery follow
+    the same Poisson delays as Person. The queue is a fluid M|M|s queue served
+    at servers/serverMu people per day. Queued people are kept by the day they
+    were queued, and the days are served in the order of the policy, FIFO oldest
+    first, LIFO newest first and SymptomaticFirst the infected before the false
+    symptomatic; people queued on the same day are served in proportion, as
+    CohortModel serves them in random order. Callable prioritization keys are not
+    supported. False recovery follows the Poisson delay of Person from the day of
+    queueing, reneging uses a constant daily hazard with the same mean, and only
+    susceptibles that are not queued are infected.
+    """
+
+    ResultCountType = np.float64
+    WaitKinds = ()  # Fractions of people do not wait individually
+    SupportsEventDriven = False  # Every age is advanced every day
+
+    def initializePopulation(self):
+        nAges = self.NTimeSteps + 2
+        self.RecoveryHazard = delayHazard(self.TRecovery, nAges)
+        self.SymptomHazard = delayHazard(self.TSymptomatic, nAges)
+        self.FalseRecoveryHazard = delayHazard(self.TFalseRecovery, nAges)
+
+    def beginRun(self):
+        nAges = self.NTimeSteps + 2
+        self.Queue = TestQueue(self.NServers, self.ServerMu,
+                               self.QueuePrioritization, self.Rng)
+        self.Capacity = self.NServers/self.ServerMu if self.NServers > 0 else 0
+        self.TestResultDays = int(np.ceil(self.TTestResult))
+
+        # Queued people by the day they were queued, the infected also by age.
+        self.IQueued = np.zeros((self.NTimeSteps, nAges))
+        self.SQueuedSymptomatic = np.zeros(self.NTimeSteps)  # With false symptoms
+        self.SQueuedRecovered = np.zeros(self.NTimeSteps)  # After false recovery
+        self.RQueued = np.zeros(self.NTimeSteps)
+        self.LiveRows = slice(0, 1)  # Queue days that can hold infected, see __liveRows
+
+        # Susceptible that are not queued.
+        self.S = float(self.InitialSusceptible)
+
+        # Infected by age in days since infection; the initial infected are infected on day 0.
+        self.PreSymptomatic = np.zeros(nAges)
+        self.Asymptomatic = np.zeros(nAges)
+        self.IIsolated = np.zeros(nAges)
+        self.IAwaitingResult = deque()  # oldest test day first
+        self.PreSymptomatic[0] = self.InitialInfected*self.PSymptomatic
+        self.Asymptomatic[0] = self.InitialInfected*(1-self.PSymptomatic)
+        # The initial infected are infective from day 0, people infected later from the day after.
+        self.FirstInfectiveAge = 0
+
+        self.R = float(self.InitialRemoved)
+
+    def applyParameters(self):
+        running = getattr(self, 'Queue', None) != None
+        nAges = len(self.PreSymptomatic) if running else self.NTimeSteps + 2
+        self.RecoveryHazard = delayHazard(self.TRecovery, nAges)
+        self.SymptomHazard = delayHazard(self.TSymptomatic, nAges)
+        self.FalseRecoveryHazard = delayHazard(self.TFalseRecovery, nAges)
+        if running:
+            self.Capacity = self.NServers/self.ServerMu if self.NServers > 0 else 0
+            self.TestResultDays = int(np.ceil(self.TTestResult))
+            missing = self.NTimeSteps - len(self.RQueued)
+            if missing > 0:  # A longer run queues on more days
+                self.IQueued = np.pad(self.IQueued, ((0, missing), (0, 0)))
+                for name in ['SQueuedSymptomatic', 'SQueuedRecovered', 'RQueued']:
+                    setattr(self, name, np.pad(getattr(self, name), (0, missing)))
+            # Results that are due sooner with the new delay arrive at once.
+            while len(self.IAwaitingResult) > self.TestResultDays:
+                self.IIsolated += self.IAwaitingResult.popleft()
+
+    def simulateDay(self, t):
+        day = int(t)
+        self.FirstInfectiveAge = 1
+
+        # Advance people
+        self.PreSymptomatic = self.__older(self.PreSymptomatic)
+        self.Asymptomatic = self.__older(self.Asymptomatic)
+        self.LiveRows = rows = self.__liveRows(day)
+        self.IQueued[rows] = self.__older(self.IQueued[rows])
+        self.IIsolated = self.__older(self.IIsolated)
+        self.IAwaitingResult = deque(self.__older(a) for a in self.IAwaitingResult)
+
+        # False symptoms start on the day of queueing.
+        daysQueued = np.clip(day - np.arange(len(self.SQueuedSymptomatic)), 0, len(self.FalseRecoveryHazard)-1)
+        falseRecovering = self.SQueuedSymptomatic*self.FalseRecoveryHazard[daysQueued]
+        self.SQueuedSymptomatic -= falseRecovering
+        self.SQueuedRecovered += falseRecovering
+
+        becomesSymptomatic = self.PreSymptomatic*self.SymptomHazard
+        self.PreSymptomatic -= becomesSymptomatic
+        self.IQueued[day] += becomesSymptomatic
+
+        if self.TestResultDays > 0 and len(self.IAwaitingResult) == self.TestResultDays:
+            self.IIsolated += self.IAwaitingResult.popleft()
+
+        for compartment in [self.PreSymptomatic, self.Asymptomatic, self.IIsolated] + list(self.IAwaitingResult):
+            recovering = compartment*self.RecoveryHazard
+            compartment -= recovering
+            self.R += recovering.sum()
+        recovering = self.IQueued[rows]*self.RecoveryHazard
+        self.IQueued[rows] -= recovering
+        self.RQueued[rows] += recovering.sum(axis=1)
+
+        # Infect
+        S_to_I = min(self.S, self.RateSI*self.__susceptible()*self.__infectiveUnisolated()
+                     / self.TotalIndividuals)
+        self.S -= S_to_I
+        self.PreSymptomatic[0] += S_to_I*self.PSymptomatic
+        self.Asymptomatic[0] += S_to_I*(1-self.PSymptomatic)
+
+        # False symptoms, queued right away
+        S_to_FalseSymptoms = self.S*self.PFalseSymptoms
+        self.S -= S_to_FalseSymptoms
+        self.SQueuedSymptomatic[day] += S_to_FalseSymptoms
+
+        # Test
+        servedInfected, servedOthers = self.__servedFractions()
+        tested = self.IQueued[rows]*servedInfected[rows, None]
+        self.IQueued[rows] -= tested
+        tested = tested.sum(axis=0)
+        if self.TestResultDays == 0:
+            self.IIsolated += tested
+        else:
+            self.IAwaitingResult.append(tested)
+
+        self.S += ((self.SQueuedSymptomatic + self.SQueuedRecovered)*servedOthers).sum()
+        self.SQueuedSymptomatic *= 1-servedOthers
+        self.SQueuedRecovered *= 1-servedOthers
+        self.R += (self.RQueued*servedInfected).sum()
+        self.RQueued *= 1-servedInfected
+
+        # Renegade
+        if self.TReneging != None:
+            pRenegade = 1 - math.exp(-1/self.TReneging) if self.TReneging > 0 else 1
+            self.S += self.SQueuedRecovered.sum()*pRenegade
+            self.SQueuedRecovered *= 1-pRenegade
+            self.R += self.RQueued.sum()*pRenegade
+            self.RQueued *= 1-pRenegade
+
+    def recordDay(self, results):
+        awaitingResult = sum(a.sum() for a in self.IAwaitingResult)
+        infectedQueued = self.IQueued[self.LiveRows].sum()
+        susceptibleQueued = self.SQueuedSymptomatic.sum() + self.SQueuedRecovered.sum()
+        removedQueued = self.RQueued.sum()
+        queued = susceptibleQueued + infectedQueued + removedQueued
+        expectedWaitQueue = self.Queue.expectedQueueTime(queued)
+
+        asymptomatic = self.PreSymptomatic.sum() + self.Asymptomatic.sum()
+        results.addRow({
+            'Susceptible': self.__susceptible(),
+            'Infected': asymptomatic + infectedQueued + awaitingResult + self.IIsolated.sum(),
+            'Removed': self.R + removedQueued,
+            'InfectedAsymptomaticUnisolated': asymptomatic,
+            'InfectedSymptomaticUnisolated': infectedQueued + awaitingResult,
+            'InfectedIsolated': self.IIsolated.sum(),
+            'InfectedInfectiveUnisolated': self.__infectiveUnisolated(),
+            'Queued': queued,
+            'SusceptibleQueued': susceptibleQueued,
+            'InfectedQueued': infectedQueued,
+            'RemovedQueued': removedQueued,
+            'ExpectedWaitQueue': expectedWaitQueue,
+            'ExpecteWaitTotal': self.TTestResult + self.ServerMu + expectedWaitQueue,
+        })
+
+    def __servedFractions(self):
+        """Fractions of the infected and of the other people queued on every day that are
+        tested today. The capacity serves the days in the order of the prioritization policy,
+        the last one partially. Infected that recover in the queue keep their place.
+        """
+        infectedQueued = self.RQueued.copy()
+        infectedQueued[self.LiveRows] += self.IQueued[self.LiveRows].sum(axis=1)
+        othersQueued = self.SQueuedSymptomatic + self.SQueuedRecovered
+        if self.QueuePrioritization == 'FIFO':
+            served = self.__serve(infectedQueued + othersQueued)
+            return served, served
+        elif self.QueuePrioritization == 'LIFO':
+            served = self.__serve((infectedQueued + othersQueued)[::-1])[::-1]
+            return served, served
+        elif self.QueuePrioritization == 'SymptomaticFirst':
+            served = self.__serve(np.concatenate([infectedQueued, othersQueued]))
+            return served[:len(infectedQueued)], served[len(infectedQueued):]
+        else:
+            raise Exception(
+                f"Prioritization [{self.QueuePrioritization}] is not valid.")
+
+    def __serve(self, queued):
+        """Served fraction of every group of queued people, the capacity serving the groups
+        first to last.
+        """
+        before = np.cumsum(queued) - queued
+        served = np.zeros(len(queued))
+        np.divide(self.Capacity - before, queued, out=served, where=queued > 0)
+        return np.clip(served, 0, 1)
+
+    def __liveRows(self, day):
+        """The queue days up to day that can still hold infected, as every infected has
+        recovered at the first age with a recovery hazard of 1.
+        """
+        isCertain = self.RecoveryHazard >= 1
+        recoveredAge = int(np.argmax(isCertain)) if isCertain.any() else len(self.RecoveryHazard)
+        return slice(max(0, day - recoveredAge), day + 1)
+
+    def __susceptible(self):
+        return self.S + self.SQueuedSymptomatic.sum() + self.SQueuedRecovered.sum()
+
+    def __infectiveUnisolated(self):
+        """Unisolated infected that are infective, see FirstInfectiveAge.
+        """
+        unisolated = self.PreSymptomatic + self.Asymptomatic + self.IQueued[self.LiveRows].sum(axis=0)
+        for a in self.IAwaitingResult:
+            unisolated = unisolated + a
+        return unisolated[self.FirstInfectiveAge:].sum()
+
+    def __older(self, byAge):
+        """Ages people one day, the oldest age collecting everyone older.
+        """
+        older = np.zeros_like(byAge)
+        older[..., 1:] = byAge[..., :-1]
+        older[..., -1] += byAge[..., -1]
+        return older
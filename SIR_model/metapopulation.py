@@ -0,0 +1,325 @@
+# Metapopulation of SIR-model regions sharing testing capacity
+
+import os
+import traceback
+import multiprocessing
+
+import numpy as np
+
+from .vectorized_model import VectorizedModel
+from .cohort_model import CohortModel
+from .test_queue import TestQueue
+
+
+class RegionMixin:
+    """Turns an engine into a region of a Metapopulation.
+
+    The metapopulation sets, before every day, the infection pressure from the
+    other regions and, with shared testing, the number of people the region may
+    test that day.
+    """
+
+    SelfMixing = 1.  # Share of the contacts of the region's people within the region
+    ExternalPrevalence = 0.  # Mixing-weighted share of infective people in the other regions
+    TestCapacity = None  # People the region may test today, None for its own servers
+
+    def newInfections(self, nSusceptible, nInfectiveUnisolated):
+        prevalence = self.SelfMixing*nInfectiveUnisolated/self.TotalIndividuals + self.ExternalPrevalence
+        return int(np.round(self.RateSI * nSusceptible * prevalence))
+
+    def testCapacity(self):
+        if self.TestCapacity != None:
+            return self.TestCapacity
+        return super().testCapacity()
+
+    def queuedGroups(self):
+        """Day queued, whether symptomatic when queued and number of people of every group
+        of people in the queue.
+        """
+        queuedAt, symptomatic, counts = self.queuedPeople()
+        # Queue days are whole days, so one key holds both, much faster to group than two columns.
+        keys, inverse = np.unique(2*queuedAt + symptomatic, return_inverse=True)
+        groupCounts = np.bincount(inverse.reshape(-1), weights=counts, minlength=len(keys))
+        return np.floor(keys/2), keys % 2 == 1, groupCounts.astype(np.int64)
+
+
+class VectorizedRegion(RegionMixin, VectorizedModel):
+
+    def queuedPeople(self):
+        population = self.Population
+        ids = np.flatnonzero(population.IsQueued)
+        return population.QueuedAt[ids], population.QueuedSymptomatic[ids], np.ones(len(ids), dtype=np.int64)
+
+
+class CohortRegion(RegionMixin, CohortModel):
+
+    def queuedPeople(self):
+        cohorts = self.Cohorts
+        rows = np.flatnonzero(cohorts.IsQueued & (cohorts.Count > 0))
+        return cohorts.QueuedAt[rows].astype(float), cohorts.QueuedSymptomatic[rows], cohorts.Count[rows]
+
+
+RegionClasses = {
+    VectorizedModel: VectorizedRegion,
+    CohortModel: CohortRegion,
+}
+
+
+def allocateCapacity(capacity, queues, populations, prioritisation, rng):
+    """Splits the test capacity of a shared pool between regions as one queue would serve them.
+
+    queues: Per region, the queued groups of RegionMixin.queuedGroups.
+    Capacity left when every queued person is served goes to the regions in
+    proportion to their people queued on the last day, or their populations,
+    for the people they queue before testing.
+    """
+    nRegions = len(queues)
+    region = np.concatenate([np.full(len(q[2]), i) for (i, q) in enumerate(queues)])
+    queuedAt = np.concatenate([q[0] for q in queues])
+    symptomatic = np.concatenate([q[1] for q in queues])
+    counts = np.concatenate([q[2] for q in queues]).astype(np.int64)
+
+    if prioritisation == 'FIFO':
+        order = queuedAt
+    elif prioritisation == 'LIFO':
+        order = -queuedAt
+    elif prioritisation == 'SymptomaticFirst':
+        order = np.column_stack([~symptomatic, queuedAt])
+    else:
+        raise Exception(
+            f"Prioritization [{prioritisation}] is not valid for a metapopulation.")
+
+    allocated = np.zeros(nRegions, dtype=np.int64)
+    remaining = capacity
+    if len(counts) > 0:
+        groups, inverse = np.unique(order, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        for group in range(len(groups)):
+            inGroup = np.flatnonzero(inverse == group)
+            waiting = counts[inGroup].sum()
+            served = counts[inGroup] if waiting <= remaining \
+                else rng.multivariate_hypergeometric(counts[inGroup], remaining)
+            np.add.at(allocated, region[inGroup], served)
+            remaining -= served.sum()
+            if remaining == 0:
+                break
+
+    if remaining > 0:
+        newest = queuedAt == queuedAt.max() if len(queuedAt) > 0 else np.zeros(0, dtype=bool)
+        weights = np.bincount(region[newest], weights=counts[newest], minlength=nRegions)
+        if weights.sum() == 0:
+            weights = np.asarray(populations, dtype=float)
+        allocated += rng.multinomial(remaining, weights/weights.sum())
+    return allocated
+
+
+class RegionWorker:
+    """Steps a group of regions one day at a time.
+    """
+
+    def __init__(self, regions):
+        """regions: Region index, region class, parameters, seed and self mixing of every region.
+        """
+        self.Models = {}
+        self.Steps = {}
+        for (index, regionClass, parameters, seed, selfMixing) in regions:
+            model = regionClass(seed=seed, **parameters)
+            model.SelfMixing = selfMixing
+            self.Models[index] = model
+            self.Steps[index] = model.steps()
+
+    def step(self, inputs):
+        """Simulates the next day, the first call day 0, of every region with the given
+        (external prevalence, test capacity) and returns the state the others need.
+        """
+        reports = {}
+        for (index, model) in self.Models.items():
+            model.ExternalPrevalence, model.TestCapacity = inputs.get(index, (0., None))
+            row = next(self.Steps[index])
+            reports[index] = (row['InfectedInfectiveUnisolated'], model.TotalIndividuals,
+                              model.queuedGroups())
+        return reports
+
+    def finish(self):
+        """Ends the runs and returns the result columns of every region.
+        """
+        for steps in self.Steps.values():
+            steps.close()
+        return {index: model.ResultColumns for (index, model) in self.Models.items()}
+
+    def send(self, inputs):
+        self.Reply = self.finish() if inputs is None else self.step(inputs)
+
+    def recv(self):
+        return self.Reply
+
+
+class RegionFailure:
+    """Reply of a worker process whose regions raised an exception, re-raised by the metapopulation.
+    """
+
+    def __init__(self, error):
+        self.Error = error
+        self.Traceback = traceback.format_exc()
+
+
+def serveRegions(connection, regions):
+    """Worker process loop: steps the regions for every inputs received until None is received.
+    An exception is sent back as a RegionFailure, which ends the loop.
+    """
+    try:
+        worker = RegionWorker(regions)
+        while True:
+            inputs = connection.recv()
+            worker.send(inputs)
+            connection.send(worker.recv())
+            if inputs is None:
+                break
+    except Exception as e:
+        connection.send(RegionFailure(e))
+    finally:
+        connection.close()
+
+
+class Metapopulation:
+    """Regional populations with mixing between them, stepped in parallel, that test
+    in one shared pool or in their own pools.
+
+    regions: Per region, a dict of the model arguments that differ from the common
+        ones, e.g. [{'susceptible': 50000, 'rateSI': 0.2}, {'susceptible': 8000}].
+    mixing: Matrix where mixing[i][j] is the share of the contacts of people in region i
+        that are with people in region j, rows summing to 1. None for separate regions.
+    testing: 'shared' for one pool of servers and serverMu serving the queues of all
+        regions together, 'regional' for every region testing with its own servers.
+    modelClass: VectorizedModel or CohortModel.
+    processes: Number of worker processes, None for one per region up to the number of cores.
+    All other keyword arguments are passed on to every region.
+
+    The regions exchange state once per simulated day: the infection pressure
+    between regions and the split of the shared capacity are computed from
+    the state at the end of the previous day.
+    """
+
+    def __init__(self, regions, mixing=None, testing='shared', duration=100, servers=1, serverMu=1/10,
+                 queuePrioritization='FIFO', modelClass=VectorizedModel, seed=None, processes=None,
+                 **parameters):
+        if testing not in ['shared', 'regional']:
+            raise Exception(f"Testing [{testing}] is not valid.")
+        if modelClass not in RegionClasses:
+            raise Exception(f"Model class [{modelClass.__name__}] can not be a region.")
+
+        self.NRegions = len(regions)
+        self.Testing = testing
+        self.Duration = int(duration)
+        self.QueuePrioritization = queuePrioritization
+        self.RegionClass = RegionClasses[modelClass]
+        self.Processes = processes if processes != None else min(os.cpu_count(), self.NRegions)
+
+        common = {**parameters, 'duration': duration, 'servers': servers, 'serverMu': serverMu,
+                  'queuePrioritization': queuePrioritization}
+        self.RegionParameters = [{**common, **region} for region in regions]
+
+        self.Mixing = np.eye(self.NRegions) if mixing is None else np.asarray(mixing, dtype=float)
+        if self.Mixing.shape != (self.NRegions, self.NRegions):
+            raise Exception("Mixing must be a square matrix with one row per region.")
+
+        seedSequence = np.random.SeedSequence(seed)
+        self.Seeds = seedSequence.spawn(self.NRegions)
+        self.Rng = np.random.default_rng(seedSequence.spawn(1)[0])
+        self.SharedQueue = TestQueue(servers, serverMu, queuePrioritization, self.Rng)
+
+        self.RegionResults = None
+        self.Results = None
+        self.HasRun = False
+
+    def run(self):
+        """Executes the regions day by day and collects their results and the totals.
+        """
+        import pandas as pd
+        regions = [(i, self.RegionClass, self.RegionParameters[i], self.Seeds[i], self.Mixing[i, i])
+                   for i in range(self.NRegions)]
+        groups = [regions[k::self.Processes] for k in range(self.Processes)]
+
+        processes = []
+        if self.Processes == 1:
+            workers = [RegionWorker(regions)]
+        else:
+            workers = []
+            for group in groups:
+                parent, child = multiprocessing.Pipe()
+                process = multiprocessing.Process(target=serveRegions, args=(child, group))
+                process.start()
+                child.close()  # So recv fails instead of blocking if the worker dies
+                workers.append(parent)
+                processes.append(process)
+
+        try:
+            inputs = {}
+            for day in range(self.Duration+1):
+                reports = self.__exchange(workers, inputs)
+                inputs = self.__nextInputs(reports)
+            columns = self.__exchange(workers, None)
+            for process in processes:
+                process.join()
+        finally:
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+                    process.join()
+            for worker in workers[:len(processes)]:
+                worker.close()
+
+        self.RegionResults = [pd.DataFrame(columns[i]) for i in range(self.NRegions)]
+        self.Results = self.__totals()
+        self.HasRun = True
+
+    def __exchange(self, workers, inputs):
+        """Sends the inputs to all workers before collecting their replies, so they work in parallel.
+        """
+        for worker in workers:
+            worker.send(inputs)
+        replies = {}
+        for worker in workers:
+            reply = worker.recv()
+            if isinstance(reply, RegionFailure):
+                raise reply.Error from Exception(f"In a region worker:\n{reply.Traceback}")
+            replies.update(reply)
+        return replies
+
+    def __nextInputs(self, reports):
+        """The external prevalence and test capacity of every region for the next day.
+        """
+        infective = np.array([reports[i][0] for i in range(self.NRegions)], dtype=float)
+        populations = np.array([reports[i][1] for i in range(self.NRegions)], dtype=float)
+        prevalence = infective/populations
+        external = self.Mixing @ prevalence - np.diag(self.Mixing)*prevalence
+
+        capacities = [None]*self.NRegions
+        if self.Testing == 'shared':
+            capacities = allocateCapacity(self.SharedQueue.simulateCapacity(),
+                                          [reports[i][2] for i in range(self.NRegions)],
+                                          populations, self.QueuePrioritization, self.Rng)
+            capacities = [int(c) for c in capacities]
+        return {i: (external[i], capacities[i]) for i in range(self.NRegions)}
+
+    def __totals(self):
+        """The sum over all regions of every count column, with the waiting times of
+        the shared pool or the queue-weighted mean of the regional ones.
+        """
+        totals = sum(r.drop(columns=['Time']) for r in self.RegionResults)
+        totals.insert(0, 'Time', self.RegionResults[0]['Time'])
+        for column in ['ExpectedWaitTestResult', 'ExpectedWaitService']:
+            totals[column] = self.RegionResults[0][column]
+
+        if self.Testing == 'shared':
+            waitQueue = [self.SharedQueue.expectedQueueTime(q) for q in totals['Queued']]
+        else:
+            queued = np.array([r['Queued'] for r in self.RegionResults], dtype=float)
+            waits = np.array([r['ExpectedWaitQueue'] for r in self.RegionResults])
+            with np.errstate(invalid='ignore'):
+                waitQueue = np.where(queued.sum(axis=0) > 0,
+                                     (queued*waits).sum(axis=0)/queued.sum(axis=0), 0)
+        totals['ExpectedWaitQueue'] = waitQueue
+        totals['ExpecteWaitTotal'] = totals['ExpectedWaitTestResult'] + totals['ExpectedWaitService'] \
+            + totals['ExpectedWaitQueue']
+        return totals
@@ -1,22 +1,46 @@
 # SIR Model with M|M|s testing-queue
 
-import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-import random
 
 from .person import Person
+from .poisson_randomizer import PoissonRandomizer
+from .exp_randomizer import ExpRandomizer
+from .uniform_randomizer import UniformRandomizer
 from .test_queue import TestQueue
 from .model_id_state import ModelIdState
+from .scheduler import EventScheduler
 from .result import Result
-from .file_opener import openFile
+from .random_streams import RandomStreams, RandomNumbers
+from .profiler import PhaseProfiler, NullProfiler
+from .checkpoint import Snapshot
+from .waits import WaitRecorder, WaitKinds
+from .plotting import ModelPlots
 
 
-class Model:
+class Model(ModelPlots):
     """SIR-model with M|M|s testing queue.
+
+    Only needs NumPy to run. Results is built as a pandas DataFrame on first
+    access and the plot helpers of ModelPlots import matplotlib on first use.
     """
 
+    ResultCountType = np.int64
+
+    # Kinds of realized waits the engine records with recordWaits=True, see WaitRecorder.
+    WaitKinds = WaitKinds
+
+    # Whether the engine can advance only people with a timer due, see eventDriven.
+    SupportsEventDriven = True
+
+    # Arguments that can be changed during a run or when restoring a checkpoint, see changeParameters.
+    ChangeableParameters = ['duration', 'rateSI', 'pSymptomatic', 'tSymptomatic', 'tRecovery',
+                            'pFalseSymptoms', 'tFalseRecovery', 'servers', 'serverMu', 'tTestResult',
+                            'queuePrioritization', 'tReneging']
+
+    # Attributes that are not part of a checkpoint, as they only describe the finished run.
+    TransientAttributes = ['Profiler', 'ResultColumns', '_Model__result', '_Model__results',
+                           '_Model__profile', '_Model__running', '_Model__resume']
+
     def __init__(self, duration=100,  # days
                  susceptible=1000, infected=50, removed=0,  # initial
                  rateSI=0.14,  # per timeStep
@@ -25,10 +49,25 @@ class Model:
                  servers=1, serverMu=1/10,  # serverMu: day/person
                  tTestResult=1, queuePrioritization='FIFO',
                  tReneging=2,  # days, after revovery, None for no reneging
-                 seed=None  # Specify with int for consistent result
+                 seed=None,  # Specify with int or SeedSequence for consistent result
+                 randomNumbers='single',  # 'common' or 'antithetic' for paired comparisons, see RandomStreams
+                 debug=False,  # Verifies the tracked state every update, slow
+                 eventDriven=False,  # Advances only people with a timer due
+                 profile=False,  # Records time and events per phase and day, see Profile
+                 recordWaits=False  # Records the realized waits of the people, see Waits
                  ):
         """Runs automatically when a model object is created.
         """
+        # The arguments that determine the simulated epidemic, e.g. for storing results.
+        self.Parameters = dict(duration=duration,
+                               susceptible=susceptible, infected=infected, removed=removed,
+                               rateSI=rateSI,
+                               pSymptomatic=pSymptomatic, tSymptomatic=tSymptomatic, tRecovery=tRecovery,
+                               pFalseSymptoms=pFalseSymptoms, tFalseRecovery=tFalseRecovery,
+                               servers=servers, serverMu=serverMu,
+                               tTestResult=tTestResult, queuePrioritization=queuePrioritization,
+                               tReneging=tReneging, randomNumbers=randomNumbers)
+
         self.Duration = int(duration)
         self.NTimeSteps = int(duration+1)
 
@@ -50,254 +89,396 @@ class Model:
         self.QueuePrioritization = queuePrioritization
         self.TReneging = tReneging
 
-        self.Results = None
+        self.Debug = debug
+        self.EventDriven = eventDriven
+        self.Profiling = profile
+        self.Profiler = NullProfiler()
+
+        self.ResultColumns = None  # Column name: NumPy array, after the run
+        self.__result = None
+        self.__results = None
+        self.__profile = None
+        self.__running = None  # Result of the run in progress
+        self.__resume = None  # Result to continue from, see fromCheckpoint
         self.HasModelRun = False
+        self.Forked = False  # Continued from a checkpoint or changed during the run, so not cacheable
+
+        # Every model draws from its own stream, so models can run side by side.
+        self.Seed = seed
+        self.SeedSequence = seed if isinstance(seed, np.random.SeedSequence) \
+            else np.random.SeedSequence(seed)
+        if randomNumbers not in RandomNumbers:
+            raise Exception(f"Random numbers [{randomNumbers}] is not valid.")
+        self.RandomNumbers = randomNumbers
+        if randomNumbers == 'single':
+            self.Streams = None
+            self.Rng = np.random.default_rng(self.SeedSequence)
+            self.ServerRngs = None
+        else:
+            # People and servers draw from separate streams, restarted every day.
+            self.Streams = RandomStreams(self.SeedSequence, servers, randomNumbers == 'antithetic')
+            self.Rng = self.Streams.People
+            self.ServerRngs = self.Streams.Servers
+
+        if eventDriven and not self.SupportsEventDriven:
+            raise Exception(f"{type(self).__name__} does not run event driven.")
+        if recordWaits and not self.WaitKinds:
+            raise Exception(f"{type(self).__name__} does not record waits.")
+        self.Waits = WaitRecorder() if recordWaits else None
+
+        self.Randomizers = []  # Buffered randomizers, emptied when the streams restart
+        self.initializePopulation()
+
+    def spawnSeeds(self, n):
+        """n independent child seed sequences, e.g. for parallel runs derived from this model's seed.
+        """
+        return self.SeedSequence.spawn(n)
 
-        if seed != None:
-            np.random.seed(seed)
+    def initializePopulation(self):
+        """Creates the individuals of the model. Overridden by alternative engines.
+        """
+        poissonRandomizer = PoissonRandomizer(self.Rng)
+        expRandomizer = ExpRandomizer(self.Rng)
+        uniformRandomizer = UniformRandomizer(self.Rng)
+        self.Randomizers = [poissonRandomizer, expRandomizer, uniformRandomizer]
+
+        def people(stage, n):
+            return [Person(stage, self.PSymptomatic, self.TSymptomatic, self.TRecovery,
+                           self.TFalseRecovery, self.TTestResult, self.TReneging,
+                           poissonRandomizer, expRandomizer, uniformRandomizer)
+                    for i in range(n)]
+
+        self.People = people("S", self.InitialSusceptible) \
+            + people("I", self.InitialInfected) \
+            + people("R", self.InitialRemoved)
+        for i, person in enumerate(self.People):
+            person.Id = i
+            person.Waits = self.Waits
+
+    def run(self, stopWhen=None, cache=None):
+        """Executes the simulation.
+        stopWhen: Predicate, or list of predicates, of a day's result row, see stop_conditions.
+                  The run ends after the first day for which one is true.
+        cache: ResultCache to look up and store the results of a seeded model run without stopWhen.
+               On a hit only the results are restored, the people are not simulated.
+        """
+        useCache = cache != None and stopWhen == None and cache.canStore(self)
+        if useCache and cache.load(self):
+            return
 
-        self.People = [Person("S", pSymptomatic, tSymptomatic, tRecovery, tFalseRecovery, tTestResult, tReneging)
-                       for i in range(susceptible)] \
-            + [Person("I", pSymptomatic, tSymptomatic, tRecovery, tFalseRecovery, tTestResult, tReneging)
-               for i in range(infected)] \
-            + [Person("R", pSymptomatic, tSymptomatic, tRecovery, tFalseRecovery, tTestResult, tReneging)
-               for i in range(removed)]
+        for row in self.steps(stopWhen):
+            pass
 
-    def run(self):
-        """Executes the simulation.
+        if useCache:
+            cache.store(self)
+
+    def steps(self, stopWhen=None):
+        """Executes the simulation one day at a time and yields the result row of every day,
+        starting with day 0, as a dict of column name and value.
+        Results holds the days simulated so far when the generator is closed early.
         """
-        for person in self.People:
-            person.advance(0)
-        queue = TestQueue(self.NServers, self.ServerMu,
-                          self.QueuePrioritization)
-        state = ModelIdState(self.People, queue)
+        if stopWhen == None:
+            predicates = []
+        elif callable(stopWhen):
+            predicates = [stopWhen]
+        else:
+            predicates = list(stopWhen)
 
-        ts = np.linspace(0, self.Duration, self.NTimeSteps)
         self.StartTime = 0
         self.EndTime = self.Duration
-        results = Result({"Time": ts,
-                          "ExpectedWaitTestResult": [self.TTestResult for i in range(len(ts))],
-                          "ExpectedWaitService": [self.ServerMu for i in range(len(ts))]})
-        self.__addResults(results, state)
-
-        for t in ts[1:]:
-            # Advance people
+        resume = self.__resume
+        self.__resume = None
+        if resume == None:
+            results = Result(self.NTimeSteps, self.ResultCountType)
+            results.fill('Time', np.linspace(0, self.Duration, self.NTimeSteps))
+            results.fill('ExpectedWaitTestResult', self.TTestResult)
+            results.fill('ExpectedWaitService', self.ServerMu)
+        else:
+            results = resume
+        self.Profiler = PhaseProfiler(self.NTimeSteps) if self.Profiling else NullProfiler()
+        profiler = self.Profiler
+        self.__running = results
+
+        try:
+            if resume == None:
+                if self.Waits != None:
+                    self.Waits.clear()
+                profiler.beginDay(0)
+                self.beginRun()
+                profiler.mark('beginRun')
+                self.recordDay(results)
+                profiler.mark('record')
+                row = results.row(0)
+                yield row
+            else:
+                # Restored from a checkpoint, continues after the last recorded day.
+                row = results.row(results.Length-1)
+
+            while results.Length < self.NTimeSteps:
+                if any(isStopping(row) for isStopping in predicates):
+                    break
+                t = results.Arrays['Time'][results.Length]
+                profiler.beginDay(results.Length)
+                self.beginDay(results.Length)
+                self.simulateDay(t)
+                if self.Waits != None:
+                    self.Waits.endDay(results.Length)
+                profiler.mark('other')
+                self.recordDay(results)
+                profiler.mark('record')
+                row = results.row(results.Length-1)
+                yield row
+        finally:
+            self.__running = None
+            self.finishRun(results)
+
+    def beginRun(self):
+        """Prepares the people, the queue and the state tracking for day 0.
+        """
+        for person in self.People:
+            person.advance(0)
+        self.Scheduler = None
+        if self.EventDriven:
+            self.Scheduler = EventScheduler()
             for person in self.People:
-                person.advance(t)
-            state.updateState(self.People, queue)
-
-            # Infect
-            S_to_I_count = int(np.round((self.RateSI * len(state.SusceptibleIDs) * len(state.InfectedInfectiveUnisolatedIDs)) /
-                                        self.TotalIndividuals))
-            if S_to_I_count > 0:
-                S_to_I_Ids = random.sample(state.SusceptibleIDs, S_to_I_count)
-                for i in S_to_I_Ids:
-                    self.People[i].infect(t)
-            state.updateState(self.People, queue)
-
-            # False symptoms
-            S_to_FalseSymptoms_count = int(
-                np.round(len(state.SusceptibleNotQueuedIDs)*self.PFalseSymptoms))
-            if S_to_FalseSymptoms_count > 0:
-                S_to_FalseSymptoms_Ids = random.sample(
-                    state.SusceptibleNotQueuedIDs, S_to_FalseSymptoms_count)
-                for i in S_to_FalseSymptoms_Ids:
-                    self.People[i].falseSymptomsInfect(t)
-            state.updateState(self.People, queue)
-
-            # Queue
-            for i, person in enumerate(self.People):
-                if person.ShouldQueue:
-                    person.queue(t)
-                    queue.put(i)
-            state.updateState(self.People, queue)
-
-            # Test
-            for i in queue.simulateDay():
-                self.People[i].test(t)
-            state.updateState(self.People, queue)
-
-            # Renegade
-            idsToRenegade = set()
-            for i, person in enumerate(self.People):
-                if person.ShouldRenegade:
-                    idsToRenegade.add(i)
-                    person.renegade(t)
-            queue.renegade(idsToRenegade)
-            state.updateState(self.People, queue)
-
-            self.__addResults(results, state)
-
-        self.Results = pd.DataFrame.from_dict(results.dictionary)
-        self.HasModelRun = True
+                person.Scheduler = self.Scheduler
+                person.scheduleTimers()
+        self.Queue = TestQueue(self.NServers, self.ServerMu,
+                               self.QueuePrioritization, self.Rng, self.ServerRngs)
+        self.State = ModelIdState(self.People, self.Queue, self.Debug)
+
+    def beginDay(self, day):
+        """Restarts the random streams for the day, if the model uses common random numbers.
+        """
+        if self.Streams != None:
+            self.Streams.beginDay(day)
+            for randomizer in self.Randomizers:
+                randomizer.reset()
 
-    def __addResults(self, results, state):
-        """Iterates over the current state and sets appends a value to the corresponding result array.
+    def simulateDay(self, t):
+        """Advances, infects, queues, tests and renegades people for the day t.
         """
-        results['Susceptible'].append(len(state.SusceptibleIDs))
-        results['Infected'].append(len(state.InfectedIDs))
-        results['Removed'].append(len(state.RemovedIDs))
-
-        results['InfectedAsymptomaticUnisolated'].append(
-            len(state.InfectedAsymptomaticUnisolatedIDs))
-        results['InfectedSymptomaticUnisolated'].append(
-            len(state.InfectedSymptomaticUnisolatedIDs))
-        results['InfectedIsolated'].append(len(state.InfectedIsolatedIDs))
-        results['InfectedInfectiveUnisolated'].append(
-            len(state.InfectedInfectiveUnisolatedIDs))
-
-        results['Queued'].append(len(state.QueuedIDs))
-        results['SusceptibleQueued'].append(len(state.SusceptibleQueuedIDs))
-        results['InfectedQueued'].append(len(state.InfectedQueuedIDs))
-        results['RemovedQueued'].append(len(state.RemovedQueuedIDs))
-
-        results['ExpectedWaitQueue'].append(state.ExpectedWaitQueue)
-        results['ExpecteWaitTotal'].append(
-            self.TTestResult + self.ServerMu + state.ExpectedWaitQueue)
-
-    def oneplot(self):
-        return self.subplots(1, 1)
-
-    def subplots(self, nrows, ncols):
-        sns.set_theme(style="darkgrid")
-        fig, axs = plt.subplots(nrows, ncols)
-
-        return fig, axs
-
-    def plot(self, fileName='result.png', shouldOpenFile=True, title='SIR-model with M|M|s testing queue'):
-        """Default plot of the result.
+        queue = self.Queue
+        state = self.State
+        profiler = self.Profiler
+
+        # Advance people
+        if self.EventDriven:
+            dueIds = self.Scheduler.popDue(t)
+            for i in dueIds:
+                self.People[i].advance(t)
+            profiler.mark('advance', len(dueIds))
+        else:
+            for person in self.People:
+                person.advance(t)
+            profiler.mark('advance', len(self.People))
+        state.updateState(self.People, queue)
+        profiler.mark('updateState')
+
+        # Infect
+        S_to_I_count = self.newInfections(len(state.SusceptibleIDs),
+                                          len(state.InfectedInfectiveUnisolatedIDs))
+        if S_to_I_count > 0:
+            S_to_I_Ids = state.SusceptibleIDs.sample(S_to_I_count, self.Rng)
+            for i in S_to_I_Ids:
+                self.People[i].infect(t)
+        profiler.mark('infect', max(S_to_I_count, 0))
+        state.updateState(self.People, queue)
+        profiler.mark('updateState')
+
+        # False symptoms
+        S_to_FalseSymptoms_count = int(
+            np.round(len(state.SusceptibleNotQueuedIDs)*self.PFalseSymptoms))
+        if S_to_FalseSymptoms_count > 0:
+            S_to_FalseSymptoms_Ids = state.SusceptibleNotQueuedIDs.sample(
+                S_to_FalseSymptoms_count, self.Rng)
+            for i in S_to_FalseSymptoms_Ids:
+                self.People[i].falseSymptomsInfect(t)
+        profiler.mark('falseSymptoms', max(S_to_FalseSymptoms_count, 0))
+        state.updateState(self.People, queue)
+        profiler.mark('updateState')
+
+        # Queue
+        idsToQueue = sorted(state.ShouldQueueIDs)
+        for i in idsToQueue:
+            self.People[i].queue(t)
+            queue.put(i, self.People[i], t)
+        profiler.mark('queue', len(idsToQueue))
+        state.updateState(self.People, queue)
+        profiler.mark('updateState')
+
+        # Test
+        testedIds = queue.simulateDay(self.testCapacity())
+        for i in testedIds:
+            self.People[i].test(t)
+        profiler.mark('test', len(testedIds))
+        state.updateState(self.People, queue)
+        profiler.mark('updateState')
+
+        # Renegade
+        idsToRenegade = set()
+        for i in state.ShouldRenegadeIDs:
+            idsToRenegade.add(i)
+        for i in idsToRenegade:
+            self.People[i].renegade(t)
+        queue.renegade(idsToRenegade)
+        profiler.mark('renegade', len(idsToRenegade))
+        state.updateState(self.People, queue)
+        profiler.mark('updateState')
+
+    def newInfections(self, nSusceptible, nInfectiveUnisolated):
+        """The number of susceptible people infected today.
         """
-        self.__plot(fileName, shouldOpenFile, title)
+        return int(np.round((self.RateSI * nSusceptible * nInfectiveUnisolated) /
+                            self.TotalIndividuals))
 
-    def queueDistributionPlot(self, fileName='result_queue_distribution.png', shouldOpenFile=True, title='Queue distribution'):
-        """Plot of the queue distribution.
+    def testCapacity(self):
+        """The number of people that can be tested today.
         """
-        self.__plot(fileName, shouldOpenFile, title, True)
+        return self.Queue.simulateCapacity()
 
-    def __assertModelHasRun(self):
-        if not self.HasModelRun:
-            raise Exception('Call Model.run() before plotting.')
-
-    def __plot(self, fileName='result.png', shouldOpenFile=True, title='SIR-model with M|M|s testing queue', queueDistributionPlot=False):
-        self.__assertModelHasRun()
-        sns.set_theme(style="darkgrid")
+    def finishRun(self, results):
+        """Stores the result columns of a completed run.
+        """
+        self.StartTime = 0
+        self.EndTime = results['Time'][-1] if results.Length > 0 else 0
+        self.ResultColumns = results.columns()
+        self.__result = results
+        self.__results = None
+        self.__profile = None
+        self.HasModelRun = True
 
-        fig, axs = plt.subplots(3, 1)
-        if queueDistributionPlot:
-            self.plotQueueDistribution(axs[0])
+    def checkpoint(self):
+        """Snapshot of the full state at the end of the last simulated day, taken between the days
+        of steps or after the run. See Snapshot for restoring and forking it.
+        """
+        results = self.__running if self.__running != None else self.__result
+        if results == None:
+            raise Exception("A model can only be checkpointed once it has simulated day 0.")
+        state = {name: value for (name, value) in self.__dict__.items()
+                 if name not in self.TransientAttributes}
+        return Snapshot(type(self), state, results)
+
+    @classmethod
+    def fromCheckpoint(cls, state, results):
+        """A model in the given state whose run, by run or steps, continues after the last day of results.
+        """
+        model = cls.__new__(cls)
+        model.__dict__.update(state)
+        model.Profiler = NullProfiler()
+        model.ResultColumns = None
+        model.__result = None
+        model.__results = None
+        model.__profile = None
+        model.__running = None
+        model.__resume = results
+        model.HasModelRun = False
+        model.Forked = True
+        return model
+
+    def reseed(self, seed):
+        """Draws the rest of the run from a new seed instead of continuing the current streams.
+        """
+        self.Seed = seed
+        self.SeedSequence = seed if isinstance(seed, np.random.SeedSequence) \
+            else np.random.SeedSequence(seed)
+        if self.Streams == None:
+            bitGenerator = self.Rng.bit_generator
+            bitGenerator.state = type(bitGenerator)(self.SeedSequence).state
         else:
-            self.plotExpectedWaitTime(axs[0])
-        axs[0].set_title(title)
-        self.plotInfected(axs[1])
-        self.removeTicksX(axs[1])
-        self.plotSIR(axs[2])
-        self.removeTicksX(axs[2])
-
-        fig.savefig(fileName, dpi=300)
-
-        if shouldOpenFile:
-            openFile(fileName)
-
-    def plotExpectedWaitTime(self, ax):
-        self.__assertModelHasRun()
-
-        if self.NServers == 0:
-            props = dict(boxstyle='round', facecolor='white', alpha=1)
-            ax.text(.5, .5, r'$\infty$',
-                    transform=ax.transAxes, fontsize=20,
-                    verticalalignment='top', bbox=props,
-                    ha='center', va='center')
-            ax.set_ylabel(r'$E[T_{wait}]$ / days')
-            ax.set_xticks([])
-            ax.set_yticks([])
-            return
+            self.Streams.SeedSequence = self.SeedSequence
+        for randomizer in self.Randomizers:
+            randomizer.reset()
+
+    def changeParameters(self, **changes):
+        """Changes model arguments in ChangeableParameters from the next simulated day on, e.g.
+        between the days of steps or on a model restored from a checkpoint. People keep the
+        timers already drawn, servers that stay keep their overtime, and the queue keeps its
+        people, reordered by a new prioritization.
+        """
+        for name in changes:
+            if name not in self.ChangeableParameters:
+                raise Exception(f"Parameter [{name}] can not be changed during a run.")
+        results = self.__running if self.__running != None else self.__resume
+        if 'duration' in changes and results != None and int(changes['duration']) < results.Length-1:
+            raise Exception("The duration can not end before the days already simulated.")
+
+        self.Parameters.update(changes)
+        self.Forked = True
+        p = self.Parameters
+        self.Duration = int(p['duration'])
+        self.NTimeSteps = int(p['duration']+1)
+        self.RateSI = p['rateSI']
+        self.PSymptomatic = p['pSymptomatic']
+        self.TSymptomatic = p['tSymptomatic']
+        self.TRecovery = p['tRecovery']
+        self.PFalseSymptoms = p['pFalseSymptoms']
+        self.TFalseRecovery = p['tFalseRecovery']
+        self.NServers = p['servers']
+        self.ServerMu = p['serverMu']
+        self.TTestResult = p['tTestResult']
+        self.QueuePrioritization = p['queuePrioritization']
+        self.TReneging = p['tReneging']
+
+        if self.Streams != None:
+            self.Streams.setServers(self.NServers)
+        if getattr(self, 'Queue', None) != None:
+            self.Queue.setServers(self.NServers, self.ServerMu, self.ServerRngs)
+            self.Queue.setPrioritisation(self.QueuePrioritization,
+                                         getattr(self, 'People', None), results.Length-1 if results != None else 0)
+        if results != None:
+            results.resize(self.NTimeSteps)
+            results.fill('Time', np.linspace(0, self.Duration, self.NTimeSteps))
+            results.fill('ExpectedWaitTestResult', self.TTestResult, results.Length)
+            results.fill('ExpectedWaitService', self.ServerMu, results.Length)
+        self.Profiler.resize(self.NTimeSteps)
+        self.applyParameters()
+
+    def applyParameters(self):
+        """Passes changed arguments on to the people. Overridden by alternative engines.
+        """
+        for person in self.People:
+            person.PSymptomatic = self.PSymptomatic
+            person.TSymptomatic = self.TSymptomatic
+            person.TRecovery = self.TRecovery
+            person.TFalseRecovery = self.TFalseRecovery
+            person.TTestResult = self.TTestResult
+            person.TRenegade = self.TReneging
+
+    @property
+    def Results(self):
+        """The result of the run as a pandas DataFrame, None before the model has run.
+        The DataFrame shares memory with ResultColumns.
+        """
+        if self.__results is None and self.__result != None:
+            self.__results = self.__result.toDataFrame()
+        return self.__results
+
+    @property
+    def Profile(self):
+        """Time, calls and events per phase and day of the run as a pandas DataFrame,
+        None unless the model was created with profile=True and has run.
+        """
+        if self.__profile is None and self.Profiling and self.__result != None:
+            self.__profile = self.Profiler.toDataFrame(self.__result['Time'])
+        return self.__profile
 
-        ax.stackplot(self.Results['Time'],
-                     [self.Results['ExpectedWaitTestResult'],
-                      self.Results['ExpectedWaitService'],
-                      self.Results['ExpectedWaitQueue']],
-                     labels=['Test result', 'Service', 'Queue'],
-                     colors=['cadetblue', 'darkkhaki', 'khaki'])
-        ax.set_xlabel('days')
-        ax.set_ylabel(r'$E[T_{wait}]$ / days')
-        ax.set_xlim(self.StartTime, self.EndTime)
-        if max(self.Results['ExpecteWaitTotal']) < 1 or self.NServers == 0:
-            ax.set_ylim(0, 1)
-        else:
-            ax.set_ylim(0)
-        handles, labels = ax.get_legend_handles_labels()
-        ax.legend(handles[::-1], labels[::-1],
-                  bbox_to_anchor=(1.1, 1), loc='right',
-                  ncol=1, fancybox=True, shadow=True)
-
-    def plotQueueDistribution(self, ax):
-        self.__assertModelHasRun()
-
-        ax.stackplot(self.Results['Time'],
-                     [self.Results['InfectedQueued'],
-                      self.Results['SusceptibleQueued'],
-                      self.Results['RemovedQueued']],
-                     labels=['Infected', 'Susceptible',  'Removed'],
-                     colors=['salmon', 'lightgreen', 'dimgray'])
-        handles, labels = ax.get_legend_handles_labels()
-        ax.legend(handles[::-1], labels[::-1],
-                  bbox_to_anchor=(1.1, 1), loc='right',
-                  ncol=1, fancybox=True, shadow=True)
-        ax.set_xlabel('days')
-        ax.set_ylabel('queued')
-        ax.set_xlim(self.StartTime, self.EndTime)
-        if max(self.Results['Queued']) < 1:
-            ax.set_ylim(0, 1)
-        else:
-            ax.set_ylim(0)
-
-    def plotInfected(self, ax):
-        self.__assertModelHasRun()
-
-        ax.stackplot(self.Results['Time'],
-                     [self.Results['InfectedAsymptomaticUnisolated'],
-                      self.Results['InfectedSymptomaticUnisolated'],
-                      self.Results['InfectedIsolated']],
-                     labels=['Asymptomatic', 'Symptomatic', 'Isolated'],
-                     colors=['rosybrown', 'indianred', 'dimgray'])
-        ax.set_xlabel('days')
-        ax.set_ylabel('infected')
-        ax.set_xlim(self.StartTime, self.EndTime)
-        handles, labels = ax.get_legend_handles_labels()
-        ax.legend(handles[::-1], labels[::-1],
-                  bbox_to_anchor=(1.1, 1), loc='right',
-                  ncol=1, fancybox=True, shadow=True)
-
-    def plotSIR(self, ax):
-        self.__assertModelHasRun()
-
-        ax.stackplot(self.Results['Time'],
-                     [self.Results['Infected'], self.Results['Susceptible'],
-                      self.Results['Removed']], labels=['Infected', 'Susceptible', 'Removed'],
-                     colors=['salmon', 'lightgreen', 'dimgray'])
-        ax.set_xlabel('days')
-        ax.set_ylabel('population')
-        handles, labels = ax.get_legend_handles_labels()
-        ax.legend(handles[::-1], labels[::-1],
-                  bbox_to_anchor=(1.1, 1), loc='right',
-                  ncol=1, fancybox=True, shadow=True)
-        ax.set_xlim(self.StartTime, self.EndTime)
-        ax.set_ylim(0, self.TotalIndividuals)
-
-    def removeTicksX(self, ax):
-        ax.tick_params(
-            axis='x',
-            which='both',
-            bottom=False,
-            top=False,
-            labelbottom=False)
-        ax.set_xlabel(None)
-
-    def removeTicksY(self, ax):
-        ax.tick_params(
-            axis='y',
-            which='both',
-            left=False,
-            right=False,
-            labelleft=False)
-        ax.set_ylabel(None)
+    def recordDay(self, results):
+        """Iterates over the current state and writes the next row of the result columns.
+        """
+        state = self.State
+        results.addRow({
+            'Susceptible': len(state.SusceptibleIDs),
+            'Infected': len(state.InfectedIDs),
+            'Removed': len(state.RemovedIDs),
+            'InfectedAsymptomaticUnisolated': len(state.InfectedAsymptomaticUnisolatedIDs),
+            'InfectedSymptomaticUnisolated': len(state.InfectedSymptomaticUnisolatedIDs),
+            'InfectedIsolated': len(state.InfectedIsolatedIDs),
+            'InfectedInfectiveUnisolated': len(state.InfectedInfectiveUnisolatedIDs),
+            'Queued': len(state.QueuedIDs),
+            'SusceptibleQueued': len(state.SusceptibleQueuedIDs),
+            'InfectedQueued': len(state.InfectedQueuedIDs),
+            'RemovedQueued': len(state.RemovedQueuedIDs),
+            'ExpectedWaitQueue': state.ExpectedWaitQueue,
+            'ExpecteWaitTotal': self.TTestResult + self.ServerMu + state.ExpectedWaitQueue,
+        })
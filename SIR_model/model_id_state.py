@@ -1,53 +1,78 @@
+from .indexed_set import IndexedSet
+
+
 class ModelIdState:
     """Object that tracks the current state of the list of people.
+
+    Every person reports changes through personChanged, and updateState only
+    re-examines the people that changed since the last update.
     """
 
-    def __init__(self, people, queue):
+    Categories = {
+        'SusceptibleIDs': lambda p: p.Stage == "S",
+        'InfectedIDs': lambda p: p.Stage == "I",
+        'QueuedIDs': lambda p: p.IsQueued,
+        'RemovedIDs': lambda p: p.Stage == "R",
+
+        'SusceptibleNotQueuedIDs': lambda p: p.Stage == "S" and (not p.IsQueued),
+        'SusceptibleQueuedIDs': lambda p: p.Stage == "S" and p.IsQueued,
+
+        'InfectedInfectiveIDs': lambda p: p.Stage == "I" and p.IsInfective,
+        'InfectedAsymptomaticUnisolatedIDs': lambda p: p.Stage == "I" and (not p.IsSymptomatic) and (not p.IsIsolated),
+        'InfectedSymptomaticUnisolatedIDs': lambda p: p.Stage == "I" and p.IsSymptomatic and (not p.IsIsolated),
+        'InfectedSymptomaticIDs': lambda p: p.Stage == "I" and p.IsSymptomatic,
+        'InfectedIsolatedIDs': lambda p: p.Stage == "I" and p.IsIsolated,
+        'InfectedInfectiveUnisolatedIDs': lambda p: p.Stage == "I" and p.IsInfective and (not p.IsIsolated),
+
+        'CanShowFalseSymptomsIDs': lambda p: p.Stage != "I" and (not p.IsQueued) and (not p.HasTestedPositive),
+
+        'InfectedQueuedIDs': lambda p: p.Stage == "I" and p.IsQueued,
+        'RemovedQueuedIDs': lambda p: p.Stage == "R" and p.IsQueued,
+
+        'ShouldQueueIDs': lambda p: p.ShouldQueue,
+        'ShouldRenegadeIDs': lambda p: p.ShouldRenegade,
+    }
+
+    def __init__(self, people, queue, debug=False):
+        self.Debug = debug
+        for name in self.Categories:
+            setattr(self, name, IndexedSet())
+        self.Memberships = [() for p in people]
+
+        self.ChangedIDs = set()
+        for i, person in enumerate(people):
+            person.Observer = self
+            self.ChangedIDs.add(i)
         self.updateState(people, queue)
 
+    def personChanged(self, id):
+        """Marks a person to be re-examined at the next update.
+        """
+        self.ChangedIDs.add(id)
+
     def updateState(self, people, queue):
-        self.SusceptibleIDs = [i for (i, p) in
-                               enumerate(people) if p.Stage == "S"]
-        self.InfectedIDs = [i for (i, p) in
-                            enumerate(people) if p.Stage == "I"]
-        self.QueuedIDs = [i for (i, p) in
-                          enumerate(people) if p.IsQueued]
-        self.RemovedIDs = [i for (i, p) in
-                           enumerate(people) if p.Stage == "R"]
-
-        self.SusceptibleNotQueuedIDs = [i for (i, p) in
-                                        enumerate(people) if p.Stage == "S" and (not p.IsQueued)]
-        self.SusceptibleQueuedIDs = [i for (i, p) in
-                                     enumerate(people) if p.Stage == "S" and p.IsQueued]
-
-        self.InfectedInfectiveIDs = [i for (i, p) in
-                                     enumerate(people) if p.Stage == "I" and p.IsInfective]
-        self.InfectedAsymptomaticUnisolatedIDs = [i for (i, p) in
-                                                  enumerate(people) if p.Stage == "I" and (not p.IsSymptomatic) and (not p.IsIsolated)]
-        self.InfectedSymptomaticUnisolatedIDs = [i for (i, p) in
-                                                 enumerate(people) if p.Stage == "I" and p.IsSymptomatic and (not p.IsIsolated)]
-        self.InfectedSymptomaticIDs = [i for (i, p) in
-                                       enumerate(people) if p.Stage == "I" and p.IsSymptomatic]
-        self.InfectedIsolatedIDs = [i for (i, p) in
-                                    enumerate(people) if p.Stage == "I" and p.IsIsolated]
-        self.InfectedInfectiveUnisolatedIDs = [i for (i, p) in
-                                               enumerate(people) if p.Stage == "I" and p.IsInfective and (not p.IsIsolated)]
-
-        self.CanShowFalseSymptomsIDs = [i for (i, p) in
-                                        enumerate(people) if p.Stage != "I" and (not p.IsQueued) and (not p.HasTestedPositive)]
-
-        self.SusceptibleQueuedIDs = [i for (i, p) in
-                                     enumerate(people) if p.Stage == "S" and p.IsQueued]
-        self.InfectedQueuedIDs = [i for (i, p) in
-                                  enumerate(people) if p.Stage == "I" and p.IsQueued]
-        self.RemovedQueuedIDs = [i for (i, p) in
-                                 enumerate(people) if p.Stage == "R" and p.IsQueued]
+        for i in self.ChangedIDs:
+            person = people[i]
+            memberships = tuple(name for (name, isMember) in self.Categories.items()
+                                if isMember(person))
+            previous = self.Memberships[i]
+            if memberships == previous:
+                continue
+            for name in previous:
+                if not name in memberships:
+                    getattr(self, name).discard(i)
+            for name in memberships:
+                if not name in previous:
+                    getattr(self, name).add(i)
+            self.Memberships[i] = memberships
+        self.ChangedIDs.clear()
 
         self.ExpectedWaitQueue = queue.getExpectedQueueTime()
 
-        self.__control()
+        if self.Debug:
+            self.__control(people)
 
-    def __control(self):
+    def __control(self, people):
         totalInfected = len(self.InfectedIDs)
         asymptomatic = len(self.InfectedAsymptomaticUnisolatedIDs)
         symptomaticUnisolated = len(self.InfectedSymptomaticUnisolatedIDs)
@@ -57,3 +82,9 @@ class ModelIdState:
         if not (totalInfected == s):
             raise Exception(
                 "Infected subgroups does not add up to total infected.")
+
+        for (name, isMember) in self.Categories.items():
+            ids = {i for (i, p) in enumerate(people) if isMember(p)}
+            if ids != set(getattr(self, name)):
+                raise Exception(
+                    f"Tracked {name} does not match the people.")
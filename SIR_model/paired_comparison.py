@@ -0,0 +1,113 @@
+# Comparison of model variants on common random numbers
+
+import os
+import math
+import multiprocessing
+from statistics import NormalDist
+
+import numpy as np
+
+from .model import Model
+from .sweep import summarize, runSummary
+
+
+class PairedComparison:
+    """Runs replications of model variants on common random numbers and estimates the
+    difference of a metric between every variant and the first, with the variance
+    reduction achieved over independent runs.
+
+    variants: Name to the model arguments of the variant, e.g.
+        {'1 server': {'servers': 1}, '2 servers': {'servers': 2}}. The first is the baseline.
+    metric: Name of a metric of sweep.summarize, or a picklable function from the result
+        columns of a run to a number.
+    replications: Runs per variant. Replication r of every variant uses the same seed with
+        randomNumbers='common', see RandomStreams.
+    antithetic: Adds the antithetic twin of every replication, and estimates from the
+        mean of each pair.
+    confidence: Level of the confidence interval of every difference.
+    All other keyword arguments are passed on to the model.
+
+    The variance of independent runs is estimated from the spread of the runs of
+    every variant, which common random numbers and antithetic twins leave unchanged,
+    so no independent runs are needed for the report.
+    """
+
+    def __init__(self, variants, metric='PeakInfected', replications=50, antithetic=False, confidence=0.95,
+                 modelClass=Model, seed=None, processes=None, stopWhen=None, cache=None, **parameters):
+        self.Variants = dict(variants)
+        if len(self.Variants) < 2:
+            raise Exception("A comparison needs at least two variants.")
+        self.Metric = metric
+        self.Replications = int(replications)
+        self.RandomNumbers = ['common', 'antithetic'] if antithetic else ['common']
+        self.Z = NormalDist().inv_cdf(0.5 + confidence/2)
+        self.ModelClass = modelClass
+        self.Processes = processes if processes != None else os.cpu_count()
+        self.StopWhen = stopWhen
+        self.Cache = cache
+        self.Parameters = parameters
+
+        seeds = np.random.SeedSequence(seed).generate_state(self.Replications)
+        self.Seeds = [int(s) for s in seeds]
+
+        self.Values = None
+        self.Comparison = None
+        self.HasRun = False
+
+    def run(self):
+        """Executes all runs. Values holds the metric of every run, Comparison the
+        difference of every variant to the baseline.
+        """
+        import pandas as pd
+        metrics = summarize if isinstance(self.Metric, str) else self.Metric
+        keys = [(r, randomNumbers, name) for r in range(self.Replications)
+                for randomNumbers in self.RandomNumbers for name in self.Variants]
+        arguments = [(self.ModelClass, {**self.Parameters, **self.Variants[name], 'randomNumbers': randomNumbers},
+                      self.Seeds[r], metrics, self.StopWhen, self.Cache)
+                     for (r, randomNumbers, name) in keys]
+
+        if self.Processes == 1:
+            results = [runSummary(*a) for a in arguments]
+        else:
+            chunksize = max(1, len(arguments) // (4*self.Processes))
+            with multiprocessing.Pool(self.Processes) as pool:
+                results = pool.starmap(runSummary, arguments, chunksize)
+
+        values = [float(result[self.Metric]) if isinstance(self.Metric, str) else float(result)
+                  for result in results]
+        index = pd.MultiIndex.from_tuples([k[:2] for k in keys[::len(self.Variants)]],
+                                          names=['Replication', 'RandomNumbers'])
+        self.Values = pd.DataFrame(np.reshape(values, (len(index), len(self.Variants))),
+                                   index=index, columns=list(self.Variants))
+        self.Comparison = self.__compare()
+        self.HasRun = True
+
+    def __compare(self):
+        """Mean difference to the baseline with its standard error on common random numbers,
+        and the standard error the same number of independent runs would give.
+        """
+        import pandas as pd
+        names = list(self.Variants)
+        baseline = names[0]
+        # One estimate per replication, the mean of the antithetic pair if any.
+        estimates = self.Values.groupby(level='Replication').mean()
+        runsPerReplication = len(self.RandomNumbers)
+        n = self.Replications
+
+        rows = []
+        for name in names[1:]:
+            differences = estimates[name] - estimates[baseline]
+            difference = differences.mean()
+            stdError = differences.std(ddof=1)/math.sqrt(n) if n > 1 else math.nan
+            independentStdError = math.sqrt((self.Values[name].var(ddof=1) + self.Values[baseline].var(ddof=1))
+                                            / (n*runsPerReplication))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                reduction = np.float64(independentStdError)**2/np.float64(stdError)**2
+            rows.append({'Variant': name, 'Baseline': baseline,
+                         'Mean': estimates[name].mean(), 'BaselineMean': estimates[baseline].mean(),
+                         'Difference': difference,
+                         'Lower': difference - self.Z*stdError, 'Upper': difference + self.Z*stdError,
+                         'StdError': stdError, 'IndependentStdError': independentStdError,
+                         'VarianceReduction': reduction,
+                         'EquivalentRuns': reduction*n*runsPerReplication})
+        return pd.DataFrame(rows)
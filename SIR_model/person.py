@@ -1,15 +1,19 @@
 from .poisson_randomizer import PoissonRandomizer
 from .exp_randomizer import ExpRandomizer
-import numpy as np
+from .uniform_randomizer import UniformRandomizer
 
 
 class Person:
     """Person object.
     """
 
-    def __init__(self, deseaseStage, pSymptomatic, tSymptomatic, tRecovery, tFalseRecovery, tTestResult, tRenegade):
-        self.PoissonRandomizer = PoissonRandomizer()
-        self.ExpRandomizer = ExpRandomizer()
+    def __init__(self, deseaseStage, pSymptomatic, tSymptomatic, tRecovery, tFalseRecovery, tTestResult, tRenegade,
+                 poissonRandomizer=None, expRandomizer=None, uniformRandomizer=None):
+        """The randomizers are normally shared by all people of a model.
+        """
+        self.PoissonRandomizer = poissonRandomizer if poissonRandomizer != None else PoissonRandomizer()
+        self.ExpRandomizer = expRandomizer if expRandomizer != None else ExpRandomizer()
+        self.UniformRandomizer = uniformRandomizer if uniformRandomizer != None else UniformRandomizer()
 
         self.PSymptomatic = pSymptomatic
         self.TSymptomatic = tSymptomatic
@@ -18,6 +22,11 @@ class Person:
         self.TTestResult = tTestResult
         self.TRenegade = tRenegade
 
+        self.Id = None
+        self.Observer = None
+        self.Scheduler = None
+        self.Waits = None  # WaitRecorder of the realized waits, if recorded
+
         self.IsInfective = False
         self.WillBeSymptomatic = False
         self.IsSymptomatic = False
@@ -35,6 +44,7 @@ class Person:
         self.FalseRecoverAt = None
         self.IsolateAt = None
         self.RenegadesAt = None
+        self.TestedAt = None
 
         self.Stage = deseaseStage
         if deseaseStage == "I":
@@ -51,12 +61,14 @@ class Person:
             if (not self.IsInfective) and t >= self.InfectiveAt:
                 self.IsInfective = True
                 self.InfectiveAt = None
+                self.__notify()
             if self.WillBeSymptomatic and (not self.IsSymptomatic) and t >= self.SymptomaticAt:
                 self.IsSymptomatic = True
                 self.WillBeSymptomatic = False
                 self.ShouldQueue = True
                 self.RenegadesAt = None
                 self.ShouldRenegade = False
+                self.__notify()
             if self.WillIsolate and (t >= self.IsolateAt):
                 self.isolate(t)
             if t >= self.RecoverAt:
@@ -67,10 +79,12 @@ class Person:
                 if (not self.IsSymptomatic) and (not self.IsFalseSymptomatic):
                     self.RenegadesAt = t + \
                         self.ExpRandomizer.fromMean(self.TRenegade)
+                    self.__schedule(self.RenegadesAt)
             else:
                 if t >= self.RenegadesAt:
                     self.ShouldRenegade = True
                     self.RenegadesAt = None
+                    self.__notify()
 
     def infect(self, t):
         """Infects a person with covid-19.
@@ -78,11 +92,15 @@ class Person:
         self.Stage = "I"
         self.InfectiveAt = t+0
         self.RecoverAt = t+self.PoissonRandomizer.fromMean(self.TRecovery)
+        self.__schedule(self.InfectiveAt)
+        self.__schedule(self.RecoverAt)
 
-        self.WillBeSymptomatic = np.random.rand() <= self.PSymptomatic
+        self.WillBeSymptomatic = self.UniformRandomizer.random() <= self.PSymptomatic
         if self.WillBeSymptomatic:
             self.SymptomaticAt = t + \
                 self.PoissonRandomizer.fromMean(self.TSymptomatic)
+            self.__schedule(self.SymptomaticAt)
+        self.__notify()
 
     def falseSymptomsInfect(self, t):
         """Infects a person with false symtpoms (non-covid related illness).
@@ -91,6 +109,8 @@ class Person:
         self.IsFalseSymptomatic = True
         self.FalseRecoverAt = t + \
             self.PoissonRandomizer.fromMean(self.TFalseRecovery)
+        self.__schedule(self.FalseRecoverAt)
+        self.__notify()
 
     def queue(self, t):
         """Tells a person object that it is queued.
@@ -98,16 +118,23 @@ class Person:
         self.ShouldQueue = False
         self.IsQueued = True
         self.QueuedAt = t
+        # The reneging timer is started when the person is advanced next.
+        self.__schedule(t)
+        self.__notify()
 
     def renegade(self, t):
         """Renagades a person.
         """
         self.IsQueued = False
         self.ShouldRenegade = False
+        self.__notify()
 
     def test(self, t):
         """Tests a person for covid-19. Schedules isolation when result is available.
         """
+        self.TestedAt = t
+        if self.Waits != None:
+            self.Waits.addOne('QueueToTest', self.Stage, t - self.QueuedAt)
         if self.Stage == "S":
             self.IsQueued = False
 
@@ -116,18 +143,23 @@ class Person:
             if self.TTestResult == 0:
                 self.IsQueued = False
                 self.IsIsolated = True
+                self.__recordIsolation(t)
             else:
                 self.IsQueued = False
                 self.WillIsolate = True
                 self.IsolateAt = t + self.TTestResult
+                self.__schedule(self.IsolateAt)
 
         if self.Stage == "R":
             self.IsQueued = False
+        self.__notify()
 
     def isolate(self, t):
+        self.__recordIsolation(t)
         self.IsIsolated = True
         self.WillIsolate = False
         self.IsolateAt = None
+        self.__notify()
 
     def recover(self, t):
         """Recovers a person from covid-19.
@@ -140,8 +172,40 @@ class Person:
         self.IsIsolated = None
         self.IsInfective = None
         self.IsSymptomatic = None
+        self.__notify()
 
     def falseRecover(self, t):
         """Recovers a person from false symptomps.
         """
         self.IsFalseSymptomatic = False
+        self.__notify()
+
+    def scheduleTimers(self):
+        """Schedules all pending timers, for a person created before it had a scheduler.
+        """
+        for time in [self.InfectiveAt, self.SymptomaticAt, self.RecoverAt,
+                     self.FalseRecoverAt, self.IsolateAt, self.RenegadesAt]:
+            if time != None:
+                self.__schedule(time)
+        if self.IsQueued:
+            self.__schedule(self.QueuedAt)
+
+    def __recordIsolation(self, t):
+        """Tells the wait recorder, if any, the waits that end with isolation at t.
+        """
+        if self.Waits != None:
+            self.Waits.addOne('TestToIsolation', 'I', t - self.TestedAt)
+            if self.IsSymptomatic:
+                self.Waits.addOne('SymptomsToIsolation', 'I', t - self.SymptomaticAt)
+
+    def __schedule(self, time):
+        """Tells the scheduler, if any, that this person has an event due at time.
+        """
+        if self.Scheduler != None:
+            self.Scheduler.schedule(time, self.Id)
+
+    def __notify(self):
+        """Tells the observing model state that this person has changed.
+        """
+        if self.Observer != None:
+            self.Observer.personChanged(self.Id)
@@ -0,0 +1,205 @@
+from .file_opener import openFile
+
+
+def setTheme():
+    """Imports seaborn on first use and sets the plot theme.
+    """
+    import seaborn as sns
+    sns.set_theme(style="darkgrid")
+
+
+def pyplot():
+    """Imports matplotlib.pyplot and seaborn on first use and sets the plot theme.
+    """
+    import matplotlib.pyplot as plt
+    setTheme()
+    return plt
+
+
+def plotExpectedWaitTime(ax, results, nServers):
+    """Stacked expected waiting times, infinite without servers.
+    """
+    if nServers == 0:
+        props = dict(boxstyle='round', facecolor='white', alpha=1)
+        ax.text(.5, .5, r'$\infty$',
+                transform=ax.transAxes, fontsize=20,
+                verticalalignment='top', bbox=props,
+                ha='center', va='center')
+        ax.set_ylabel(r'$E[T_{wait}]$ / days')
+        ax.set_xticks([])
+        ax.set_yticks([])
+        return
+
+    ax.stackplot(results['Time'],
+                 [results['ExpectedWaitTestResult'],
+                  results['ExpectedWaitService'],
+                  results['ExpectedWaitQueue']],
+                 labels=['Test result', 'Service', 'Queue'],
+                 colors=['cadetblue', 'darkkhaki', 'khaki'])
+    ax.set_xlabel('days')
+    ax.set_ylabel(r'$E[T_{wait}]$ / days')
+    ax.set_xlim(min(results['Time']), max(results['Time']))
+    if max(results['ExpecteWaitTotal']) < 1 or nServers == 0:
+        ax.set_ylim(0, 1)
+    else:
+        ax.set_ylim(0)
+    handles, labels = ax.get_legend_handles_labels()
+    ax.legend(handles[::-1], labels[::-1],
+              bbox_to_anchor=(1.1, 1), loc='right',
+              ncol=1, fancybox=True, shadow=True)
+
+
+def plotQueueDistribution(ax, results):
+    """Stacked number of queued people by stage.
+    """
+    ax.stackplot(results['Time'],
+                 [results['InfectedQueued'],
+                  results['SusceptibleQueued'],
+                  results['RemovedQueued']],
+                 labels=['Infected', 'Susceptible',  'Removed'],
+                 colors=['salmon', 'lightgreen', 'dimgray'])
+    handles, labels = ax.get_legend_handles_labels()
+    ax.legend(handles[::-1], labels[::-1],
+              bbox_to_anchor=(1.1, 1), loc='right',
+              ncol=1, fancybox=True, shadow=True)
+    ax.set_xlabel('days')
+    ax.set_ylabel('queued')
+    ax.set_xlim(min(results['Time']), max(results['Time']))
+    if max(results['Queued']) < 1:
+        ax.set_ylim(0, 1)
+    else:
+        ax.set_ylim(0)
+
+
+def plotInfected(ax, results):
+    """Stacked number of infected people by symptoms and isolation.
+    """
+    ax.stackplot(results['Time'],
+                 [results['InfectedAsymptomaticUnisolated'],
+                  results['InfectedSymptomaticUnisolated'],
+                  results['InfectedIsolated']],
+                 labels=['Asymptomatic', 'Symptomatic', 'Isolated'],
+                 colors=['rosybrown', 'indianred', 'dimgray'])
+    ax.set_xlabel('days')
+    ax.set_ylabel('infected')
+    ax.set_xlim(min(results['Time']), max(results['Time']))
+    handles, labels = ax.get_legend_handles_labels()
+    ax.legend(handles[::-1], labels[::-1],
+              bbox_to_anchor=(1.1, 1), loc='right',
+              ncol=1, fancybox=True, shadow=True)
+
+
+def plotSIR(ax, results, totalIndividuals):
+    """Stacked number of susceptible, infected and removed people.
+    """
+    ax.stackplot(results['Time'],
+                 [results['Infected'], results['Susceptible'],
+                  results['Removed']], labels=['Infected', 'Susceptible', 'Removed'],
+                 colors=['salmon', 'lightgreen', 'dimgray'])
+    ax.set_xlabel('days')
+    ax.set_ylabel('population')
+    handles, labels = ax.get_legend_handles_labels()
+    ax.legend(handles[::-1], labels[::-1],
+              bbox_to_anchor=(1.1, 1), loc='right',
+              ncol=1, fancybox=True, shadow=True)
+    ax.set_xlim(min(results['Time']), max(results['Time']))
+    ax.set_ylim(0, totalIndividuals)
+
+
+def removeTicksX(ax):
+    ax.tick_params(
+        axis='x',
+        which='both',
+        bottom=False,
+        top=False,
+        labelbottom=False)
+    ax.set_xlabel(None)
+
+
+def removeTicksY(ax):
+    ax.tick_params(
+        axis='y',
+        which='both',
+        left=False,
+        right=False,
+        labelleft=False)
+    ax.set_ylabel(None)
+
+
+def drawResult(fig, results, nServers, totalIndividuals,
+               title='SIR-model with M|M|s testing queue', queueDistributionPlot=False):
+    """Draws the default figure of a result, or the one of the queue distribution, on fig.
+    results: Result columns of a run, e.g. Model.Results or ResultStore.series.
+    """
+    axs = fig.subplots(3, 1)
+    if queueDistributionPlot:
+        plotQueueDistribution(axs[0], results)
+    else:
+        plotExpectedWaitTime(axs[0], results, nServers)
+    axs[0].set_title(title)
+    plotInfected(axs[1], results)
+    removeTicksX(axs[1])
+    plotSIR(axs[2], results, totalIndividuals)
+    removeTicksX(axs[2])
+
+
+class ModelPlots:
+    """Plot helpers of Model. Plotting libraries are only imported when plotting.
+    """
+
+    def oneplot(self):
+        return self.subplots(1, 1)
+
+    def subplots(self, nrows, ncols):
+        plt = pyplot()
+        fig, axs = plt.subplots(nrows, ncols)
+
+        return fig, axs
+
+    def plot(self, fileName='result.png', shouldOpenFile=True, title='SIR-model with M|M|s testing queue'):
+        """Default plot of the result.
+        """
+        self.__plot(fileName, shouldOpenFile, title)
+
+    def queueDistributionPlot(self, fileName='result_queue_distribution.png', shouldOpenFile=True, title='Queue distribution'):
+        """Plot of the queue distribution.
+        """
+        self.__plot(fileName, shouldOpenFile, title, True)
+
+    def __assertModelHasRun(self):
+        if not self.HasModelRun:
+            raise Exception('Call Model.run() before plotting.')
+
+    def __plot(self, fileName='result.png', shouldOpenFile=True, title='SIR-model with M|M|s testing queue', queueDistributionPlot=False):
+        self.__assertModelHasRun()
+        plt = pyplot()
+
+        fig = plt.figure()
+        drawResult(fig, self.Results, self.NServers, self.TotalIndividuals, title, queueDistributionPlot)
+
+        fig.savefig(fileName, dpi=300)
+
+        if shouldOpenFile:
+            openFile(fileName)
+
+    def plotExpectedWaitTime(self, ax):
+        self.__assertModelHasRun()
+        plotExpectedWaitTime(ax, self.Results, self.NServers)
+
+    def plotQueueDistribution(self, ax):
+        self.__assertModelHasRun()
+        plotQueueDistribution(ax, self.Results)
+
+    def plotInfected(self, ax):
+        self.__assertModelHasRun()
+        plotInfected(ax, self.Results)
+
+    def plotSIR(self, ax):
+        self.__assertModelHasRun()
+        plotSIR(ax, self.Results, self.TotalIndividuals)
+
+    def removeTicksX(self, ax):
+        removeTicksX(ax)
+
+    def removeTicksY(self, ax):
+        removeTicksY(ax)
@@ -2,13 +2,29 @@ import numpy as np
 
 
 class PoissonRandomizer:
-    """Randomizes random exponentially distributed numbers.
+    """Randomizes random Poisson distributed numbers.
+
+    Numbers are drawn from the generator in bulk, one buffer per mean.
     """
 
-    def __init__(self):
-        pass
+    def __init__(self, rng=None, bufferSize=1024):
+        self.Rng = rng if rng != None else np.random.default_rng()
+        self.BufferSize = bufferSize
+        self.Buffers = {}
+        self.Positions = {}
 
     def fromMean(self, mean):
         """Randomizes with the given mean as expected value.
         """
-        return np.random.poisson(mean)
+        position = self.Positions.get(mean, self.BufferSize)
+        if position == self.BufferSize:
+            self.Buffers[mean] = self.Rng.poisson(mean, self.BufferSize)
+            position = 0
+        self.Positions[mean] = position + 1
+        return int(self.Buffers[mean][position])
+
+    def reset(self):
+        """Drops the buffered numbers, so the next number is drawn from the generator.
+        """
+        self.Buffers = {}
+        self.Positions = {}
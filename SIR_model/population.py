@@ -0,0 +1,213 @@
+import numpy as np
+
+
+SUSCEPTIBLE = 0
+INFECTED = 1
+REMOVED = 2
+
+
+class Population:
+    """Struct-of-arrays counterpart of a list of Person objects.
+
+    Every attribute of Person is stored as one NumPy array indexed by person id.
+    Timers that are None on a Person are NaN here, so that comparisons with the
+    current time are False for them.
+    """
+
+    def __init__(self, susceptible, infected, removed, pSymptomatic, tSymptomatic, tRecovery, tFalseRecovery, tTestResult, tRenegade,
+                 rng=None):
+        self.Rng = rng if rng != None else np.random.default_rng()
+        self.Waits = None  # WaitRecorder of the realized waits, see recordWaits
+        self.PSymptomatic = pSymptomatic
+        self.TSymptomatic = tSymptomatic
+        self.TRecovery = tRecovery
+        self.TFalseRecovery = tFalseRecovery
+        self.TTestResult = tTestResult
+        self.TRenegade = tRenegade
+
+        n = susceptible + infected + removed
+        self.Size = n
+
+        self.Stage = np.full(n, SUSCEPTIBLE, dtype=np.int8)
+        self.Stage[susceptible:susceptible+infected] = INFECTED
+        self.Stage[susceptible+infected:] = REMOVED
+
+        self.IsInfective = np.zeros(n, dtype=bool)
+        self.WillBeSymptomatic = np.zeros(n, dtype=bool)
+        self.IsSymptomatic = np.zeros(n, dtype=bool)
+        self.ShouldQueue = np.zeros(n, dtype=bool)
+        self.IsQueued = np.zeros(n, dtype=bool)
+        self.ShouldRenegade = np.zeros(n, dtype=bool)
+        self.WillIsolate = np.zeros(n, dtype=bool)
+        self.IsIsolated = np.zeros(n, dtype=bool)
+        self.HasTestedPositive = np.zeros(n, dtype=bool)
+        self.IsFalseSymptomatic = np.zeros(n, dtype=bool)
+
+        self.InfectiveAt = np.full(n, np.nan)
+        self.SymptomaticAt = np.full(n, np.nan)
+        self.RecoverAt = np.full(n, np.nan)
+        self.FalseRecoverAt = np.full(n, np.nan)
+        self.IsolateAt = np.full(n, np.nan)
+        self.RenegadesAt = np.full(n, np.nan)
+        self.QueuedAt = np.full(n, np.nan)
+
+        # Order in which queued people were put in the queue.
+        self.QueueOrder = np.zeros(n, dtype=np.int64)
+        self.QueuedSymptomatic = np.zeros(n, dtype=bool)
+        self.NextQueueOrder = 0
+
+        self.infect(np.arange(susceptible, susceptible+infected), 0)
+
+    def recordWaits(self, waits):
+        """Records the realized waits of the people in the given WaitRecorder from now on.
+        """
+        self.Waits = waits
+        self.TestedAt = np.full(self.Size, np.nan)
+
+    def advance(self, t):
+        """Advances all people to the current timestep, see Person.advance.
+        """
+        falseRecovering = self.IsFalseSymptomatic & (t >= self.FalseRecoverAt)
+        self.IsFalseSymptomatic[falseRecovering] = False
+
+        infected = self.Stage == INFECTED
+
+        becomesInfective = infected & (~self.IsInfective) & (t >= self.InfectiveAt)
+        self.IsInfective[becomesInfective] = True
+        self.InfectiveAt[becomesInfective] = np.nan
+
+        becomesSymptomatic = infected & self.WillBeSymptomatic & (~self.IsSymptomatic) \
+            & (t >= self.SymptomaticAt)
+        self.IsSymptomatic[becomesSymptomatic] = True
+        self.WillBeSymptomatic[becomesSymptomatic] = False
+        self.ShouldQueue[becomesSymptomatic] = True
+        self.RenegadesAt[becomesSymptomatic] = np.nan
+        self.ShouldRenegade[becomesSymptomatic] = False
+
+        isolating = infected & self.WillIsolate & (t >= self.IsolateAt)
+        if self.Waits != None:
+            self.__recordIsolation(np.flatnonzero(isolating), t)
+        self.isolate(isolating)
+
+        recovering = infected & (t >= self.RecoverAt)
+        self.recover(recovering)
+
+        if self.TRenegade != None:
+            canRenegade = self.IsQueued & (~self.ShouldRenegade)
+            hasNoTimer = np.isnan(self.RenegadesAt)
+
+            startsTimer = canRenegade & hasNoTimer & (~self.IsSymptomatic) \
+                & (~self.IsFalseSymptomatic)
+            nStarting = np.count_nonzero(startsTimer)
+            if nStarting > 0:
+                self.RenegadesAt[startsTimer] = t + \
+                    self.Rng.exponential(self.TRenegade, nStarting)
+
+            renegades = canRenegade & (~hasNoTimer) & (t >= self.RenegadesAt)
+            self.ShouldRenegade[renegades] = True
+            self.RenegadesAt[renegades] = np.nan
+
+    def infect(self, ids, t):
+        """Infects the given people with covid-19, see Person.infect.
+        """
+        n = len(ids)
+        self.Stage[ids] = INFECTED
+        self.InfectiveAt[ids] = t
+        self.RecoverAt[ids] = t + self.Rng.poisson(self.TRecovery, n)
+
+        willBeSymptomatic = self.Rng.random(n) <= self.PSymptomatic
+        self.WillBeSymptomatic[ids] = willBeSymptomatic
+        symptomaticIds = ids[willBeSymptomatic]
+        self.SymptomaticAt[symptomaticIds] = t + \
+            self.Rng.poisson(self.TSymptomatic, len(symptomaticIds))
+
+    def falseSymptomsInfect(self, ids, t):
+        """Gives the given people false symptoms, see Person.falseSymptomsInfect.
+        """
+        self.ShouldQueue[ids] = True
+        self.IsFalseSymptomatic[ids] = True
+        self.FalseRecoverAt[ids] = t + \
+            self.Rng.poisson(self.TFalseRecovery, len(ids))
+
+    def queue(self, ids, t):
+        """Queues the given people, last in the queue in order of id.
+        """
+        n = len(ids)
+        self.ShouldQueue[ids] = False
+        self.IsQueued[ids] = True
+        self.QueuedAt[ids] = t
+        self.QueuedSymptomatic[ids] = self.IsSymptomatic[ids]
+        self.QueueOrder[ids] = np.arange(self.NextQueueOrder, self.NextQueueOrder+n)
+        self.NextQueueOrder += n
+
+    def selectFromQueue(self, n, prioritisation):
+        """Ids of the n first people in the queue according to the prioritization policy.
+        FIFO: First.
+        LIFO: Last.
+        SymptomaticFirst: First among those with covid-19 symptoms when queued, then first among the rest.
+        """
+        queuedIds = np.flatnonzero(self.IsQueued)
+        if n >= len(queuedIds):
+            n = len(queuedIds)
+        if n == 0:
+            return queuedIds[:0]
+
+        if prioritisation == 'FIFO':
+            order = self.QueueOrder[queuedIds]
+        elif prioritisation == 'LIFO':
+            order = -self.QueueOrder[queuedIds]
+        elif prioritisation == 'SymptomaticFirst':
+            order = self.QueueOrder[queuedIds] \
+                + (~self.QueuedSymptomatic[queuedIds])*self.NextQueueOrder
+        else:
+            raise Exception(
+                f"Prioritization [{prioritisation}] is not valid.")
+
+        if n == len(queuedIds):
+            return queuedIds[np.argsort(order, kind='stable')]
+        first = np.argpartition(order, n-1)[:n]
+        return queuedIds[first[np.argsort(order[first], kind='stable')]]
+
+    def renegade(self, ids):
+        """Removes the given people from the queue, see Person.renegade.
+        """
+        self.IsQueued[ids] = False
+        self.ShouldRenegade[ids] = False
+
+    def test(self, ids, t):
+        """Tests the given people for covid-19, see Person.test.
+        """
+        if self.Waits != None:
+            self.Waits.add('QueueToTest', t, self.Stage[ids], t - self.QueuedAt[ids])
+        self.IsQueued[ids] = False
+
+        infectedIds = ids[self.Stage[ids] == INFECTED]
+        self.HasTestedPositive[infectedIds] = True
+        if self.Waits != None:
+            self.TestedAt[infectedIds] = t
+        if self.TTestResult == 0:
+            if self.Waits != None:
+                self.__recordIsolation(infectedIds, t)
+            self.IsIsolated[infectedIds] = True
+        else:
+            self.WillIsolate[infectedIds] = True
+            self.IsolateAt[infectedIds] = t + self.TTestResult
+
+    def isolate(self, ids):
+        self.IsIsolated[ids] = True
+        self.WillIsolate[ids] = False
+        self.IsolateAt[ids] = np.nan
+
+    def recover(self, ids):
+        """Recovers the given people from covid-19, see Person.recover.
+        """
+        self.Stage[ids] = REMOVED
+        self.IsInfective[ids] = False
+        self.IsSymptomatic[ids] = False
+        self.WillIsolate[ids] = False
+        self.IsIsolated[ids] = False
+
+    def __recordIsolation(self, ids, t):
+        self.Waits.add('TestToIsolation', t, INFECTED, t - self.TestedAt[ids])
+        symptomaticIds = ids[self.IsSymptomatic[ids]]
+        self.Waits.add('SymptomsToIsolation', t, INFECTED, t - self.SymptomaticAt[symptomaticIds])
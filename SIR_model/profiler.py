@@ -0,0 +1,76 @@
+import time
+
+import numpy as np
+
+
+class PhaseProfiler:
+    """Wall time, calls and events of every phase of every day of a run.
+
+    An engine marks the end of each phase of a day with mark(phase, events).
+    The time since the previous mark, or since the day began, is added to
+    that phase.
+    """
+
+    def __init__(self, nTimeSteps):
+        self.NTimeSteps = nTimeSteps
+        self.Phases = {}  # Phase: array of seconds, calls and events per day
+        self.Day = 0
+        self.Last = time.perf_counter()
+
+    def beginDay(self, day):
+        """Starts timing the day with the given index.
+        """
+        self.Day = day
+        self.Last = time.perf_counter()
+
+    def mark(self, phase, events=0):
+        """Ends a call of the phase that handled the given number of events, e.g. people infected.
+        """
+        now = time.perf_counter()
+        record = self.Phases.get(phase)
+        if record is None:
+            record = self.Phases[phase] = np.zeros((3, self.NTimeSteps))
+        record[0, self.Day] += now - self.Last
+        record[1, self.Day] += 1
+        record[2, self.Day] += events
+        self.Last = now
+
+    def resize(self, nTimeSteps):
+        """Changes the number of days, e.g. when the duration of a run changes.
+        """
+        for (phase, record) in self.Phases.items():
+            resized = np.zeros((3, nTimeSteps))
+            n = min(nTimeSteps, record.shape[1])
+            resized[:, :n] = record[:, :n]
+            self.Phases[phase] = resized
+        self.NTimeSteps = nTimeSteps
+
+    def toDataFrame(self, times):
+        """A long table with the columns Time, Phase, Seconds, Calls and Events,
+        with a row per phase and day of the given times.
+        """
+        import pandas as pd
+        nDays = len(times)
+        values = np.concatenate([r[:, :nDays] for r in self.Phases.values()], axis=1) \
+            if self.Phases else np.zeros((3, 0))
+        return pd.DataFrame({
+            'Time': np.tile(times, len(self.Phases)),
+            'Phase': np.repeat(list(self.Phases), nDays),
+            'Seconds': values[0],
+            'Calls': values[1].astype(np.int64),
+            'Events': values[2].astype(np.int64),
+        })
+
+
+class NullProfiler:
+    """Stands in for PhaseProfiler when a model is not profiled.
+    """
+
+    def beginDay(self, day):
+        pass
+
+    def mark(self, phase, events=0):
+        pass
+
+    def resize(self, nTimeSteps):
+        pass
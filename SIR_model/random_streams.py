@@ -0,0 +1,129 @@
+# Random streams for common random numbers and antithetic variates
+
+import math
+
+import numpy as np
+
+from .cohorts import poissonPmf
+
+RandomNumbers = ['single', 'common', 'antithetic']
+
+STREAMS_KEY = 2**31  # Spawn key of the streams, apart from the children of Model.spawnSeeds
+
+GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+
+def hashUniform(salt, ids):
+    """A uniform number in [0, 1) for every id, a SplitMix64 hash of the salt and the id.
+    """
+    z = np.asarray(ids).astype(np.uint64)*GOLDEN + np.uint64(salt)
+    z = (z ^ (z >> np.uint64(30)))*np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27)))*np.uint64(0x94D049BB133111EB)
+    z = z ^ (z >> np.uint64(31))
+    return (z >> np.uint64(11)).astype(np.float64)*2**-53
+
+
+class InversionGenerator:
+    """Draws from a NumPy Generator by inverting uniform numbers, so that an antithetic
+    generator, which uses 1-u for every uniform u, draws the mirrored numbers.
+
+    Only the draws the engines make are inverted: random, standard_exponential,
+    exponential, poisson and choice without replacement. Other draws, e.g. the
+    binomial splits of CohortModel, are passed on to the generator unchanged.
+    """
+
+    def __init__(self, generator, antithetic=False):
+        self.Generator = generator
+        self.Antithetic = antithetic
+        self.PoissonCdfs = {}  # Mean: cumulative probabilities
+        self.Salt = 0
+        self.Choices = 0
+
+    def reseed(self, seedSequence):
+        """Restarts the generator, in place so that everyone holding this object follows.
+        """
+        bitGenerator = self.Generator.bit_generator
+        bitGenerator.state = type(bitGenerator)(seedSequence).state
+        self.Salt = int(seedSequence.generate_state(1, np.uint64)[0])
+        self.Choices = 0
+
+    def random(self, size=None):
+        u = self.Generator.random(size)
+        if self.Antithetic:
+            u = 1 - u
+        return np.clip(u, 2**-53, 1 - 2**-53)
+
+    def standard_exponential(self, size=None):
+        return -np.log1p(-self.random(size))
+
+    def exponential(self, scale=1., size=None):
+        return scale*self.standard_exponential(size)
+
+    def poisson(self, lam=1., size=None):
+        cdf = self.PoissonCdfs.get(lam)
+        if cdf is None:
+            n = int(lam + 12*math.sqrt(lam) + 20)
+            cdf = self.PoissonCdfs[lam] = np.cumsum(poissonPmf(lam, n))
+        draws = np.minimum(np.searchsorted(cdf, self.random(size), side='right'), len(cdf)-1)
+        return draws if size != None else int(draws)
+
+    def choice(self, a, size=None, replace=True):
+        """Without replacement, the members with the smallest keys, in key order. The key of
+        a member is a hash of its value, e.g. a person id, so a member has the same key in a
+        choice among other members, and the generator is not advanced.
+        """
+        if replace:
+            raise Exception("Only choice without replacement is drawn by inversion.")
+        n = a if isinstance(a, (int, np.integer)) else len(a)
+        k = 1 if size == None else size
+        self.Choices += 1
+        keys = hashUniform((self.Salt + self.Choices*int(GOLDEN)) % 2**64,
+                           np.arange(n) if isinstance(a, (int, np.integer)) else a)
+        if self.Antithetic:
+            keys = 1 - keys
+        positions = np.argpartition(keys, k-1)[:k] if k < n else np.arange(n)
+        positions = positions[np.argsort(keys[positions])]
+        chosen = positions if isinstance(a, (int, np.integer)) else np.asarray(a)[positions]
+        return chosen if size != None else chosen[0]
+
+    def __getattr__(self, name):
+        if name == 'Generator':  # Not yet set, e.g. while unpickling
+            raise AttributeError(name)
+        return getattr(self.Generator, name)
+
+
+class RandomStreams:
+    """Separate random streams for the people and for every server of a model.
+
+    Every stream restarts each day from a seed of the model seed, the stream and
+    the day, so two models with the same seed draw the same numbers wherever
+    their dynamics coincide: a variant with more servers gets the same service
+    times for the servers both have, and a day on which the variants differ does
+    not shift the numbers of the following days.
+    antithetic: Draws 1-u for every uniform u, the antithetic twin of the same seed.
+    """
+
+    def __init__(self, seedSequence, nServers, antithetic=False):
+        self.SeedSequence = seedSequence
+        self.Antithetic = antithetic
+        self.People = InversionGenerator(np.random.default_rng(), antithetic)
+        self.Servers = [InversionGenerator(np.random.default_rng(), antithetic)
+                        for i in range(int(math.ceil(nServers)))]
+        self.beginDay(0)
+
+    def setServers(self, nServers):
+        """Adds streams for added servers. The list of streams is changed in place.
+        """
+        while len(self.Servers) < int(math.ceil(nServers)):
+            self.Servers.append(InversionGenerator(np.random.default_rng(), self.Antithetic))
+
+    def beginDay(self, day):
+        """Moves every stream to the start of its numbers for the day.
+        """
+        for (stream, generator) in enumerate([self.People] + self.Servers):
+            generator.reseed(self.__seed(stream, day))
+
+    def __seed(self, stream, day):
+        seed = self.SeedSequence
+        return np.random.SeedSequence(seed.entropy, spawn_key=seed.spawn_key + (STREAMS_KEY, stream, int(day)),
+                                      pool_size=seed.pool_size)
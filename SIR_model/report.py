@@ -0,0 +1,114 @@
+# Headless batch rendering of the figures of stored runs
+
+import os
+import html
+import multiprocessing
+
+from .plotting import setTheme, drawResult
+from .result_store import ResultStore
+
+
+Figures = {  # Name: title, queueDistributionPlot and file name suffix
+    'result': ('Run', False, ''),
+    'queueDistribution': ('Queue distribution, run', True, '-queue'),
+}
+
+_stores = {}  # Directory: ResultStore, opened once per worker process
+
+
+def renderResult(results, fileName, nServers, totalIndividuals,
+                 title='SIR-model with M|M|s testing queue', queueDistributionPlot=False, dpi=300):
+    """Saves the figure of Model.plot, or Model.queueDistributionPlot, of the given result
+    columns. Draws on a bare matplotlib Figure, so neither pyplot state nor a viewer is involved.
+    """
+    from matplotlib.figure import Figure
+    setTheme()
+    fig = Figure()
+    drawResult(fig, results, nServers, totalIndividuals, title, queueDistributionPlot)
+    fig.savefig(fileName, dpi=dpi)
+
+
+def renderStoredRun(task):
+    """Renders the figures of one stored run, task being
+    (store directory, run, output directory, figure names, dpi). Returns the run and its files.
+    """
+    storeDirectory, run, directory, figures, dpi = task
+    store = _stores.get(storeDirectory)
+    if store is None:
+        store = _stores[storeDirectory] = ResultStore(storeDirectory)
+
+    results = store.series(run)
+    nServers = store.metadata(run)['parameters'].get('servers', 1)
+    totalIndividuals = results['Susceptible'][0] + results['Infected'][0] + results['Removed'][0]
+
+    files = []
+    for figure in figures:
+        title, queueDistributionPlot, suffix = Figures[figure]
+        fileName = os.path.join(directory, f'run-{run:06d}{suffix}.png')
+        renderResult(results, fileName, nServers, totalIndividuals,
+                     f'{title} {run}', queueDistributionPlot, dpi)
+        files.append(fileName)
+    return run, files
+
+
+class BatchReport:
+    """Renders the figures of many stored runs across a process pool, from a ResultStore,
+    without simulating and without opening a viewer, plus an index.html listing them.
+
+    store: ResultStore, or its directory.
+    directory: Output directory, created if it does not exist.
+    runs: Ids of the runs to render, e.g. from ResultStore.select, None for all.
+    figures: Names in Figures, 'result' for Model.plot and 'queueDistribution' for
+        Model.queueDistributionPlot.
+    processes: Number of worker processes, None for all cores.
+    """
+
+    def __init__(self, store, directory, runs=None, figures=('result', 'queueDistribution'),
+                 processes=None, dpi=150):
+        self.Store = store if isinstance(store, ResultStore) else ResultStore(store)
+        self.Directory = directory
+        self.Runs = list(range(len(self.Store))) if runs is None else list(runs)
+        for figure in figures:
+            if not figure in Figures:
+                raise Exception(f"Figure [{figure}] is not valid.")
+        self.Figures = tuple(figures)
+        self.Processes = processes if processes != None else os.cpu_count()
+        self.Dpi = dpi
+        self.Files = None
+
+    def run(self):
+        """Renders all figures and writes index.html. Files maps every run to its figure files.
+        """
+        os.makedirs(self.Directory, exist_ok=True)
+        self.Store.flush()
+        tasks = [(self.Store.Directory, run, self.Directory, self.Figures, self.Dpi)
+                 for run in self.Runs]
+
+        if self.Processes == 1:
+            rendered = [renderStoredRun(task) for task in tasks]
+        else:
+            chunksize = max(1, len(tasks) // (4*self.Processes))
+            with multiprocessing.Pool(self.Processes) as pool:
+                rendered = list(pool.imap_unordered(renderStoredRun, tasks, chunksize))
+
+        self.Files = dict(sorted(rendered))
+        self.__writeIndex()
+
+    def __writeIndex(self):
+        """A table of the runs with the parameters that differ between them and their figures.
+        """
+        parameters = [self.Store.metadata(run)['parameters'] for run in self.Files]
+        names = sorted(set(name for p in parameters for name in p))
+        varying = [name for name in names if len(set(repr(p.get(name)) for p in parameters)) > 1]
+
+        rows = []
+        for (run, p) in zip(self.Files, parameters):
+            cells = [str(run)] + [html.escape(str(p.get(name))) for name in varying] \
+                + [f'<a href="{os.path.basename(f)}"><img src="{os.path.basename(f)}" width="320"></a>'
+                   for f in self.Files[run]]
+            rows.append('<tr>' + ''.join(f'<td>{c}</td>' for c in cells) + '</tr>')
+        header = ''.join(f'<th>{html.escape(h)}</th>' for h in ['Run'] + varying + list(self.Figures))
+
+        with open(os.path.join(self.Directory, 'index.html'), 'w') as f:
+            f.write('<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>Runs</title></head><body>\n'
+                    f'<table>\n<tr>{header}</tr>\n' + '\n'.join(rows) + '\n</table>\n</body></html>\n')
@@ -1,13 +1,84 @@
+import numpy as np
+
+
 class Result:
-    def __init__(self, initalDict={}):
-        self.dictionary = initalDict
+    """Result columns of a run, preallocated as typed NumPy arrays for all time steps.
+    """
+
+    Columns = {
+        'Time': np.float64,
+        'ExpectedWaitTestResult': np.float64,
+        'ExpectedWaitService': np.float64,
+        'Susceptible': np.int64,
+        'Infected': np.int64,
+        'Removed': np.int64,
+        'InfectedAsymptomaticUnisolated': np.int64,
+        'InfectedSymptomaticUnisolated': np.int64,
+        'InfectedIsolated': np.int64,
+        'InfectedInfectiveUnisolated': np.int64,
+        'Queued': np.int64,
+        'SusceptibleQueued': np.int64,
+        'InfectedQueued': np.int64,
+        'RemovedQueued': np.int64,
+        'ExpectedWaitQueue': np.float64,
+        'ExpecteWaitTotal': np.float64,
+    }
+
+    def __init__(self, nTimeSteps, countType=np.int64):
+        """countType: Type of the count columns, float for engines that count fractions of people.
+        """
+        self.NTimeSteps = nTimeSteps
+        self.Length = 0
+        self.Arrays = {name: np.zeros(nTimeSteps, dtype=countType if dtype == np.int64 else dtype)
+                       for (name, dtype) in self.Columns.items()}
+
+    @classmethod
+    def fromColumns(cls, columns):
+        """A complete result holding copies of the given columns.
+        """
+        nTimeSteps = len(columns['Time'])
+        result = cls(nTimeSteps, columns['Infected'].dtype)
+        for (name, values) in columns.items():
+            result.fill(name, values)
+        result.Length = nTimeSteps
+        return result
+
+    def fill(self, key, values, start=0):
+        """Sets a whole column, e.g. one known before the run, or its rows from start on.
+        """
+        self.Arrays[key][start:] = values
+
+    def resize(self, nTimeSteps):
+        """Changes the number of time steps, keeping the rows written so far.
+        """
+        for (name, array) in self.Arrays.items():
+            resized = np.zeros(nTimeSteps, dtype=array.dtype)
+            resized[:self.Length] = array[:self.Length]
+            self.Arrays[name] = resized
+        self.NTimeSteps = nTimeSteps
+
+    def addRow(self, values):
+        """Writes the given columns of the next time step.
+        """
+        for (key, value) in values.items():
+            self.Arrays[key][self.Length] = value
+        self.Length += 1
+
+    def row(self, index):
+        """The values of all columns at the given time step.
+        """
+        return {name: array[index].item() for (name, array) in self.Arrays.items()}
+
+    def columns(self):
+        """The columns of the time steps written so far, as views of the buffers.
+        """
+        return {name: array[:self.Length] for (name, array) in self.Arrays.items()}
 
-    def __setitem__(self, key, value):
-        if not key in self.dictionary:
-            self.dictionary[key] = []
-        self.dictionary[key].append(value)
+    def toDataFrame(self):
+        """The written time steps as a pandas DataFrame sharing memory with the buffers.
+        """
+        import pandas as pd
+        return pd.DataFrame(self.columns(), copy=False)
 
     def __getitem__(self, key):
-        if not key in self.dictionary:
-            self.dictionary[key] = []
-        return self.dictionary[key]
+        return self.Arrays[key][:self.Length]
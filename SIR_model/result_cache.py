@@ -0,0 +1,112 @@
+# Cache of simulation results keyed by the model configuration
+
+import os
+import json
+import hashlib
+
+import numpy as np
+
+from .result import Result
+from .result_store import parameterMetadata, seedMetadata
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Increase whenever a change to the engines changes the results of a seeded run.
+ENGINE_VERSION = 3
+
+
+class ResultCache:
+    """Directory of run results keyed by a hash of the model class, parameters, seed and ENGINE_VERSION.
+
+    Entries are written to a temporary file and renamed into place, and a hit
+    marks its entry as recently used. When the directory grows beyond maxBytes
+    the least recently used entries are removed under a lock file, so several
+    processes on one machine can share a cache.
+    """
+
+    def __init__(self, directory, maxBytes=2**30):
+        self.Directory = directory
+        self.MaxBytes = maxBytes
+        os.makedirs(directory, exist_ok=True)
+
+    def canStore(self, model):
+        """Only runs that are fully determined by the key can be cached.
+        """
+        return model.Seed != None and not callable(model.QueuePrioritization) and not model.Forked \
+            and model.Waits == None and not model.Profiling
+
+    def key(self, model):
+        description = {
+            'engine': type(model).__name__,
+            'engineVersion': ENGINE_VERSION,
+            'eventDriven': model.EventDriven,
+            'parameters': parameterMetadata(model.Parameters),
+            'seed': seedMetadata(model.SeedSequence),
+        }
+        return hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+    def load(self, model):
+        """Restores the results of the model if they are cached. Returns whether they were.
+        """
+        path = self.__path(self.key(model))
+        try:
+            with np.load(path) as entry:
+                columns = {name: entry[name] for name in entry.files}
+            os.utime(path)
+        except (FileNotFoundError, OSError, ValueError):
+            return False
+
+        model.finishRun(Result.fromColumns(columns))
+        return True
+
+    def store(self, model):
+        """Caches the results of a model that has run, then evicts entries beyond the size budget.
+        """
+        path = self.__path(self.key(model))
+        temporaryPath = f'{path}.{os.getpid()}.tmp'
+        with open(temporaryPath, 'wb') as f:
+            np.savez(f, **model.ResultColumns)
+        os.replace(temporaryPath, path)
+        self.evict()
+
+    def evict(self):
+        """Removes the least recently used entries until the cache fits in maxBytes.
+        """
+        with open(os.path.join(self.Directory, '.lock'), 'w') as lock:
+            if fcntl != None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+
+            entries = []
+            for fileName in os.listdir(self.Directory):
+                if fileName.endswith('.npz'):
+                    try:
+                        stat = os.stat(os.path.join(self.Directory, fileName))
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, fileName))
+
+            size = sum(e[1] for e in entries)
+            for (mtime, entrySize, fileName) in sorted(entries):
+                if size <= self.MaxBytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.Directory, fileName))
+                except FileNotFoundError:
+                    pass
+                size -= entrySize
+
+    def clear(self):
+        """Removes all entries.
+        """
+        for fileName in os.listdir(self.Directory):
+            if fileName.endswith('.npz'):
+                try:
+                    os.remove(os.path.join(self.Directory, fileName))
+                except FileNotFoundError:
+                    pass
+
+    def __path(self, key):
+        return os.path.join(self.Directory, key + '.npz')
@@ -0,0 +1,186 @@
+# On-disk store of the result columns of many runs
+
+import os
+import json
+
+import numpy as np
+
+
+def seedMetadata(seed):
+    """JSON description of a seed: an int, or the entropy and spawn key of a SeedSequence.
+    """
+    if isinstance(seed, np.random.SeedSequence):
+        return {'entropy': seed.entropy, 'spawnKey': list(seed.spawn_key)}
+    if seed == None:
+        return None
+    return int(seed)
+
+
+def parameterMetadata(parameters):
+    """JSON description of model parameters. Values JSON can not hold, such as
+    a callable queue prioritization, are stored by name.
+    """
+    metadata = {}
+    for (name, value) in parameters.items():
+        if isinstance(value, np.generic):
+            value = value.item()
+        if not (value == None or isinstance(value, (bool, int, float, str))):
+            value = getattr(value, '__name__', repr(value))
+        metadata[name] = value
+    return metadata
+
+
+class ResultStore:
+    """Directory holding the per-day result columns of many runs, with their parameters and seed.
+
+    Runs are written in chunks, each one .npy file with an array of shape
+    (runs, days, columns) padded with NaN, and described by one line per run
+    in index.jsonl. Chunks are memory-mapped when read, so a store with many
+    thousands of runs can be sliced and aggregated without loading it into memory.
+    Only runs written by flush, or when a chunk is full, can be read.
+
+    directory: Created if it does not exist. Runs already in it are kept.
+    chunkSize: Number of runs per chunk file.
+    """
+
+    def __init__(self, directory, chunkSize=256):
+        self.Directory = directory
+        self.ChunkSize = chunkSize
+        os.makedirs(directory, exist_ok=True)
+
+        self.Columns = None
+        self.Index = []
+        self.Pending = []
+        self.Chunks = {}
+        self.NextChunk = 0
+
+        columnsPath = os.path.join(directory, 'columns.json')
+        if os.path.exists(columnsPath):
+            with open(columnsPath) as f:
+                self.Columns = json.load(f)
+        indexPath = os.path.join(directory, 'index.jsonl')
+        if os.path.exists(indexPath):
+            with open(indexPath) as f:
+                self.Index = [json.loads(line) for line in f if line.strip()]
+            self.NextChunk = max([run['chunk'] for run in self.Index], default=-1) + 1
+
+    # ------- Writing -------
+
+    def add(self, columns, parameters, seed=None):
+        """Adds one run. columns: Column name to 1-D array, e.g. Model.ResultColumns.
+        """
+        if self.Columns == None:
+            self.Columns = list(columns)
+            with open(os.path.join(self.Directory, 'columns.json'), 'w') as f:
+                json.dump(self.Columns, f)
+        elif list(columns) != self.Columns:
+            raise Exception("Result columns do not match the columns of the store.")
+
+        values = np.column_stack([columns[c] for c in self.Columns]).astype(float)
+        self.Pending.append((values, parameterMetadata(parameters), seedMetadata(seed)))
+        if len(self.Pending) >= self.ChunkSize:
+            self.flush()
+
+    def addModel(self, model):
+        """Adds the results of a model that has run.
+        """
+        self.add(model.ResultColumns, model.Parameters, model.SeedSequence)
+
+    def flush(self):
+        """Writes the pending runs as a new chunk.
+        """
+        if not self.Pending:
+            return
+
+        nDays = max(len(values) for (values, p, s) in self.Pending)
+        chunk = np.full((len(self.Pending), nDays, len(self.Columns)), np.nan)
+        for (i, (values, p, s)) in enumerate(self.Pending):
+            chunk[i, :len(values)] = values
+
+        fileName = self.__chunkPath(self.NextChunk)
+        np.save(fileName + '.tmp.npy', chunk)
+        os.replace(fileName + '.tmp.npy', fileName)
+
+        runs = [{'run': len(self.Index) + i, 'chunk': self.NextChunk, 'position': i,
+                 'length': len(values), 'parameters': parameters, 'seed': seed}
+                for (i, (values, parameters, seed)) in enumerate(self.Pending)]
+        with open(os.path.join(self.Directory, 'index.jsonl'), 'a') as f:
+            for run in runs:
+                f.write(json.dumps(run) + '\n')
+
+        self.Index += runs
+        self.Pending = []
+        self.NextChunk += 1
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+    # ------- Reading -------
+
+    def __len__(self):
+        return len(self.Index)
+
+    def select(self, **parameters):
+        """Ids of the runs whose parameters equal all the given values.
+        """
+        return [run['run'] for run in self.Index
+                if all(run['parameters'].get(name) == value for (name, value) in parameters.items())]
+
+    def metadata(self, run):
+        """Parameters, seed and number of days of a run.
+        """
+        return self.Index[run]
+
+    def series(self, run):
+        """All columns of one run, as a dict of column name to array.
+        """
+        values = self.__values(run)
+        return {name: np.array(values[:, c]) for (c, name) in enumerate(self.Columns)}
+
+    def column(self, name, runs=None):
+        """One column of the given runs, all runs if None, as an array of shape (runs, days).
+        Days after the end of a shorter run are NaN.
+        """
+        runs = range(len(self.Index)) if runs is None else runs
+        c = self.Columns.index(name)
+        selected = [self.__values(run)[:, c] for run in runs]
+        nDays = max((len(v) for v in selected), default=0)
+        values = np.full((len(selected), nDays), np.nan)
+        for (i, v) in enumerate(selected):
+            values[i, :len(v)] = v
+        return values
+
+    def mean(self, name, runs=None):
+        """Per-day mean of one column over the given runs, one run in memory at a time.
+        """
+        runs = range(len(self.Index)) if runs is None else runs
+        c = self.Columns.index(name)
+        total = np.zeros(0)
+        count = np.zeros(0)
+        for run in runs:
+            v = self.__values(run)[:, c]
+            if len(v) > len(total):
+                total = np.append(total, np.zeros(len(v)-len(total)))
+                count = np.append(count, np.zeros(len(v)-len(count)))
+            total[:len(v)] += v
+            count[:len(v)] += 1
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return total/count
+
+    def __values(self, run):
+        """Memory-mapped (days, columns) array of a run.
+        """
+        metadata = self.Index[run]
+        chunk = metadata['chunk']
+        if not chunk in self.Chunks:
+            self.Chunks[chunk] = np.load(self.__chunkPath(chunk), mmap_mode='r')
+        return self.Chunks[chunk][metadata['position'], :metadata['length']]
+
+    def __chunkPath(self, chunk):
+        return os.path.join(self.Directory, f'chunk-{chunk:06d}.npy')
@@ -0,0 +1,28 @@
+import heapq
+
+
+class EventScheduler:
+    """Priority queue of the times at which people have something due.
+
+    Entries are never removed when a timer is cleared or rescheduled; advancing
+    a person with nothing due leaves it unchanged, so stale entries are harmless.
+    """
+
+    def __init__(self):
+        self.Events = []
+
+    def schedule(self, time, id):
+        """Schedules the person with the given id to be advanced at time.
+        """
+        heapq.heappush(self.Events, (time, id))
+
+    def popDue(self, t):
+        """Ids, in ascending order, of the people with an event due at or before t.
+        """
+        ids = set()
+        while self.Events and self.Events[0][0] <= t:
+            ids.add(heapq.heappop(self.Events)[1])
+        return sorted(ids)
+
+    def __len__(self):
+        return len(self.Events)
@@ -0,0 +1,101 @@
+import numpy as np
+
+
+class ServerPool:
+    """All servers of a testing queue, simulated together.
+
+    The exponential service times of every server for a day are drawn in one
+    array. DayWrapOption 'overtime-flex' starts the next day of a server that
+    works past the end of its day later by that overtime, 'overtime' does not.
+    serverRngs: One generator per server, e.g. of RandomStreams, so every server
+        draws its own service times whatever the other servers do.
+    """
+
+    def __init__(self, nServers, mu, rng=None, serverRngs=None):
+        self.Rng = rng if rng != None else np.random.default_rng()
+        self.ServerRngs = serverRngs
+        self.Mu = mu
+        self.DayWrapOption = "overtime-flex"
+
+        self.EmploymentRates = np.ones(int(nServers))
+        if nServers % 1 != 0:
+            self.EmploymentRates = np.append(
+                self.EmploymentRates, nServers % 1)
+        self.InitialTimes = np.zeros(len(self.EmploymentRates))
+        self.Mus = np.full(len(self.EmploymentRates), float(mu))  # Mean service time of every server
+
+    @classmethod
+    def concatenate(cls, pools, rng=None):
+        """One pool of the servers of all given pools, e.g. of many runs simulated together.
+        simulateDay returns the number served by each server, in the order of the pools.
+        """
+        pool = cls(0, 1, rng)
+        pool.EmploymentRates = np.concatenate([p.EmploymentRates for p in pools])
+        pool.InitialTimes = np.concatenate([p.InitialTimes for p in pools])
+        pool.Mus = np.concatenate([p.Mus for p in pools])
+        pool.Mu = None
+        return pool
+
+    def simulateDay(self):
+        """The number of people each server serves during one day.
+        """
+        t = self.InitialTimes.copy()
+        served = np.zeros(len(t), dtype=np.int64)
+        if self.ServerRngs != None:
+            for i in range(len(t)):
+                served[i], t[i] = self.__simulateServer(i)
+            return self.__wrapDay(t, served)
+
+        active = np.flatnonzero(t < self.EmploymentRates)
+
+        while len(active) > 0:
+            mus = self.Mus[active]
+            remaining = ((self.EmploymentRates[active] - t[active])/mus).max()
+            nDraws = int(np.ceil(1.2*remaining + 3*np.sqrt(remaining))) + 1
+
+            # Time at which each of the next nDraws services ends.
+            ends = t[active, None] + np.cumsum(
+                mus[:, None]*self.Rng.standard_exponential((len(active), nDraws)), axis=1)
+            endsInDay = np.count_nonzero(
+                ends < self.EmploymentRates[active, None], axis=1)
+
+            isDone = endsInDay < nDraws
+            served[active] += np.where(isDone, endsInDay+1, nDraws)
+            t[active] = ends[np.arange(len(active)),
+                             np.minimum(endsInDay, nDraws-1)]
+            active = active[~isDone]
+
+        return self.__wrapDay(t, served)
+
+    def __simulateServer(self, i):
+        """The number served by server i, drawing from its own generator, and the time its last service ends.
+        """
+        rng = self.ServerRngs[i]
+        mu = self.Mus[i]
+        t = self.InitialTimes[i]
+        employmentRate = self.EmploymentRates[i]
+        served = 0
+        while t < employmentRate:
+            remaining = (employmentRate - t)/mu
+            nDraws = int(np.ceil(1.2*remaining + 3*np.sqrt(remaining))) + 1
+            ends = t + np.cumsum(mu*rng.standard_exponential(nDraws))
+            endsInDay = np.count_nonzero(ends < employmentRate)
+            served += min(endsInDay+1, nDraws)
+            t = ends[min(endsInDay, nDraws-1)]
+        return served, t
+
+    def __wrapDay(self, t, served):
+        """Carries the overtime of the day over to the next day.
+        """
+        if self.DayWrapOption == 'overtime':
+            self.InitialTimes = np.zeros(len(t))
+        elif self.DayWrapOption == 'overtime-flex':
+            self.InitialTimes = t-self.EmploymentRates
+        else:
+            raise Exception(
+                f"Invalid day-wrap option \"{self.DayWrapOption}\"")
+
+        return served
+
+    def __len__(self):
+        return len(self.EmploymentRates)
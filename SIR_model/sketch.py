@@ -0,0 +1,281 @@
+# Mergeable streaming quantile sketch
+
+import math
+
+import numpy as np
+
+MIN_INDEXABLE = 1e-9  # Values closer to zero than this are counted as zero
+
+
+class _Bins:
+    """Counts of the bins with consecutive keys, grown as values arrive, one row of counts
+    per cell, e.g. per day and column of QuantileSketches. Every cell has its own range of
+    keys, from Offsets to Highs, so cells with values of different magnitude do not share bins.
+    """
+
+    def __init__(self, nCells=1):
+        self.Counts = np.zeros((nCells, 0))
+        self.Offsets = np.zeros(nCells, dtype=np.int64)  # Key of the first bin of every cell
+        self.Highs = np.full(nCells, -1, dtype=np.int64)  # Highest key of every cell, below Offsets if empty
+
+    def add(self, keys, weights, cells=None):
+        """Adds the weights to the bins of the keys, in the given cells or the first cell.
+        """
+        if len(keys) == 0:
+            return
+        cells = np.zeros(len(keys), dtype=np.int64) if cells is None else cells
+        low = np.full(len(self.Offsets), np.iinfo(np.int64).max)
+        high = np.full(len(self.Offsets), np.iinfo(np.int64).min)
+        np.minimum.at(low, cells, keys)
+        np.maximum.at(high, cells, keys)
+        self.__extend(low, high)
+        self.__add(cells, keys, weights)
+
+    def merge(self, other):
+        isEmpty = other.Highs < other.Offsets
+        self.__extend(np.where(isEmpty, np.iinfo(np.int64).max, other.Offsets),
+                      np.where(isEmpty, np.iinfo(np.int64).min, other.Highs))
+        cells, columns = np.nonzero(other.Counts)
+        self.__add(cells, other.Offsets[cells] + columns, other.Counts[cells, columns])
+
+    def collapse(self, maxBins):
+        """Folds the lowest bins of every cell into one, so at most maxBins remain per cell.
+        """
+        if (self.Highs - self.Offsets + 1 > maxBins).any():
+            self.__relocate(np.maximum(self.Offsets, self.Highs - maxBins + 1), self.Highs)
+
+    def keys(self):
+        """The key of every bin, per cell.
+        """
+        return self.Offsets[:, None] + np.arange(self.Counts.shape[1])
+
+    def __add(self, cells, keys, weights):
+        nCells, nBins = self.Counts.shape
+        columns = np.maximum(keys, self.Offsets[cells]) - self.Offsets[cells]
+        self.Counts += np.bincount(cells*nBins + columns, weights=weights,
+                                   minlength=nCells*nBins).reshape(nCells, nBins)
+
+    def __extend(self, low, high):
+        """Widens the range of every cell to the given lowest and highest keys, if any.
+        """
+        isAdded = low <= high
+        isEmpty = self.Highs < self.Offsets
+        offsets = np.where(isAdded, np.where(isEmpty, low, np.minimum(self.Offsets, low)), self.Offsets)
+        highs = np.where(isAdded, np.where(isEmpty, high, np.maximum(self.Highs, high)), self.Highs)
+        self.__relocate(offsets, highs)
+
+    def __relocate(self, offsets, highs):
+        """Moves the counts of every cell to bins from the given offsets on. Counts of keys
+        below the new offset of a cell are folded into its first bin.
+        """
+        nBins = int(max((highs - offsets + 1).max(), 0))
+        if (offsets == self.Offsets).all() and nBins == self.Counts.shape[1]:
+            self.Highs = highs
+            return
+        cells, columns = np.nonzero(self.Counts)
+        weights = self.Counts[cells, columns]
+        keys = self.Offsets[cells] + columns
+        self.Counts = np.zeros((len(offsets), nBins))
+        self.Offsets = offsets
+        self.Highs = highs
+        self.__add(cells, keys, weights)
+
+
+class QuantileSketch:
+    """Streaming quantile sketch with relative accuracy, after DDSketch.
+
+    Values fall into logarithmic bins, so every quantile is estimated within
+    relativeAccuracy of a value of the right rank, and memory depends on the
+    range of the values, not on their number. When there are more than maxBins
+    bins of positive, or of negative, values, the bins closest to zero are
+    folded together. Sketches with the same accuracy are merged by adding
+    their bins, so sketches filled in different processes combine exactly.
+    Values may carry weights, e.g. the number of people of a cohort.
+    """
+
+    def __init__(self, relativeAccuracy=0.01, maxBins=2048):
+        self.RelativeAccuracy = relativeAccuracy
+        self.MaxBins = maxBins
+        self.Gamma = (1 + relativeAccuracy)/(1 - relativeAccuracy)
+        self.LogGamma = math.log(self.Gamma)
+
+        self.Positive = _Bins()
+        self.Negative = _Bins()  # Keys of the absolute values
+        self.ZeroCount = 0.
+        self.Count = 0.
+        self.Sum = 0.
+        self.Min = math.inf
+        self.Max = -math.inf
+
+    def add(self, values, weights=None):
+        """Adds a value, or an array of values, with optional weights. NaN values are skipped.
+        """
+        values = np.atleast_1d(np.asarray(values, dtype=float))
+        weights = np.ones(len(values)) if weights is None \
+            else np.broadcast_to(np.asarray(weights, dtype=float), values.shape)
+        isValid = ~np.isnan(values) & (weights > 0)
+        if not isValid.all():
+            values, weights = values[isValid], weights[isValid]
+        if len(values) == 0:
+            return
+
+        isPositive = values > MIN_INDEXABLE
+        isNegative = values < -MIN_INDEXABLE
+        self.Positive.add(self.__key(values[isPositive]), weights[isPositive])
+        self.Negative.add(self.__key(-values[isNegative]), weights[isNegative])
+        self.ZeroCount += weights[~(isPositive | isNegative)].sum()
+        self.Positive.collapse(self.MaxBins)
+        self.Negative.collapse(self.MaxBins)
+
+        self.Count += weights.sum()
+        self.Sum += (values*weights).sum()
+        self.Min = min(self.Min, values.min())
+        self.Max = max(self.Max, values.max())
+
+    def merge(self, other):
+        """Adds the values of another sketch with the same relative accuracy.
+        """
+        if other.RelativeAccuracy != self.RelativeAccuracy:
+            raise Exception("Only sketches with the same relative accuracy can be merged.")
+        self.Positive.merge(other.Positive)
+        self.Negative.merge(other.Negative)
+        self.Positive.collapse(self.MaxBins)
+        self.Negative.collapse(self.MaxBins)
+        self.ZeroCount += other.ZeroCount
+        self.Count += other.Count
+        self.Sum += other.Sum
+        self.Min = min(self.Min, other.Min)
+        self.Max = max(self.Max, other.Max)
+        return self
+
+    def quantile(self, q):
+        """Estimated value at quantile q, or an array of quantiles. NaN for an empty sketch.
+        """
+        levels = np.atleast_1d(np.asarray(q, dtype=float))
+        if self.Count == 0:
+            estimates = np.full(len(levels), np.nan)
+        else:
+            negativeKeys = self.Negative.keys()[0, ::-1]
+            values = np.concatenate([-self.__value(negativeKeys), [0.], self.__value(self.Positive.keys()[0])])
+            counts = np.concatenate([self.Negative.Counts[0, ::-1], [self.ZeroCount], self.Positive.Counts[0]])
+            cumulative = np.cumsum(counts)
+            index = np.searchsorted(cumulative, levels*(self.Count - 1), side='right')
+            estimates = np.clip(values[np.minimum(index, len(values) - 1)], self.Min, self.Max)
+        return estimates if np.ndim(q) > 0 else float(estimates[0])
+
+    @property
+    def Mean(self):
+        return self.Sum/self.Count if self.Count > 0 else math.nan
+
+    @property
+    def NBins(self):
+        return self.Positive.Counts.shape[1] + self.Negative.Counts.shape[1] + 1
+
+    def __key(self, values):
+        return _key(values, self.LogGamma)
+
+    def __value(self, keys):
+        return _value(keys, self.Gamma)
+
+
+class QuantileSketches:
+    """One QuantileSketch per cell of an array, e.g. per day and result column of a run,
+    all filled with an array of values at a time.
+
+    Every cell has its own range of bins, as an independent QuantileSketch would, so a cell's
+    accuracy does not depend on the values of other cells. When the bins of a cell span more
+    than maxBins keys, its lowest bins are folded together. Memory is at most maxBins positive
+    and maxBins negative bins per cell.
+    """
+
+    def __init__(self, shape, relativeAccuracy=0.01, maxBins=2048):
+        self.Shape = tuple(shape)
+        self.RelativeAccuracy = relativeAccuracy
+        self.MaxBins = maxBins
+        self.Gamma = (1 + relativeAccuracy)/(1 - relativeAccuracy)
+        self.LogGamma = math.log(self.Gamma)
+
+        nCells = int(np.prod(self.Shape))
+        self.Positive = _Bins(nCells)
+        self.Negative = _Bins(nCells)
+        self.ZeroCount = np.zeros(nCells)
+        self.Count = np.zeros(nCells)
+        self.Sum = np.zeros(nCells)
+        self.Min = np.full(nCells, math.inf)
+        self.Max = np.full(nCells, -math.inf)
+
+    def add(self, values, weights=None):
+        """Adds an array of values of the shape of the sketches, one per cell, with optional weights.
+        NaN values are skipped.
+        """
+        values = np.asarray(values, dtype=float)
+        if values.shape != self.Shape:
+            raise Exception(f"Values of shape {values.shape} do not fit sketches of shape {self.Shape}.")
+        values = values.ravel()
+        weights = np.ones(len(values)) if weights is None \
+            else np.broadcast_to(np.asarray(weights, dtype=float), self.Shape).ravel()
+        cells = np.flatnonzero(~np.isnan(values) & (weights > 0))
+        values, weights = values[cells], weights[cells]
+
+        isPositive = values > MIN_INDEXABLE
+        isNegative = values < -MIN_INDEXABLE
+        isZero = ~(isPositive | isNegative)
+        self.Positive.add(_key(values[isPositive], self.LogGamma), weights[isPositive], cells[isPositive])
+        self.Negative.add(_key(-values[isNegative], self.LogGamma), weights[isNegative], cells[isNegative])
+        self.ZeroCount[cells[isZero]] += weights[isZero]
+        self.Positive.collapse(self.MaxBins)
+        self.Negative.collapse(self.MaxBins)
+
+        self.Count[cells] += weights
+        self.Sum[cells] += values*weights
+        self.Min[cells] = np.minimum(self.Min[cells], values)
+        self.Max[cells] = np.maximum(self.Max[cells], values)
+
+    def merge(self, other):
+        """Adds the values of other sketches of the same shape and relative accuracy.
+        """
+        if other.RelativeAccuracy != self.RelativeAccuracy or other.Shape != self.Shape:
+            raise Exception("Only sketches with the same shape and relative accuracy can be merged.")
+        self.Positive.merge(other.Positive)
+        self.Negative.merge(other.Negative)
+        self.Positive.collapse(self.MaxBins)
+        self.Negative.collapse(self.MaxBins)
+        self.ZeroCount += other.ZeroCount
+        self.Count += other.Count
+        self.Sum += other.Sum
+        self.Min = np.minimum(self.Min, other.Min)
+        self.Max = np.maximum(self.Max, other.Max)
+        return self
+
+    def quantile(self, q):
+        """Estimated value at quantile q of every cell, NaN for empty cells, as an array of the
+        shape of the sketches, or for an array of quantiles one such array per quantile.
+        """
+        levels = np.atleast_1d(np.asarray(q, dtype=float))
+        values = np.hstack([-_value(self.Negative.keys()[:, ::-1], self.Gamma), np.zeros((len(self.Count), 1)),
+                            _value(self.Positive.keys(), self.Gamma)])
+        cumulative = np.cumsum(np.hstack([self.Negative.Counts[:, ::-1], self.ZeroCount[:, None],
+                                          self.Positive.Counts]), axis=1)
+        cells = np.arange(len(self.Count))
+        estimates = np.empty((len(levels), len(self.Count)))
+        for (i, level) in enumerate(levels):
+            index = np.count_nonzero(cumulative <= level*(self.Count[:, None] - 1), axis=1)
+            estimates[i] = np.clip(values[cells, np.minimum(index, values.shape[1] - 1)], self.Min, self.Max)
+        estimates[:, self.Count == 0] = np.nan
+        estimates = estimates.reshape((len(levels),) + self.Shape)
+        return estimates if np.ndim(q) > 0 else estimates[0]
+
+    @property
+    def Mean(self):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (self.Sum/self.Count).reshape(self.Shape)
+
+
+def _key(values, logGamma):
+    return np.ceil(np.log(values)/logGamma).astype(np.int64)
+
+
+def _value(keys, gamma):
+    """The value every bin stands for, within the relative accuracy of all values in the bin.
+    """
+    return 2*np.power(gamma, keys.astype(float))/(gamma + 1)
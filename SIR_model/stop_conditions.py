@@ -0,0 +1,36 @@
+# Predicates of a day's result row for Model.run(stopWhen=...) and Model.steps(stopWhen=...).
+# They are module-level functions or classes so that they can be sent to worker processes.
+
+
+def noInfectedAndQueueEmpty(row):
+    """Nobody is infected and nobody is waiting to be tested.
+    """
+    return row['Infected'] == 0 and row['Queued'] == 0
+
+
+def noInfected(row):
+    """Nobody is infected. People with false symptoms may still be queued.
+    """
+    return row['Infected'] == 0
+
+
+class InfectedExceeds:
+    """More than x people are infected.
+    """
+
+    def __init__(self, x):
+        self.X = x
+
+    def __call__(self, row):
+        return row['Infected'] > self.X
+
+
+class QueueExceeds:
+    """More than x people are queued.
+    """
+
+    def __init__(self, x):
+        self.X = x
+
+    def __call__(self, row):
+        return row['Queued'] > self.X
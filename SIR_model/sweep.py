@@ -0,0 +1,105 @@
+# Parameter sweeps of the SIR-model
+
+import os
+import itertools
+import multiprocessing
+
+import numpy as np
+
+from .model import Model
+
+
+def summarize(columns):
+    """Summary metrics of one run, computed from its result columns.
+    """
+    infected = columns['Infected']
+    removed = columns['Removed']
+    return {
+        'PeakInfected': int(infected.max()),
+        'PeakInfectedDay': float(columns['Time'][infected.argmax()]),
+        'TotalInfected': int(infected[-1] + removed[-1] - removed[0]),
+        'FinalSusceptible': int(columns['Susceptible'][-1]),
+        'PeakQueued': int(columns['Queued'].max()),
+        'MeanWaitTotal': float(columns['ExpecteWaitTotal'].mean()),
+        'PeakWaitTotal': float(columns['ExpecteWaitTotal'].max()),
+    }
+
+
+def runSummary(modelClass, parameters, seed, metrics, stopWhen=None, cache=None):
+    """Runs one model and returns only its summary metrics.
+    """
+    model = modelClass(seed=seed, **parameters)
+    model.run(stopWhen, cache)
+    return metrics(model.ResultColumns)
+
+
+def runSweepTask(task):
+    """Runs one grid point and seed, task being
+    (modelClass, fixed parameters, point, seed, metrics, stopWhen, cache).
+    """
+    modelClass, fixed, point, seed, metrics, stopWhen, cache = task
+    return point, seed, runSummary(modelClass, {**fixed, **point}, seed, metrics, stopWhen, cache)
+
+
+class Sweep:
+    """Runs replications of every combination in a parameter grid across a process pool.
+
+    grid: Model argument name to list of values, e.g. {'servers': [1, 2], 'tReneging': [None, 2]}.
+    replications: Runs per grid point. Replication r uses the same seed at every grid point.
+    metrics: Picklable function from the result columns of a run, a dict of NumPy arrays,
+        to a dict of summary metrics. Computed in the workers.
+    chunksize: Runs handed to a worker at a time, None to balance about eight chunks per worker.
+    stopWhen: Picklable stop predicate(s) passed to Model.run, see stop_conditions.
+    cache: ResultCache shared by the workers, see Model.run.
+    All other keyword arguments are passed on to the model unchanged.
+    """
+
+    def __init__(self, grid, replications=10, modelClass=Model, seed=None, processes=None,
+                 chunksize=None, metrics=summarize, stopWhen=None, cache=None, **parameters):
+        self.Grid = {name: list(values) for (name, values) in grid.items()}
+        self.Replications = int(replications)
+        self.ModelClass = modelClass
+        self.Parameters = parameters
+        self.Processes = processes if processes != None else os.cpu_count()
+        self.Metrics = metrics
+        self.StopWhen = stopWhen
+        self.Cache = cache
+
+        seeds = np.random.SeedSequence(seed).generate_state(self.Replications)
+        self.Seeds = [int(s) for s in seeds]
+
+        self.Points = [dict(zip(self.Grid, values))
+                       for values in itertools.product(*self.Grid.values())]
+        nRuns = len(self.Points)*self.Replications
+        self.Chunksize = chunksize if chunksize != None \
+            else max(1, nRuns // (8*self.Processes))
+
+        self.Results = None
+
+    def stream(self):
+        """Yields one row per metric and run, as the runs finish, in no particular order.
+        """
+        tasks = [(self.ModelClass, self.Parameters, point, seed, self.Metrics, self.StopWhen, self.Cache)
+                 for seed in self.Seeds for point in self.Points]
+
+        if self.Processes == 1:
+            runs = (runSweepTask(task) for task in tasks)
+            yield from self.__rows(runs)
+            return
+
+        with multiprocessing.Pool(self.Processes) as pool:
+            runs = pool.imap_unordered(runSweepTask, tasks, self.Chunksize)
+            yield from self.__rows(runs)
+
+    def run(self):
+        """Executes the sweep and collects a long table with the columns
+        of the grid, Seed, Metric and Value.
+        """
+        import pandas as pd
+        self.Results = pd.DataFrame(self.stream(),
+                                    columns=list(self.Grid) + ['Seed', 'Metric', 'Value'])
+
+    def __rows(self, runs):
+        for (point, seed, summary) in runs:
+            for (metric, value) in summary.items():
+                yield {**point, 'Seed': seed, 'Metric': metric, 'Value': value}
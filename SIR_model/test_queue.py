@@ -1,70 +1,157 @@
+from collections import deque
+import heapq
 import numpy as np
 
-from .server import Server
+from .server_pool import ServerPool
+
+
+def symptomaticFirst(person, t):
+    """People with covid-19 symptoms, assumed more severe than false symptoms, before others.
+    """
+    return 0 if person.IsSymptomatic else 1
+
+
+PriorityKeys = {
+    'SymptomaticFirst': symptomaticFirst,
+}
 
 
 class TestQueue:
     """Testing queue object.
+
+    Every put gets a ticket. Renegading only forgets the tickets of a person,
+    which are then skipped when they reach the front of the queue.
     """
 
-    def __init__(self, nServers, serverMu, prioritisation):
-        self.Prioritisation = prioritisation
+    def __init__(self, nServers, serverMu, prioritisation, rng=None, serverRngs=None):
+        self.Entries = {}  # ticket: id
+        self.TicketsById = {}
+        self.NextTicket = 0
+        self.setPrioritisation(prioritisation)
 
-        self.Queue = []
         # TODO: Test with 2.75
         self.NServers = nServers
-        self.Servers = [Server(serverMu, 1) for n in range(int(nServers))]
-        if nServers % 1 != 0:
-            self.Servers.append(Server(serverMu, nServers % 1))
+        self.Servers = ServerPool(nServers, serverMu, rng, serverRngs)
+        self.ServerMu = serverMu
+
+    def setPrioritisation(self, prioritisation, people=None, t=None):
+        """Changes the prioritization policy and reorders the people queued, in the order they
+        were put. Keys of a policy that ranks people are computed from people, indexed by id, at t.
+        """
+        tickets = sorted(self.Entries)
+        self.Prioritisation = prioritisation
+        if prioritisation in ['FIFO', 'LIFO']:
+            self.PriorityKey = None
+            self.Queue = deque(tickets)
+        elif prioritisation in PriorityKeys or callable(prioritisation):
+            self.PriorityKey = PriorityKeys.get(prioritisation, prioritisation)
+            self.Queue = [(self.PriorityKey(people[self.Entries[ticket]], t), ticket)
+                          for ticket in tickets]
+            heapq.heapify(self.Queue)
+        else:
+            raise Exception(
+                f"Prioritization [{prioritisation}] is not valid.")
+
+    def setServers(self, nServers, serverMu, serverRngs=None):
+        """Changes the servers. Servers that stay keep the overtime carried over to the next day.
+        """
+        servers = ServerPool(nServers, serverMu, self.Servers.Rng, serverRngs)
+        n = min(len(servers), len(self.Servers))
+        servers.InitialTimes[:n] = self.Servers.InitialTimes[:n]
+        servers.DayWrapOption = self.Servers.DayWrapOption
+        self.NServers = nServers
+        self.Servers = servers
         self.ServerMu = serverMu
 
-    def put(self, id):
-        """Appends an element last in the queue.
+    def put(self, id, person=None, t=None):
+        """Appends an element last in the queue. The person and time are only
+        needed for prioritization policies that rank people by a key.
         """
-        self.Queue.append(id)
+        ticket = self.NextTicket
+        self.NextTicket += 1
+        self.Entries[ticket] = id
+        self.TicketsById.setdefault(id, []).append(ticket)
+
+        if self.PriorityKey == None:
+            self.Queue.append(ticket)
+        else:
+            heapq.heappush(self.Queue, (self.PriorityKey(person, t), ticket))
 
     def pop(self):
         """Pops an element depending on the prioritization policy.
         FIFO: First.
         LIFO: Last.
+        SymptomaticFirst or a callable key(person, t): Lowest key at put, first among equals.
         """
-        if self.Prioritisation == 'FIFO':
-            return self.Queue.pop(0)
-        elif self.Prioritisation == 'LIFO':
-            return self.Queue.pop()
-        else:
-            raise Exception(
-                f"Prioritization [{self.Prioritisation}] is not valid.")
-
-    def simulateDay(self):
+        while True:
+            if self.Prioritisation == 'FIFO':
+                ticket = self.Queue.popleft()
+            elif self.Prioritisation == 'LIFO':
+                ticket = self.Queue.pop()
+            else:
+                ticket = heapq.heappop(self.Queue)[1]
+
+            id = self.Entries.pop(ticket, None)
+            if id != None:
+                tickets = self.TicketsById[id]
+                tickets.remove(ticket)
+                if not tickets:
+                    del self.TicketsById[id]
+                return id
+
+    def simulateDay(self, capacity=None):
         """Simulates a day where each server handles a number of depending on serverMu.
+        capacity: Number of people to test instead of the simulated capacity of the servers.
         """
-        nItems = len(self.Queue)
-        nItemsToPop = 0
+        nItems = len(self.Entries)
+        nItemsToPop = capacity if capacity != None else self.simulateCapacity()
         popped = []
 
-        for server in self.Servers:
-            nItemsToPop += server.simulateDay()
-
         for _ in range(min(nItems, nItemsToPop)):
             popped.append(self.pop())
 
         return popped
 
+    def simulateCapacity(self):
+        """The number of people all servers together are able to test during one day.
+        """
+        return int(self.Servers.simulateDay().sum())
+
     def renegade(self, idsToRenegade):
         """Removes the given ids from the queue.
         """
-        self.Queue = [id for id in self.Queue if (not id in idsToRenegade)]
+        for id in idsToRenegade:
+            for ticket in self.TicketsById.pop(id, []):
+                del self.Entries[ticket]
+
+        if len(self.Queue) > 2*len(self.Entries) + 64:
+            self.__compact()
+
+    def __compact(self):
+        """Drops forgotten tickets once they make up most of the queue.
+        """
+        if self.PriorityKey == None:
+            self.Queue = deque(
+                ticket for ticket in self.Queue if ticket in self.Entries)
+        else:
+            self.Queue = [entry for entry in self.Queue
+                          if entry[1] in self.Entries]
+            heapq.heapify(self.Queue)
 
     def getExpectedQueueTime(self):
         """The current, expected waiting time for the last person in the queue.
         """
+        return self.expectedQueueTime(len(self.Entries))
+
+    def expectedQueueTime(self, queueLength):
+        """The expected waiting time for the last person in a queue of the given length.
+        """
         shouldRound = True
 
         if self.NServers == 0:
-            return np.NaN
+            return np.nan
 
-        queued = max(len(self.Queue)-len(self.Servers), 0)
+        queued = max(queueLength-len(self.Servers), 0)
         expectedQueueTime = queued*self.ServerMu/self.NServers
 
         if shouldRound:
@@ -75,4 +162,4 @@ class TestQueue:
     def getQueueLength(self):
         """The current number of people queued.
         """
-        return len(self.Queue)
+        return len(self.Entries)
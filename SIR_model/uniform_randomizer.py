@@ -0,0 +1,29 @@
+import numpy as np
+
+
+class UniformRandomizer:
+    """Randomizes random numbers uniformly distributed in [0, 1).
+
+    Numbers are drawn from the generator in bulk.
+    """
+
+    def __init__(self, rng=None, bufferSize=1024):
+        self.Rng = rng if rng != None else np.random.default_rng()
+        self.BufferSize = bufferSize
+        self.Buffer = None
+        self.Position = bufferSize
+
+    def random(self):
+        """Randomizes one number.
+        """
+        if self.Position == self.BufferSize:
+            self.Buffer = self.Rng.random(self.BufferSize)
+            self.Position = 0
+        self.Position += 1
+        return float(self.Buffer[self.Position-1])
+
+    def reset(self):
+        """Drops the buffered numbers, so the next number is drawn from the generator.
+        """
+        self.Buffer = None
+        self.Position = self.BufferSize
@@ -0,0 +1,113 @@
+# SIR Model with M|M|s testing-queue, struct-of-arrays engine
+
+import numpy as np
+
+from .model import Model
+from .population import Population, SUSCEPTIBLE, INFECTED, REMOVED
+from .test_queue import TestQueue
+
+
+class VectorizedModel(Model):
+    """SIR-model with M|M|s testing queue where the population is stored as NumPy arrays.
+
+    Takes the same arguments and produces the same Results as Model, but every
+    transition is a masked array operation over the whole population instead of
+    a method call per Person. A person that starts showing symptoms while
+    already queued keeps a single place in the queue, moved to the back.
+    Every day advances the whole population at once, so eventDriven is not supported.
+    """
+
+    SupportsEventDriven = False
+
+    def initializePopulation(self):
+        self.Population = Population(self.InitialSusceptible, self.InitialInfected, self.InitialRemoved,
+                                     self.PSymptomatic, self.TSymptomatic, self.TRecovery,
+                                     self.TFalseRecovery, self.TTestResult, self.TReneging, self.Rng)
+        if self.Waits != None:
+            self.Population.recordWaits(self.Waits)
+
+    def beginRun(self):
+        self.Population.advance(0)
+        self.Queue = TestQueue(self.NServers, self.ServerMu,
+                               self.QueuePrioritization, self.Rng, self.ServerRngs)
+
+    def applyParameters(self):
+        population = self.Population
+        population.PSymptomatic = self.PSymptomatic
+        population.TSymptomatic = self.TSymptomatic
+        population.TRecovery = self.TRecovery
+        population.TFalseRecovery = self.TFalseRecovery
+        population.TTestResult = self.TTestResult
+        population.TRenegade = self.TReneging
+
+    def simulateDay(self, t):
+        population = self.Population
+        profiler = self.Profiler
+
+        # Advance people
+        population.advance(t)
+        profiler.mark('advance', population.Size)
+
+        # Infect
+        susceptibleIds = np.flatnonzero(population.Stage == SUSCEPTIBLE)
+        infectiveUnisolated = np.count_nonzero((population.Stage == INFECTED) & population.IsInfective
+                                               & (~population.IsIsolated))
+        S_to_I_count = self.newInfections(len(susceptibleIds), infectiveUnisolated)
+        if S_to_I_count > 0:
+            population.infect(self.Rng.choice(
+                susceptibleIds, S_to_I_count, replace=False), t)
+        profiler.mark('infect', max(S_to_I_count, 0))
+
+        # False symptoms
+        susceptibleNotQueuedIds = np.flatnonzero((population.Stage == SUSCEPTIBLE)
+                                                 & (~population.IsQueued))
+        S_to_FalseSymptoms_count = int(
+            np.round(len(susceptibleNotQueuedIds)*self.PFalseSymptoms))
+        if S_to_FalseSymptoms_count > 0:
+            population.falseSymptomsInfect(self.Rng.choice(
+                susceptibleNotQueuedIds, S_to_FalseSymptoms_count, replace=False), t)
+        profiler.mark('falseSymptoms', max(S_to_FalseSymptoms_count, 0))
+
+        # Queue
+        idsToQueue = np.flatnonzero(population.ShouldQueue)
+        population.queue(idsToQueue, t)
+        profiler.mark('queue', len(idsToQueue))
+
+        # Test
+        testedIds = population.selectFromQueue(
+            self.testCapacity(), self.QueuePrioritization)
+        population.test(testedIds, t)
+        profiler.mark('test', len(testedIds))
+
+        # Renegade
+        idsToRenegade = np.flatnonzero(population.ShouldRenegade)
+        population.renegade(idsToRenegade)
+        profiler.mark('renegade', len(idsToRenegade))
+
+    def recordDay(self, results):
+        """Counts the current state of the population and writes the next row of the result columns.
+        """
+        population = self.Population
+        susceptible = population.Stage == SUSCEPTIBLE
+        infected = population.Stage == INFECTED
+        removed = population.Stage == REMOVED
+        unisolated = infected & (~population.IsIsolated)
+        queued = population.IsQueued
+        nQueued = np.count_nonzero(queued)
+        expectedWaitQueue = self.Queue.expectedQueueTime(nQueued)
+
+        results.addRow({
+            'Susceptible': np.count_nonzero(susceptible),
+            'Infected': np.count_nonzero(infected),
+            'Removed': np.count_nonzero(removed),
+            'InfectedAsymptomaticUnisolated': np.count_nonzero(unisolated & (~population.IsSymptomatic)),
+            'InfectedSymptomaticUnisolated': np.count_nonzero(unisolated & population.IsSymptomatic),
+            'InfectedIsolated': np.count_nonzero(infected & population.IsIsolated),
+            'InfectedInfectiveUnisolated': np.count_nonzero(unisolated & population.IsInfective),
+            'Queued': nQueued,
+            'SusceptibleQueued': np.count_nonzero(susceptible & queued),
+            'InfectedQueued': np.count_nonzero(infected & queued),
+            'RemovedQueued': np.count_nonzero(removed & queued),
+            'ExpectedWaitQueue': expectedWaitQueue,
+            'ExpecteWaitTotal': self.TTestResult + self.ServerMu + expectedWaitQueue,
+        })
@@ -0,0 +1,110 @@
+# Realized waiting times of the people of a run
+
+import numpy as np
+
+from .sketch import QuantileSketch
+
+WaitKinds = ('QueueToTest', 'TestToIsolation', 'SymptomsToIsolation')
+
+Stages = ('S', 'I', 'R')  # Index is the stage code of population
+
+
+class WaitRecorder:
+    """Realized waits of the people of a run, in days, per kind, stage and day, kept in
+    QuantileSketches so memory does not grow with the number of people or runs.
+
+    QueueToTest: From being queued to being tested, by the stage when tested.
+    TestToIsolation: From the test to isolation, of the infected that isolate.
+    SymptomsToIsolation: From symptom onset to isolation, of the symptomatic that isolate.
+    A wait is counted on the day it ends. Waits end on whole days, so quantiles are rounded
+    to whole days. Recorders of several runs are combined by merge.
+    """
+
+    def __init__(self, relativeAccuracy=0.01, maxBins=512):
+        self.RelativeAccuracy = relativeAccuracy
+        self.MaxBins = maxBins
+        self.Sketches = {}  # (kind, stage, day): QuantileSketch
+        self.Pending = {}  # (kind, stage): waits recorded one at a time today
+
+    def clear(self):
+        self.Sketches = {}
+        self.Pending = {}
+
+    def add(self, kind, day, stages, waits, counts=None):
+        """Records the waits ending on the day, with the stage codes of the people waiting,
+        see population.SUSCEPTIBLE, and optionally the number of people of each wait.
+        """
+        stages = np.broadcast_to(np.asarray(stages), np.shape(waits))
+        waits = np.asarray(waits, dtype=float)
+        counts = np.ones(len(waits)) if counts is None else np.asarray(counts, dtype=float)
+        for code in np.unique(stages):
+            isStage = stages == code
+            self.__sketch(kind, Stages[code], day).add(waits[isStage], counts[isStage])
+
+    def addOne(self, kind, stage, wait):
+        """Records one wait ending today of a person in stage 'S', 'I' or 'R', see endDay.
+        """
+        self.Pending.setdefault((kind, stage), []).append(wait)
+
+    def endDay(self, day):
+        """Adds the waits recorded one at a time to the sketches of the day.
+        """
+        for ((kind, stage), waits) in self.Pending.items():
+            self.__sketch(kind, stage, day).add(waits)
+        self.Pending = {}
+
+    def merge(self, other):
+        """Adds the waits of another recorder, e.g. of another replication.
+        """
+        for (key, sketch) in other.Sketches.items():
+            if key in self.Sketches:
+                self.Sketches[key].merge(sketch)
+            else:
+                self.Sketches[key] = QuantileSketch(self.RelativeAccuracy, self.MaxBins).merge(sketch)
+        return self
+
+    def sketch(self, kind, stage=None, days=None):
+        """The waits of a kind, of one stage or all, on the given days or all, in one sketch.
+        """
+        merged = QuantileSketch(self.RelativeAccuracy, self.MaxBins)
+        for ((k, s, d), sketch) in self.Sketches.items():
+            if k == kind and (stage == None or s == stage) and (days is None or d in days):
+                merged.merge(sketch)
+        return merged
+
+    def quantiles(self, kind, stage=None, levels=(0.5, 0.95, 0.99)):
+        """A DataFrame with the Day, Count and Mean of the waits of a kind ending on every day
+        with waits, and a column per quantile level, e.g. P95 for 0.95.
+        """
+        import pandas as pd
+        days = sorted(set(d for (k, s, d) in self.Sketches if k == kind and (stage == None or s == stage)))
+        rows = []
+        for day in days:
+            sketch = self.sketch(kind, stage, [day])
+            rows.append([day, sketch.Count, sketch.Mean] + list(np.round(sketch.quantile(levels))))
+        return pd.DataFrame(rows, columns=['Day', 'Count', 'Mean'] + [self.__levelName(q) for q in levels])
+
+    def summary(self, levels=(0.5, 0.95, 0.99)):
+        """A DataFrame with the Count, Mean, Max and quantiles of the waits over the whole run,
+        per kind and stage.
+        """
+        import pandas as pd
+        rows = []
+        for kind in WaitKinds:
+            for stage in Stages:
+                sketch = self.sketch(kind, stage)
+                if sketch.Count > 0:
+                    rows.append([kind, stage, sketch.Count, sketch.Mean, sketch.Max]
+                                + list(np.round(sketch.quantile(levels))))
+        return pd.DataFrame(rows, columns=['Kind', 'Stage', 'Count', 'Mean', 'Max']
+                            + [self.__levelName(q) for q in levels])
+
+    def __sketch(self, kind, stage, day):
+        key = (kind, stage, int(day))
+        sketch = self.Sketches.get(key)
+        if sketch is None:
+            sketch = self.Sketches[key] = QuantileSketch(self.RelativeAccuracy, self.MaxBins)
+        return sketch
+
+    def __levelName(self, q):
+        return f'P{100*q:g}'
@@ -0,0 +1,55 @@
+# Measures the cost of importing SIR_model and running a headless Model.
+#
+# Usage: python benchmarks/import_time.py [--repeat 5] [--max-seconds 1.0]
+# Exits with status 1 if plotting or table libraries are loaded by a headless
+# run, or if the import takes longer than --max-seconds.
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+HEAVY_MODULES = ['pandas', 'matplotlib', 'seaborn']
+
+PROBE = '''
+import sys, time, json
+start = time.perf_counter()
+from SIR_model import Model
+imported = time.perf_counter()
+Model(duration=5, susceptible=100, infected=5, seed=1).run()
+ran = time.perf_counter()
+print(json.dumps({"import": imported-start, "run": ran-imported,
+                  "loaded": [m for m in %r if m in sys.modules]}))
+''' % HEAVY_MODULES
+
+
+def measure(repeat):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    samples = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', PROBE], cwd=root,
+                                capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(output))
+    return {
+        'import': min(s['import'] for s in samples),
+        'run': min(s['run'] for s in samples),
+        'loaded': sorted(set(m for s in samples for m in s['loaded'])),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--max-seconds', type=float, default=None)
+    args = parser.parse_args()
+
+    result = measure(args.repeat)
+    print(json.dumps(result, indent=2))
+
+    if result['loaded']:
+        print(f"Headless run loaded {', '.join(result['loaded'])}")
+        sys.exit(1)
+    if args.max_seconds != None and result['import'] > args.max_seconds:
+        print(f"Import took {result['import']:.3f} s, more than {args.max_seconds} s")
+        sys.exit(1)
@@ -0,0 +1,147 @@
+# Measures the wall time, time per simulated day and peak memory of model runs
+# across population sizes, durations, server counts and reneging settings.
+#
+# Usage: python benchmarks/model_run.py [--suite quick|full] [--filter Model-]
+#            [--repeat 3] [--output results.json]
+#            [--baseline baseline.json] [--tolerance 0.25]
+# Every case runs in a fresh process. With --baseline, exits with status 1 if a
+# case is slower or uses more memory than in the baseline by more than the
+# tolerance.
+
+import os
+import sys
+import json
+import platform
+import argparse
+import subprocess
+
+import numpy as np
+
+PROBE = '''
+import sys, time, json, resource
+import SIR_model
+
+def peakMemoryMB():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak/2**20 if sys.platform == 'darwin' else peak/2**10
+
+case = json.loads(sys.argv[1])
+modelClass = getattr(SIR_model, case['engine'])
+before = peakMemoryMB()
+start = time.perf_counter()
+model = modelClass(seed=1, **case['parameters'])
+built = time.perf_counter()
+model.run()
+ran = time.perf_counter()
+print(json.dumps({"setup": built-start, "run": ran-built,
+                  "perDay": (ran-built)/model.Duration,
+                  "peakMemoryMB": peakMemoryMB(), "modelMemoryMB": peakMemoryMB()-before}))
+'''
+
+# Differences below this many seconds are considered noise when comparing.
+NOISE_SECONDS = 0.05
+
+
+def case(engine, n, duration=100, servers=None, tReneging=2):
+    """A benchmark case, the servers scaled to one per thousand people by default.
+    """
+    servers = servers if servers != None else max(1, n // 1000)
+    name = f"{engine}-n{n}-d{duration}-s{servers}-r{tReneging}"
+    return {'name': name, 'engine': engine,
+            'parameters': dict(duration=duration, susceptible=n, infected=max(1, n // 20),
+                               servers=servers, tReneging=tReneging)}
+
+
+def cases(suite):
+    """The cases of the quick suite, about a minute, or the full suite, about an hour.
+    """
+    if suite == 'quick':
+        return [case('Model', 1000), case('Model', 10000),
+                case('Model', 1000, duration=50), case('Model', 1000, duration=200),
+                case('Model', 1000, servers=5), case('Model', 1000, tReneging=None),
+                case('VectorizedModel', 100000), case('CohortModel', 1000000)]
+
+    sizes = [1000, 10000, 100000, 1000000]
+    return [case(engine, n) for engine in ['Model', 'VectorizedModel', 'CohortModel'] for n in sizes] \
+        + [case('Model', 10000, duration=d) for d in [50, 200, 400]] \
+        + [case('Model', 10000, servers=s) for s in [1, 50]] \
+        + [case('Model', 10000, tReneging=r) for r in [None, 0.5, 7]] \
+        + [case('VectorizedModel', 100000, servers=s) for s in [10, 1000]] \
+        + [case('VectorizedModel', 100000, tReneging=None)]
+
+
+def measure(case, repeat):
+    """The fastest of repeat runs of the case, each in a fresh process.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    samples = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', PROBE, json.dumps(case)], cwd=root,
+                                capture_output=True, text=True, check=True).stdout
+        samples.append(json.loads(output))
+    fastest = min(samples, key=lambda s: s['run'])
+    return {**case, **fastest, 'runs': [s['run'] for s in samples]}
+
+
+def environment():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=root,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'python': platform.python_version(), 'numpy': np.__version__,
+            'platform': platform.platform(), 'processor': platform.machine(),
+            'commit': commit}
+
+
+def compare(results, baseline, tolerance):
+    """Prints every case against the baseline and returns the names of the regressed ones.
+    """
+    previous = {r['name']: r for r in baseline['results']}
+    regressions = []
+    for result in results:
+        old = previous.get(result['name'])
+        if old == None:
+            print(f"{result['name']:45} new")
+            continue
+        timeRatio = result['run']/old['run']
+        memoryRatio = result['peakMemoryMB']/old['peakMemoryMB']
+        slower = timeRatio > 1+tolerance and result['run']-old['run'] > NOISE_SECONDS
+        larger = memoryRatio > 1+tolerance
+        print(f"{result['name']:45} time {timeRatio:6.2f}x  memory {memoryRatio:6.2f}x"
+              + ('  REGRESSION' if slower or larger else ''))
+        if slower or larger:
+            regressions.append(result['name'])
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--suite', choices=['quick', 'full'], default='quick')
+    parser.add_argument('--filter', default='', help='Only cases whose name contains this')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default=None, help='JSON file to write the results to')
+    parser.add_argument('--baseline', default=None, help='JSON file written by an earlier run')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args()
+
+    results = []
+    for c in cases(args.suite):
+        if args.filter in c['name']:
+            result = measure(c, args.repeat)
+            print(f"{c['name']:45} {result['run']:8.3f} s  {1000*result['perDay']:8.2f} ms/day"
+                  f"  {result['peakMemoryMB']:8.1f} MB", flush=True)
+            results.append(result)
+
+    report = {'suite': args.suite, 'environment': environment(), 'results': results}
+    if args.output != None:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline != None:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s) against {args.baseline}")
+            sys.exit(1)